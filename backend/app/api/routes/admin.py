@@ -1,11 +1,25 @@
+import asyncio
+import json
+
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from app.db.session import get_db
+from app.db.session import SessionLocal, get_db
 from app.models.appointment import Appointment
 from app.models.interaction_log import InteractionLog
 from app.models.patient import Patient
+from app.services.call_dispatcher import get_call_dispatcher
+from app.services.http_client import get_token_manager
+from app.services.intent_classifier import get_router_decision_log
+from app.services.memory.actian_pool import get_actian_pool
+from app.services.memory.embedding_cache import get_embedding_cache
 from app.services.memory.memory_orchestrator import MemoryOrchestrator
+from app.services.provider_directory_cache import get_provider_directory_cache
+from app.services.rag_result_cache import get_rag_result_cache
+from app.services.redis_pool import get_redis
+from app.services.session_store import get_session_store_stats
+from app.tasks.celery_app import DEAD_LETTER_KEY, celery_app
 
 
 router = APIRouter()
@@ -21,9 +35,40 @@ def get_metrics(db: Session = Depends(get_db)) -> dict:
         "patients": patient_count,
         "appointments_total": appointment_count,
         "appointments_booked": booked_count,
+        "embedding_cache": get_embedding_cache().stats(),
+        "actian_pool": get_actian_pool().stats(),
+        "rag_cache": get_rag_result_cache().stats(),
+        "router": get_router_decision_log().stats(),
+        "session_store": get_session_store_stats().stats(),
+        "oauth_tokens": get_token_manager().stats(),
+        "provider_cache": get_provider_directory_cache().stats(),
+        "outbound_calls": get_call_dispatcher().stats(),
     }
 
 
+@router.get("/dead-letters")
+async def list_dead_letters(limit: int = 50) -> dict:
+    """Background tasks that failed after their last retry, newest first."""
+    redis = get_redis()
+    entries = await redis.lrange(DEAD_LETTER_KEY, 0, max(limit, 1) - 1)
+    return {"count": await redis.llen(DEAD_LETTER_KEY), "tasks": [json.loads(entry) for entry in entries]}
+
+
+@router.post("/dead-letters/redrive")
+async def redrive_dead_letters(limit: int = 50) -> dict:
+    """Re-enqueue up to limit dead-lettered tasks (oldest first) with their original arguments."""
+    redis = get_redis()
+    redriven = []
+    for _ in range(max(limit, 0)):
+        entry = await redis.rpop(DEAD_LETTER_KEY)
+        if entry is None:
+            break
+        task = json.loads(entry)
+        await asyncio.to_thread(celery_app.send_task, task["task"], args=task["args"], kwargs=task["kwargs"])
+        redriven.append(task["task_id"])
+    return {"redriven": redriven}
+
+
 @router.get("/appointments")
 def list_appointments(db: Session = Depends(get_db)) -> list[dict]:
     items = db.query(Appointment).all()
@@ -78,3 +123,22 @@ async def list_patient_memory(patient_id: int, limit: int = 20) -> dict:
 async def reindex_patient_memory(patient_id: int, db: Session = Depends(get_db)) -> dict:
     return await memory_orchestrator.reindex_patient_from_structured_data(db=db, patient_id=patient_id)
 
+
+
+@router.post("/memory/reindex-all")
+async def reindex_all_patient_memory() -> StreamingResponse:
+    """
+    Rebuild long-term memory for every patient. Streams one JSON line per patient
+    (patient_id, indexed_memories, completed, total, indexed_total) so callers can show progress.
+    """
+
+    async def progress_stream():
+        # Own session: the stream outlives the request-scoped get_db dependency.
+        db = SessionLocal()
+        try:
+            async for progress in memory_orchestrator.reindex_all_patients(db):
+                yield json.dumps(progress) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(progress_stream(), media_type="application/x-ndjson")
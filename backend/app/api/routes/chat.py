@@ -1,15 +1,17 @@
 import asyncio
+import json
 import time
 from typing import Any
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, HTTPException
 from fastapi.responses import StreamingResponse
 
 from app.schemas.chat import ChatRequest, ChatResponse
+from app.services.call_dispatcher import get_call_dispatcher
 from app.services.call_summary_events import publish_call_summary_ready, subscribe, unsubscribe
 from app.services.chat_service import ChatService
 from app.services.elevenlabs_call_agent import ElevenLabsCallAgent
-from app.services.session_store import RedisSessionStore
+from app.services.session_store import RedisSessionStore, SessionBusyError
 
 MAX_SUMMARY_CHARS = 2000
 
@@ -46,10 +48,39 @@ SSE_MAX_WAIT_SEC = 60 * 30
 
 @router.post("/message", response_model=ChatResponse)
 async def send_message(payload: ChatRequest) -> ChatResponse:
-    result = await chat_service.send_message(message=payload.message, session_id=payload.session_id)
+    try:
+        result = await chat_service.send_message(message=payload.message, session_id=payload.session_id)
+    except SessionBusyError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
     return ChatResponse(**result)
 
 
+@router.post("/message/stream")
+async def stream_message(payload: ChatRequest) -> StreamingResponse:
+    """
+    Same turn as POST /message, streamed as SSE: 'progress' events as graph nodes start (e.g. searching health
+    topics, finding clinics), 'token' events with assistant_reply text as it is generated, then 'done' with the
+    ChatResponse payload (its reply is authoritative; streamed tokens are a preview) or 'error'.
+    """
+
+    async def event_stream():
+        async for event in chat_service.stream_message(message=payload.message, session_id=payload.session_id):
+            name = event.pop("event")
+            if name == "done":
+                event = ChatResponse(**event).model_dump()
+            yield f"event: {name}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @router.get("/pending-call-summary")
 async def get_pending_call_summary(session_id: str) -> dict:
     """Peek at pending call summary (read-only). If none, try ElevenLabs conversation history by conversation_id."""
@@ -63,6 +94,15 @@ async def get_pending_call_summary(session_id: str) -> dict:
         return {"summary": None}
     outbound = state.get("outbound_call") or {}
     conversation_id = (outbound.get("conversation_id") or "").strip()
+    if not conversation_id:
+        # Calls placed by the worker: the conversation ids are only in the dispatcher's plan. Only the winning
+        # call's summary is shown, or any call's once every clinic declined; a losing call's never is.
+        plan = await get_call_dispatcher().get_plan(session_id) or {}
+        calls = plan.get("calls", [])
+        if plan.get("winner") is not None:
+            conversation_id = calls[plan["winner"]]["conversation_id"]
+        elif plan.get("status") == "exhausted":
+            conversation_id = next((call["conversation_id"] for call in calls if call["conversation_id"]), "")
     if not conversation_id:
         return {"summary": None}
 
@@ -71,7 +111,7 @@ async def get_pending_call_summary(session_id: str) -> dict:
     summary = _summary_from_conversation_response(conv) if conv else None
     if summary:
         await store.set_pending_call_summary(session_id, summary, conversation_id)
-        publish_call_summary_ready(session_id)
+        await publish_call_summary_ready(session_id)
         return {"summary": summary}
     return {"summary": None}
 
@@ -85,10 +125,16 @@ async def consume_call_summary(session_id: str) -> dict:
 
 
 @router.get("/events")
-async def call_summary_events(session_id: str) -> StreamingResponse:
+async def call_summary_events(
+    session_id: str,
+    last_event_id: str | None = None,
+    last_event_id_header: str | None = Header(None, alias="Last-Event-ID"),
+) -> StreamingResponse:
     """
     SSE stream for this session. Sends event 'call_summary_ready' when the post-call webhook
-    has stored the summary, so the frontend can show it immediately without polling.
+    has stored the summary, so the frontend can show it immediately without polling. Events come from
+    the Redis event bus, so the webhook may land on any worker; events after last_event_id (query or
+    Last-Event-ID header), or from the recent replay window, are sent first.
     """
     if not session_id.strip():
         return StreamingResponse(
@@ -97,14 +143,14 @@ async def call_summary_events(session_id: str) -> StreamingResponse:
         )
 
     async def event_stream():
-        queue = await subscribe(session_id)
+        queue = await subscribe(session_id, last_event_id or last_event_id_header)
         started = time.monotonic()
         try:
             while (time.monotonic() - started) < SSE_MAX_WAIT_SEC:
                 try:
                     msg = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SEC)
                     event = msg.get("event", "message")
-                    yield f"event: {event}\ndata: {{}}\n\n"
+                    yield f"id: {msg.get('id', '')}\nevent: {event}\ndata: {{}}\n\n"
                     return
                 except asyncio.TimeoutError:
                     yield ": keepalive\n\n"
@@ -11,17 +11,20 @@ from app.graphs.state import InterviewState
 from app.services.session_store import RedisSessionStore
 
 
-async def call_summarize_node(state: InterviewState) -> dict[str, Any]:
+async def call_summarize_node(state: InterviewState, store: RedisSessionStore | None = None) -> dict[str, Any]:
     """
     If the session has a pending call summary (from post-call webhook), return it as
     assistant_reply and reply_from_call_summary=True so the graph can END and show it in chat.
-    Otherwise return {} and continue to router.
+    Otherwise return {} and continue to router. ChatService prefetches (and consumes) the summary with the
+    session state; only when it did not is the summary consumed here.
     """
     session_id = state.get("session_id")
     if not session_id:
         return {}
-    store = RedisSessionStore()
-    pending = await store.get_pending_call_summary(session_id)
+    if "pending_call_summary" in state:
+        pending = state["pending_call_summary"]
+    else:
+        pending = await (store or RedisSessionStore()).get_pending_call_summary(session_id)
     if not pending or not pending.get("summary"):
         return {}
     summary = (pending.get("summary") or "").strip()
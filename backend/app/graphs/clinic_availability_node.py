@@ -0,0 +1,200 @@
+"""
+After provider_locations: one batched Zocdoc availability lookup for every shortlisted clinic, intersected with the
+patient's availability windows, so clinics with no usable slot are pruned (or moved last) before any call is placed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+from datetime import date, datetime, timedelta
+from typing import Any
+
+from app.core.config import settings
+from app.graphs.provider_locations_node import format_clinic_section, visit_reason_id_for_specialty
+from app.graphs.state import InterviewState
+from app.services.zocdoc_client import ZocDocClient
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+ALL_DAYS = frozenset(range(7))
+# Parts of the day as minute ranges, used alone ("Monday morning") or as the open end of "until 10am".
+DAY_PARTS = {
+    "morning": (6 * 60, 12 * 60),
+    "noon": (11 * 60, 13 * 60),
+    "afternoon": (12 * 60, 17 * 60),
+    "evening": (17 * 60, 21 * 60),
+    "night": (18 * 60, 23 * 60),
+}
+# Whole words, longest first and plurals allowed, so "afternoons" is never read as "noon".
+DAY_PART_RE = re.compile(
+    r"\b(" + "|".join(sorted(DAY_PARTS, key=len, reverse=True)) + r")s?\b", re.IGNORECASE
+)
+WHOLE_DAY = (0, 24 * 60)
+TIME_RE = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?(?![\d:])", re.IGNORECASE)
+MATCHING_SLOTS_KEPT = 3
+
+# (weekdays, start minute, end minute); a slot matches when it starts inside one window.
+Window = tuple[frozenset[int], int, int]
+
+
+def _days_for(label: str) -> frozenset[int]:
+    text = label.strip().lower()
+    if "weekend" in text:
+        return frozenset({5, 6})
+    if "weekday" in text:
+        return frozenset(range(5))
+    days = frozenset(index for index, name in enumerate(WEEKDAYS) if name[:3] in text)
+    return days or ALL_DAYS
+
+
+def _minutes(hour: str, minute: str | None, meridiem: str | None) -> int:
+    value = int(hour)
+    suffix = (meridiem or "").lower().replace(".", "")
+    if suffix == "pm" and value < 12:
+        value += 12
+    elif suffix == "am" and value == 12:
+        value = 0
+    elif not suffix and 1 <= value <= 6:
+        # "3 to 6" with no am/pm means the afternoon for a clinic visit
+        value += 12
+    return value * 60 + int(minute or 0)
+
+
+def parse_time_range(text: str) -> tuple[int, int] | None:
+    """
+    Minute range for one free-text time range as the availability node keeps it ("morning until 10am", "3PM to
+    6 PM", "after 2pm", "afternoon"); None when it names no time at all or only an empty range.
+    """
+    lowered = text.lower()
+    if any(phrase in lowered for phrase in ("any time", "anytime", "all day", "whenever")):
+        return WHOLE_DAY
+    part_match = DAY_PART_RE.search(lowered)
+    part = DAY_PARTS[part_match.group(1)] if part_match else None
+    times = list(TIME_RE.finditer(lowered))
+    if len(times) >= 2:
+        first, second = times[0], times[1]
+        end = _minutes(second.group(1), second.group(2), second.group(3))
+        # "3 to 6 PM": the start shares the end's am/pm unless that puts it after the end ("11 to 2pm").
+        start = _minutes(first.group(1), first.group(2), first.group(3) or second.group(3))
+        if not first.group(3) and start >= end:
+            start = _minutes(first.group(1), first.group(2), "am")
+        return (start, end) if start < end else (start, WHOLE_DAY[1])
+    if len(times) == 1:
+        only = _minutes(times[0].group(1), times[0].group(2), times[0].group(3))
+        # A bound outside the day part ("morning after 1pm") keeps the stated time and opens the other end.
+        if re.search(r"\b(until|till|til|before|by)\b", lowered):
+            start = (part or WHOLE_DAY)[0]
+            return _ordered(start if start < only else WHOLE_DAY[0], only)
+        if re.search(r"\b(after|from|since|past)\b", lowered):
+            end = (part or WHOLE_DAY)[1]
+            return _ordered(only, end if only < end else WHOLE_DAY[1])
+        return _ordered(only, min(only + 60, WHOLE_DAY[1]))
+    return part
+
+
+def _ordered(start: int, end: int) -> tuple[int, int] | None:
+    """The range when it is non-empty; an inverted or empty one matches no slot, so it is dropped."""
+    return (start, end) if start < end else None
+
+
+def availability_windows(slots: dict[str, list[str]] | None) -> list[Window]:
+    """Windows from patient_availability_slots ({"Monday": ["morning until 10am"], "General": [...]})."""
+    windows: list[Window] = []
+    for label, ranges in (slots or {}).items():
+        days = _days_for(label)
+        for text in ranges or []:
+            # "General" entries may name their days inline ("weekday mornings").
+            text_days = _days_for(text) if days == ALL_DAYS else days
+            minutes = parse_time_range(text)
+            if minutes is not None:
+                windows.append((text_days, *minutes))
+            elif text_days != ALL_DAYS:
+                windows.append((text_days, *WHOLE_DAY))
+    return windows
+
+
+def slot_matches(start_time: str, windows: list[Window]) -> bool:
+    """Whether a slot start (ISO 8601 in provider local time) falls inside any window."""
+    try:
+        start = datetime.fromisoformat(start_time)
+    except (TypeError, ValueError):
+        return False
+    minute = start.hour * 60 + start.minute
+    return any(start.weekday() in days and begin <= minute < end for days, begin, end in windows)
+
+
+def rank_clinics(
+    results: list[dict[str, Any]],
+    slots: list[dict[str, Any]],
+    windows: list[Window],
+    *,
+    prune: bool,
+) -> tuple[list[dict[str, Any]], dict[str, int]]:
+    """
+    Annotate each clinic with its matching slots and order the list: clinics with a matching slot first (earliest
+    match first), then clinics whose availability is unknown, then clinics with slots but none matching. With
+    prune, the last group is dropped as long as some clinic still matches.
+    """
+    by_location: dict[str, list[str]] = {}
+    for slot in slots:
+        by_location.setdefault(slot.get("provider_location_id") or "", []).append(slot.get("start_time") or "")
+
+    matched: list[dict[str, Any]] = []
+    unknown: list[dict[str, Any]] = []
+    unmatched: list[dict[str, Any]] = []
+    for clinic in results:
+        starts = sorted(by_location.get(clinic.get("provider_location_id") or "", []))
+        if not starts:
+            unknown.append(clinic)
+            continue
+        matching = [start for start in starts if slot_matches(start, windows)]
+        annotated = {**clinic, "available_slot_count": len(starts), "matching_slots": matching[:MATCHING_SLOTS_KEPT]}
+        (matched if matching else unmatched).append(annotated)
+
+    matched.sort(key=lambda clinic: clinic["matching_slots"][0])
+    pruned = unmatched if prune and matched else []
+    ranked = matched + unknown + [clinic for clinic in unmatched if clinic not in pruned]
+    return ranked, {"matched": len(matched), "unknown": len(unknown), "pruned": len(pruned)}
+
+
+async def clinic_availability_node(state: InterviewState) -> dict[str, Any]:
+    """
+    Fetch availability for all shortlisted clinics in one call, keep / reorder them by overlap with
+    patient_availability_slots and rewrite the clinic list in the reply to match. Without usable windows, clinic
+    ids or a successful lookup, the shortlist is left as it is.
+    """
+    provider_search = state.get("provider_search") or {}
+    results = provider_search.get("results") or []
+    windows = availability_windows(state.get("patient_availability_slots"))
+    location_ids = [clinic["provider_location_id"] for clinic in results if clinic.get("provider_location_id")]
+    if not windows or not location_ids:
+        return {"provider_search": {**provider_search, "availability": {"status": "skipped"}}}
+
+    constraints = provider_search.get("constraints") or {}
+    visit_reason_id = constraints.get("visit_reason_id") or visit_reason_id_for_specialty(
+        constraints.get("recommended_specialty") or "Primary Care"
+    )
+    today = date.today()
+    last_day = today + timedelta(days=settings.availability_lookahead_days)
+    try:
+        slots = await asyncio.wait_for(
+            ZocDocClient().get_provider_location_availability(
+                location_ids,
+                visit_reason_id,
+                start_date_in_provider_local_time=today.isoformat(),
+                end_date_in_provider_local_time=last_day.isoformat(),
+            ),
+            settings.availability_timeout_seconds,
+        )
+    except Exception:
+        return {"provider_search": {**provider_search, "availability": {"status": "error"}}}
+
+    ranked, counts = rank_clinics(results, slots, windows, prune=settings.availability_prune_unmatched)
+    update: dict[str, Any] = {
+        "provider_search": {**provider_search, "results": ranked, "availability": {"status": "ok", **counts}},
+    }
+    reply = state.get("assistant_reply") or ""
+    old_block, new_block = format_clinic_section(results), format_clinic_section(ranked)
+    if old_block and old_block in reply:
+        update["assistant_reply"] = reply.replace(old_block, new_block)
+    return update
@@ -1,45 +1,139 @@
-MAJOR_RED_FLAGS = [
-    "trouble breathing",
-    "shortness of breath",
-    "chest pain",
-    "chest pressure",
-    "confusion",
-    "fainting",
-    "hard to wake",
-    "severe bleeding",
-    "sudden weakness",
-    "numbness",
-    "facial droop",
-    "trouble speaking",
-    "slurred speech",
-    "one-sided weakness",
-    "very high fever",
-    "severe pain",
-    "dehydration",
-    "thoughts of harming",
-    "harm yourself",
-    "harm others",
-    "suicidal thoughts",
-    "anaphylaxis",
-]
-
-HEALTH_INTENT_HINTS = [
-    "pain",
-    "ache",
-    "symptom",
-    "sick",
-    "ill",
-    "unwell",
-    "feeling",
-    "fever",
-    "cough",
-    "vomit",
-    "nausea",
-    "dizzy",
-    "headache",
-    "rash",
-    "breathing",
-]
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+LEXICON_PATH = Path(__file__).with_name("clinical_lexicon.json")
+# Tokens: words, numbers and contractions/hyphenated words ("can't", "one-sided"); clause punctuation is kept so
+# negation scope can stop at it.
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*|[.,;:!?]")
+CLAUSE_BREAKS = frozenset(".,;:!?")
+# A negation cue negates a phrase starting at most this many tokens later in the same clause ("I do not have any
+# chest pain"); conjunctions and prepositions such as "and" / "from" end the scope (lexicon negation_terminators).
+NEGATION_WINDOW = 4
+# Determiner-like cues that only negate the phrase right after them: "no chest pain", but not "no energy ... pain".
+ADJACENT_NEGATION_CUES = frozenset({"no"})
+LIST_CONNECTORS = frozenset({",", "or", "nor"})
+
+
+@dataclass(frozen=True)
+class PhraseMatch:
+    category: str  # lexicon section, e.g. "red_flags"
+    flag: str  # canonical name, e.g. "chest pain"
+    text: str  # matched surface text, e.g. "pain in my chest"
+    start: int
+    end: int
+    negated: bool = False
+
+
+def _tokens(text: str) -> list[tuple[str, int, int]]:
+    lowered = text.lower().replace("’", "'")
+    return [(match.group(), match.start(), match.end()) for match in TOKEN_RE.finditer(lowered)]
+
+
+class PhraseMatcher:
+    """
+    Multi-phrase matcher compiled into a token trie over {category: {flag: [synonyms]}}. find() walks the trie
+    from each token, so its cost depends on the message length and the longest phrase, not on how many phrases
+    are loaded. Matches are whole words, leftmost-longest and non-overlapping across all categories; each is
+    marked negated when a negation cue precedes it in its clause. category_negation_cues narrows the cues for a
+    category (red flags are only negated by an explicit denial), and a cue followed by a hedge ("not sure",
+    "don't know") expresses doubt rather than denial, so it negates nothing.
+    """
+
+    def __init__(
+        self,
+        categories: dict[str, dict[str, list[str]]],
+        negation_cues: list[str] | None = None,
+        negation_terminators: list[str] | None = None,
+        category_negation_cues: dict[str, list[str]] | None = None,
+        negation_hedges: list[str] | None = None,
+    ) -> None:
+        self._trie: dict = {}
+        for category, synonyms in categories.items():
+            for flag, phrases in synonyms.items():
+                for phrase in [flag, *phrases]:
+                    node = self._trie
+                    for token, _, _ in _tokens(phrase):
+                        node = node.setdefault(token, {})
+                    node.setdefault(None, (category, flag))
+        self._negation_cues = frozenset(negation_cues or [])
+        self._category_cues = {
+            category: frozenset(cues) for category, cues in (category_negation_cues or {}).items()
+        }
+        self._hedges = frozenset(negation_hedges or [])
+        self._terminators = frozenset(negation_terminators or []) | CLAUSE_BREAKS
+
+    def find(self, text: str) -> list[PhraseMatch]:
+        tokens = _tokens(text)
+        matches: list[PhraseMatch] = []
+        previous_end = -1
+        list_cue: str | None = None
+        index = 0
+        while index < len(tokens):
+            node = self._trie
+            longest: tuple[int, tuple[str, str]] | None = None
+            cursor = index
+            while cursor < len(tokens) and (node := node.get(tokens[cursor][0])) is not None:
+                cursor += 1
+                if None in node:
+                    longest = (cursor, node[None])
+            if longest is None:
+                index += 1
+                continue
+            end, (category, flag) = longest
+            cues = self._category_cues.get(category, self._negation_cues)
+            # "denies fever, chills or cough": a negation carries along a list of matched phrases, as long as its
+            # cue also negates this phrase's category.
+            continues_list = (
+                list_cue in cues
+                and bool(matches)
+                and matches[-1].negated
+                and all(token in LIST_CONNECTORS for token, _, _ in tokens[previous_end:index])
+            )
+            if not continues_list:
+                list_cue = self._negating_cue(tokens, index, cues)
+            negated = list_cue is not None
+            start_char, end_char = tokens[index][1], tokens[end - 1][2]
+            matches.append(PhraseMatch(category, flag, text[start_char:end_char], start_char, end_char, negated))
+            previous_end = index = end
+        return matches
+
+    def _negating_cue(self, tokens: list[tuple[str, int, int]], index: int, cues: frozenset[str]) -> str | None:
+        """The cue negating the phrase starting at tokens[index], or None."""
+        for distance in range(1, min(NEGATION_WINDOW, index) + 1):
+            token = tokens[index - distance][0]
+            if token in self._terminators:
+                return None
+            if token in cues and (distance == 1 or token not in ADJACENT_NEGATION_CUES):
+                # "not sure if it's chest pain": doubt about the phrase, not a denial of it.
+                follower = tokens[index - distance + 1][0] if distance > 1 else ""
+                return None if follower in self._hedges else token
+        return None
+
+
+def load_lexicon(path: Path = LEXICON_PATH) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+_LEXICON = load_lexicon()
+MAJOR_RED_FLAGS = list(_LEXICON["red_flags"])
+HEALTH_INTENT_HINTS = list(_LEXICON["health_intent"])
+CLINICAL_MATCHER = PhraseMatcher(
+    {"red_flags": _LEXICON["red_flags"], "health_intent": _LEXICON["health_intent"]},
+    negation_cues=_LEXICON["negation_cues"],
+    negation_terminators=_LEXICON["negation_terminators"],
+    # "never had chest pain this bad" describes the pain; only explicit denials keep a red flag from escalating.
+    category_negation_cues={"red_flags": _LEXICON["red_flag_negation_cues"]},
+    negation_hedges=_LEXICON["negation_hedges"],
+)
+# Clearly conversational openers; a message made (almost) only of these routes to normal_chat without the LLM.
+SMALL_TALK_MATCHER = PhraseMatcher({"small_talk": _LEXICON["small_talk"]})
+# Share of a message's words (ignoring fillers such as "there", "so much") small-talk phrases must cover for a
+# confident normal_chat: "hi there" qualifies, "hi, I think I broke my arm" does not.
+SMALL_TALK_MIN_COVERAGE = 0.6
+SMALL_TALK_FILLERS = frozenset(_LEXICON["small_talk_fillers"])
 
 
 def dedupe(existing: list[str], incoming: list[str]) -> list[str]:
@@ -51,11 +145,55 @@ def dedupe(existing: list[str], incoming: list[str]) -> list[str]:
     return merged
 
 
+def find_clinical_phrases(message: str) -> list[PhraseMatch]:
+    """Red flags and health-intent hints in the message with their spans, negated ones included and marked."""
+    return CLINICAL_MATCHER.find(message)
+
+
+def find_red_flags(message: str) -> list[PhraseMatch]:
+    """Red flags asserted in the message (negated mentions such as "no chest pain" are left out)."""
+    return [match for match in CLINICAL_MATCHER.find(message) if match.category == "red_flags" and not match.negated]
+
+
 def looks_like_emergency(message: str) -> bool:
-    lowered = message.lower()
-    return any(flag in lowered for flag in MAJOR_RED_FLAGS)
+    return bool(find_red_flags(message))
 
 
 def looks_like_health_concern(message: str) -> bool:
-    lowered = message.lower()
-    return any(hint in lowered for hint in HEALTH_INTENT_HINTS) or looks_like_emergency(lowered)
+    return any(not match.negated for match in CLINICAL_MATCHER.find(message))
+
+
+def keyword_intent(message: str) -> tuple[str, float]:
+    """
+    Fast first routing tier: (route_intent, confidence in 0..1). A red flag or several health hints is a confident
+    triage; a single hint is not (it may be incidental). A message that is all small talk is a confident
+    normal_chat; anything else (including a greeting followed by something else) is an uncertain normal_chat left
+    to the later tiers.
+    """
+    asserted = [match for match in CLINICAL_MATCHER.find(message) if not match.negated]
+    if any(match.category == "red_flags" for match in asserted):
+        return "triage", 1.0
+    hints = {match.flag for match in asserted}
+    if len(hints) >= 2:
+        return "triage", 0.95
+    if hints:
+        return "triage", 0.7
+    if _small_talk_coverage(message) >= SMALL_TALK_MIN_COVERAGE:
+        return "normal_chat", 0.95
+    return "normal_chat", 0.5
+
+
+def _small_talk_coverage(message: str) -> float:
+    """Fraction of the message's content words that fall inside small-talk phrases (0.0 when none match)."""
+    spans = [(match.start, match.end) for match in SMALL_TALK_MATCHER.find(message)]
+    if not spans:
+        return 0.0
+    words = [
+        (start, end)
+        for token, start, end in _tokens(message)
+        if token not in CLAUSE_BREAKS and token not in SMALL_TALK_FILLERS
+    ]
+    if not words:
+        return 0.0
+    covered = sum(1 for start, end in words if any(s <= start and end <= e for s, e in spans))
+    return covered / len(words)
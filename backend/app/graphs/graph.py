@@ -1,3 +1,4 @@
+from collections.abc import AsyncIterator
 from typing import Any
 
 from langchain_core.language_models.chat_models import BaseChatModel
@@ -7,6 +8,7 @@ from app.graphs.ask_booking_consent_node import ask_booking_consent_node
 from app.graphs.availability_node import availability_node
 from app.graphs.call_summarize_node import call_summarize_node
 from app.graphs.chief_complaint_handoff_node import chief_complaint_handoff_node
+from app.graphs.clinic_availability_node import clinic_availability_node
 from app.graphs.normal_chat_node import normal_chat_node
 from app.graphs.nurse_intake_node import nurse_intake_node
 from app.graphs.outbound_call_node import outbound_call_node
@@ -15,11 +17,15 @@ from app.graphs.rag_medlineplus_node import rag_medlineplus_node
 from app.graphs.router_node import router_node
 from app.graphs.state import InterviewState
 from app.graphs.state_verifier_node import state_verifier_node
+from app.graphs.streaming import ReplyTokenStream, to_chat_event
+from app.services.session_store import RedisSessionStore
 
 
 class TriageInterviewGraph:
-    def __init__(self, model: BaseChatModel | None) -> None:
+    def __init__(self, model: BaseChatModel | None, session_store: RedisSessionStore | None = None) -> None:
         self.model = model
+        # Shared with ChatService so nodes use the same Redis pool instead of building clients per call.
+        self.session_store = session_store
         self.graph = self._build_graph()
 
     def _build_graph(self):
@@ -57,11 +63,14 @@ class TriageInterviewGraph:
         async def _provider_locations_wrapper(state: InterviewState) -> dict[str, Any]:
             return await provider_locations_node(state)
 
+        async def _clinic_availability_wrapper(state: InterviewState) -> dict[str, Any]:
+            return await clinic_availability_node(state)
+
         async def _outbound_call_wrapper(state: InterviewState) -> dict[str, Any]:
             return await outbound_call_node(state)
 
         async def _call_summarize_wrapper(state: InterviewState) -> dict[str, Any]:
-            return await call_summarize_node(state)
+            return await call_summarize_node(state, self.session_store)
 
         async def _availability_wrapper(state: InterviewState) -> dict[str, Any]:
             return await availability_node(state, self.model)
@@ -91,6 +100,7 @@ class TriageInterviewGraph:
         workflow.add_node("ask_booking_consent_node", _ask_consent_wrapper)
         workflow.add_node("rag_medlineplus_node", _rag_wrapper)
         workflow.add_node("provider_locations_node", _provider_locations_wrapper)
+        workflow.add_node("clinic_availability_node", _clinic_availability_wrapper)
         workflow.add_node("outbound_call_node", _outbound_call_wrapper)
         workflow.add_node("call_summarize_node", _call_summarize_wrapper)
         workflow.add_node("availability_node", _availability_wrapper)
@@ -138,10 +148,25 @@ class TriageInterviewGraph:
         )
         workflow.add_edge("ask_booking_consent_node", END)
         workflow.add_edge("rag_medlineplus_node", "provider_locations_node")
-        workflow.add_edge("provider_locations_node", "outbound_call_node")
+        workflow.add_edge("provider_locations_node", "clinic_availability_node")
+        workflow.add_edge("clinic_availability_node", "outbound_call_node")
         workflow.add_edge("outbound_call_node", END)
         workflow.add_edge("emergency_escalation", END)
         return workflow.compile()
 
     async def run(self, state: InterviewState) -> InterviewState:
         return await self.graph.ainvoke(state)
+
+    async def stream(self, state: InterviewState) -> AsyncIterator[dict[str, Any]]:
+        """
+        Run the graph like run(), yielding chat events as it goes: "progress" when a node starts, "token" for
+        reply text from normal_chat_node / nurse_intake_node, and finally "state" with the final state.
+        """
+        tokens = ReplyTokenStream()
+        async for event in self.graph.astream_events(state, version="v2"):
+            if event["event"] == "on_chain_end" and not event.get("parent_ids"):
+                yield {"event": "state", "state": event["data"]["output"]}
+                continue
+            chat_event = to_chat_event(event, tokens)
+            if chat_event is not None:
+                yield chat_event
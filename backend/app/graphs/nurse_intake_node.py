@@ -3,7 +3,7 @@ from typing import Any
 from langchain_core.language_models.chat_models import BaseChatModel
 from pydantic import BaseModel, Field
 
-from app.graphs.common import dedupe, looks_like_emergency
+from app.graphs.common import dedupe, find_red_flags
 from app.graphs.state import InterviewState
 from app.utils.demo_patient import DEMO_PATIENT
 from app.utils.timeline_resolver import resolve_relative_timeline
@@ -106,13 +106,14 @@ async def nurse_intake_node(state: InterviewState, model: BaseChatModel | None)
             ]
         )
 
-    emergency_hit = extraction.emergency_escalation or looks_like_emergency(latest_message)
+    keyword_flags = [match.flag for match in find_red_flags(latest_message)]
+    emergency_hit = extraction.emergency_escalation or bool(keyword_flags)
     present = dedupe(red_flags.get("present", []), extraction.red_flags_present)
     absent = dedupe(red_flags.get("absent", []), extraction.red_flags_absent)
     unknown = dedupe(red_flags.get("unknown", []), extraction.red_flags_unknown)
 
     if emergency_hit and not present:
-        present = dedupe(present, [latest_message or "possible emergency red flag"])
+        present = dedupe(present, keyword_flags or [latest_message or "possible emergency red flag"])
 
     booking_confirmed = bool(extraction.booking_consent_given or state.get("booking_confirmed"))
     assistant_reply: str
@@ -1,16 +1,18 @@
 """
-After provider_locations: start ElevenLabs outbound call to the next clinic in the top 3.
-Call one by one; when a clinic is available and booked (via webhook), do not call the rest.
+After clinic_availability: hand the shortlisted clinics to the outbound-call dispatcher, which calls them with the
+configured strategy (sequential, staggered or parallel) until one confirms; post-call webhooks drive the rest.
+With the task queue enabled the calls are placed by the Celery worker and the turn returns without waiting.
 """
 
 from __future__ import annotations
 
+import asyncio
 from typing import Any
 
 from app.core.config import settings
 from app.graphs.state import InterviewState
-from app.services.elevenlabs_call_agent import ElevenLabsCallAgent
-from app.services.session_store import RedisSessionStore
+from app.services.call_dispatcher import OutboundCallDispatcher, get_call_dispatcher
+from app.tasks.workflows import start_outbound_calls_task
 from app.utils.demo_patient import DEMO_PATIENT
 
 # We do not override the system prompt or first message; the agent uses the
@@ -18,37 +20,26 @@ from app.utils.demo_patient import DEMO_PATIENT
 # dynamic_variables so the platform prompt can reference them (e.g. {{patient_full_name}}).
 
 
-async def outbound_call_node(state: InterviewState) -> dict[str, Any]:
+async def outbound_call_node(state: InterviewState, dispatcher: OutboundCallDispatcher | None = None) -> dict[str, Any]:
     """
-    Start one outbound call to the next clinic in provider_search.results (by outbound_call.next_clinic_index).
-    If no credentials or no clinics, return without calling. Call is placed via ElevenLabs + Twilio.
+    Start the session's clinic calls (provider_search.results, in ranked order) through the dispatcher and report
+    which clinics are being called. Without clinics nothing is called. Calls are placed via ElevenLabs + Twilio.
     """
     results = (state.get("provider_search") or {}).get("results") or []
     outbound = state.get("outbound_call") or {}
-    next_index = outbound.get("next_clinic_index", 0)
 
-    if next_index >= len(results):
+    if not results:
         return {
             "assistant_reply": (
                 "We've contacted all the clinics we had. If you didn't get a callback yet, we'll update you when the call completes."
             ),
             "outbound_call": {
                 **outbound,
-                "next_clinic_index": next_index,
                 "call_started": False,
             },
         }
-    clinic = results[next_index]
-    clinic_name = (clinic.get("doctor_name") or "the clinic").strip()
-    phone = clinic.get("phone_number") or ""
-    address = clinic.get("address") or ""
     chief_complaint = state.get("chief_complaint_handoff") or state.get("chief_complaint") or ""
 
-    call_agent = ElevenLabsCallAgent(
-        api_key=settings.elevenlabs_api_key,
-        agent_id=settings.elevenlabs_agent_id,
-        agent_phone_number_id=settings.elevenlabs_agent_phone_number_id,
-    )
     ctx = state.get("patient_context") or {}
     loc = ctx.get("location") or {}
     patient_first_name = (ctx.get("first_name") or DEMO_PATIENT["first_name"]).strip() or DEMO_PATIENT["first_name"]
@@ -60,8 +51,6 @@ async def outbound_call_node(state: InterviewState) -> dict[str, Any]:
     patient_phone = (ctx.get("phone") or DEMO_PATIENT["phone"]).strip() or DEMO_PATIENT["phone"]
     patient_availability_time = state.get("patient_availability_time") or ""
     dynamic_variables = {
-        "clinic_name": clinic_name,
-        "clinic_address": address,
         "chief_complaint": chief_complaint or "general visit",
         "patient_first_name": patient_first_name,
         "patient_last_name": patient_last_name,
@@ -72,45 +61,85 @@ async def outbound_call_node(state: InterviewState) -> dict[str, Any]:
         "patient_phone": patient_phone,
         "patient_availability_time": patient_availability_time,
     }
-    # No prompt_override or first_message: use the agent's system prompt and first message from the ElevenLabs platform.
-    result = await call_agent.start_twilio_outbound_call(
-        phone,
-        dynamic_variables=dynamic_variables,
-    )
+    # The dispatcher adds clinic_name, clinic_address and call_purpose per call. No prompt_override or
+    # first_message: use the agent's system prompt and first message from the ElevenLabs platform.
+    if dispatcher is None and settings.task_queue_enabled:
+        return await _queue_calls(state, results, dynamic_variables, outbound)
+    plan = await (dispatcher or get_call_dispatcher()).start(state.get("session_id") or "", results, dynamic_variables)
 
-    if result.get("success"):
-        conversation_id = result.get("conversation_id", "")
-        session_id = state.get("session_id")
-        if conversation_id and session_id:
-            store = RedisSessionStore()
-            await store.set_conversation_session(conversation_id, session_id)
+    calls = plan.get("calls") or []
+    live = [call for call in calls if call["status"] in ("dialing", "in_progress")]
+    failed = [call for call in calls if call["status"] == "failed"]
+    summary = [{"clinic_name": call["clinic_name"], "status": call["status"]} for call in calls]
+    progress = {
+        **outbound,
+        "strategy": plan.get("strategy", ""),
+        "calls": summary,
+        "conversation_id": next((call["conversation_id"] for call in live if call["conversation_id"]), ""),
+        "call_started": bool(live),
+    }
+    if live:
+        return {
+            "assistant_reply": _calling_reply([call["clinic_name"] for call in live]),
+            "outbound_call": {**progress, "booking_result": "pending", "last_result": {"success": True, "message": ""}},
+        }
+    if plan.get("status") == "dialing":
         return {
             "assistant_reply": (
-                f"We're calling the clinic ({clinic_name}'s office) now to check availability and book your appointment. "
-                "We'll notify you when the call is complete."
+                f"All our call lines are busy right now; we'll call {calls[0]['clinic_name']}'s office as soon as one "
+                "frees up and notify you when the call is complete."
             ),
-            "outbound_call": {
-                **outbound,
-                "next_clinic_index": next_index,
-                "conversation_id": conversation_id,
-                "call_started": True,
-                "booking_result": "pending",
-                "last_result": result,
-            },
+            "outbound_call": {**progress, "booking_result": "pending"},
         }
-    msg = result.get("message", "unknown error")
+    clinic = failed[0] if failed else calls[0]
+    msg = clinic.get("error") or "unknown error"
     hint = ""
     if "Missing" in msg or "missing" in msg.lower():
         hint = " Check that ELEVENLABS_API_KEY, ELEVENLABS_AGENT_ID, and ELEVENLABS_AGENT_PHONE_NUMBER_ID are set in your .env (see backend/docs/outbound-call-setup.md)."
     return {
         "assistant_reply": (
-            f"We couldn't start the call to {clinic_name} ({phone}). Error: {msg}.{hint} "
+            f"We couldn't start the call to {clinic['clinic_name']} ({clinic['phone']}). Error: {msg}.{hint} "
             "You can call them directly at the number above, or fix the setup and try again."
         ),
+        "outbound_call": {**progress, "last_result": {"success": False, "message": msg}},
+    }
+
+
+async def _queue_calls(
+    state: InterviewState,
+    results: list[dict[str, Any]],
+    dynamic_variables: dict[str, Any],
+    outbound: dict[str, Any],
+) -> dict[str, Any]:
+    """Enqueue the calls on the Celery worker; dial errors reach the patient later as a call summary."""
+    strategy = settings.outbound_call_strategy
+    # Publishing to the broker is blocking I/O; keep it off the event loop.
+    await asyncio.to_thread(
+        start_outbound_calls_task.delay, state.get("session_id") or "", results, dynamic_variables, strategy
+    )
+    names = [(clinic.get("doctor_name") or "the clinic").strip() for clinic in results]
+    return {
+        "assistant_reply": _calling_reply(names[:1] if strategy == "sequential" else names),
         "outbound_call": {
             **outbound,
-            "next_clinic_index": next_index,
-            "call_started": False,
-            "last_result": result,
+            "strategy": strategy,
+            "calls": [{"clinic_name": name, "status": "queued"} for name in names],
+            "conversation_id": "",
+            "call_started": True,
+            "booking_result": "pending",
+            "last_result": {"success": True, "message": ""},
         },
     }
+
+
+def _calling_reply(names: list[str]) -> str:
+    if len(names) == 1:
+        return (
+            f"We're calling the clinic ({names[0]}'s office) now to check availability and book your appointment. "
+            "We'll notify you when the call is complete."
+        )
+    return (
+        f"We're calling {len(names)} clinics now ({', '.join(names[:-1])} and {names[-1]}'s offices) to check "
+        "availability. The first one that can see you gets the booking and we'll cancel the others. "
+        "We'll notify you when it's done."
+    )
@@ -1,7 +1,8 @@
-"""After RAG: fetch top 3 provider locations (zip 30332), set results and append clinic details to assistant_reply."""
+"""After RAG: top 3 provider locations (zip 30332), reusing the RAG node's prefetch; append clinic details to assistant_reply."""
 
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Any
 
 from app.graphs.state import InterviewState
@@ -10,57 +11,81 @@ from app.services.zocdoc_client import ZocDocClient, DEFAULT_VISIT_REASON_ID, TO
 HARDCODED_ZIP = "30332"
 
 
-def _visit_reason_id_from_specialty(specialty: str) -> str:
+def visit_reason_id_for_specialty(specialty: str) -> str:
     """Map recommended_specialty to Zocdoc visit_reason_id. For now use default."""
     # Optional: expand with mapping e.g. {"Primary Care": "pc_...", "Dermatology": "pc_..."}
     return DEFAULT_VISIT_REASON_ID
 
 
-def _format_clinic_section(results: list[dict[str, Any]]) -> str:
+async def fetch_provider_locations(visit_reason_id: str) -> list[dict[str, Any]]:
+    """Top clinics near HARDCODED_ZIP for a visit reason (also used by rag_medlineplus_node to prefetch)."""
+    client = ZocDocClient()
+    results = await client.get_provider_locations(
+        HARDCODED_ZIP,
+        visit_reason_id=visit_reason_id,
+        page_size=TOP_N_PROVIDERS,
+    )
+    return results[:TOP_N_PROVIDERS]
+
+
+def _format_slot(start_time: str) -> str:
+    try:
+        return datetime.fromisoformat(start_time).strftime("%a %b %d, %I:%M %p").replace(" 0", " ")
+    except ValueError:
+        return start_time
+
+
+def format_clinic_section(results: list[dict[str, Any]]) -> str:
+    """Clinic list appended to the reply; clinics checked by clinic_availability_node show their first fitting slot."""
     if not results:
         return ""
-    lines = ["", "Here are 3 clinics near you:", ""]
+    noun = "clinic" if len(results) == 1 else "clinics"
+    lines = ["", f"Here are {len(results)} {noun} near you:", ""]
     for r in results:
         name = r.get("doctor_name") or "Provider"
         phone = r.get("phone_number") or ""
         address = r.get("address") or ""
         if phone and address:
-            lines.append(f"• {name} — {address} — Phone: {phone}")
+            line = f"• {name} — {address} — Phone: {phone}"
         elif address:
-            lines.append(f"• {name} — {address}")
+            line = f"• {name} — {address}"
         else:
-            lines.append(f"• {name}")
+            line = f"• {name}"
+        if r.get("matching_slots"):
+            line += f" — Opening that fits you: {_format_slot(r['matching_slots'][0])}"
+        lines.append(line)
     return "\n".join(lines)
 
 
 async def provider_locations_node(state: InterviewState) -> dict[str, Any]:
     """
     Use hardcoded zip 30332 and provider_search.constraints.recommended_specialty.
-    Call Zocdoc get_provider_locations, keep top 3, set provider_search.results and append clinic details to reply.
+    Reuse the clinics rag_medlineplus_node prefetched when they were fetched for the same visit reason;
+    otherwise call Zocdoc get_provider_locations. Keep top 3, set provider_search.results and append clinic
+    details to reply.
     """
-    constraints = (state.get("provider_search") or {}).get("constraints") or {}
+    provider_search = state.get("provider_search") or {}
+    constraints = provider_search.get("constraints") or {}
     specialty = (constraints.get("recommended_specialty") or "").strip() or "Primary Care"
-    visit_reason_id = _visit_reason_id_from_specialty(specialty)
+    visit_reason_id = visit_reason_id_for_specialty(specialty)
+
+    prefetched = provider_search.get("results") or []
+    if prefetched and constraints.get("visit_reason_id") == visit_reason_id:
+        results = prefetched[:TOP_N_PROVIDERS]
+    else:
+        try:
+            results = await fetch_provider_locations(visit_reason_id)
+        except Exception:
+            results = []
 
-    client = ZocDocClient()
-    try:
-        results = await client.get_provider_locations(
-            HARDCODED_ZIP,
-            visit_reason_id=visit_reason_id,
-            page_size=TOP_N_PROVIDERS,
-        )
-    except Exception:
-        results = []
-
-    results = results[:TOP_N_PROVIDERS]
     existing_reply = state.get("assistant_reply") or ""
-    clinic_block = _format_clinic_section(results)
+    clinic_block = format_clinic_section(results)
     new_reply = (existing_reply.rstrip() + clinic_block) if clinic_block else existing_reply
 
     current_ps = state.get("provider_search") or {"constraints": {}, "results": []}
     return {
         "provider_search": {
-            "constraints": {**current_ps.get("constraints", {}), **constraints},
+            "constraints": {**current_ps.get("constraints", {}), **constraints, "visit_reason_id": visit_reason_id},
             "results": results,
         },
         "assistant_reply": new_reply,
@@ -1,19 +1,25 @@
-"""Post-handoff RAG node: MedlinePlus KB search, infer provider type, Zocdoc search, set kb_evidence, provider_search, and assistant_reply."""
+"""Post-handoff RAG node: KB search, patient history and provider prefetch run concurrently; infer provider type, set kb_evidence, provider_search, and assistant_reply."""
 
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+import time
+from collections.abc import Awaitable
+from typing import Any, TypeVar
 
 from langchain_core.language_models.chat_models import BaseChatModel
 from pydantic import BaseModel, Field
 
+from app.core.config import settings
+from app.graphs.provider_locations_node import fetch_provider_locations, visit_reason_id_for_specialty
 from app.graphs.state import InterviewState
 from app.services.kb_medlineplus_service import KBMedlinePlusService
-from app.services.zocdoc_client import ZocDocClient
+from app.services.memory.memory_orchestrator import MemoryOrchestrator
+from app.services.rag_result_cache import get_rag_result_cache
 
 TOP_K = 5
-DEFAULT_ZIP = "10001"
-INSURANCE_PLACEHOLDER = "Unknown"
+
+T = TypeVar("T")
 
 
 class RecommendedProvider(BaseModel):
@@ -23,6 +29,10 @@ class RecommendedProvider(BaseModel):
     description: str = Field(description="Short patient-facing phrase, e.g. focus on allergies")
 
 
+# Returned when there is no model, no evidence or the LLM call fails; never cached.
+FALLBACK_PROVIDER = RecommendedProvider(specialty="Primary Care", description="general health concerns")
+
+
 def _build_query(state: InterviewState) -> str:
     parts = []
     complaint = state.get("chief_complaint_handoff") or state.get("chief_complaint")
@@ -49,12 +59,12 @@ def _medlineplus_block(kb_evidence: list[dict[str, Any]]) -> str:
     return "\n".join(lines)
 
 
-def _evidence_context_for_llm(evidence: list[dict[str, Any]], max_items: int = 3, text_len: int = 200) -> str:
-    """Build a short context string from top evidence for the LLM."""
+def _evidence_context_for_llm(evidence: list[dict[str, Any]], max_items: int = 3) -> str:
+    """Build a short context string from top evidence for the LLM: each topic's best-matching passage."""
     parts = []
     for item in evidence[:max_items]:
         title = item.get("title") or "Topic"
-        text = (item.get("text") or "")[:text_len]
+        text = item.get("text") or ""
         parts.append(f"- {title}: {text}")
     return "\n".join(parts) if parts else "No specific topics found."
 
@@ -63,9 +73,10 @@ async def _infer_recommended_provider(
     state: InterviewState,
     evidence: list[dict[str, Any]],
     model: BaseChatModel | None,
+    history: list[dict[str, Any]] | None = None,
 ) -> RecommendedProvider:
     if not model or not evidence:
-        return RecommendedProvider(specialty="Primary Care", description="general health concerns")
+        return FALLBACK_PROVIDER
     complaint = state.get("chief_complaint_handoff") or state.get("chief_complaint") or ""
     symptoms = state.get("symptoms") or []
     timeline = state.get("timeline") or ""
@@ -82,19 +93,15 @@ async def _infer_recommended_provider(
         f"Timeline: {timeline}\n\n"
         f"Relevant health topics:\n{context}"
     )
+    if history:
+        history_lines = "\n".join(f"- {item.get('memory_type')}: {item.get('text')}" for item in history)
+        user_content += f"\n\nRelevant patient history:\n{history_lines}"
     try:
         chain = model.with_structured_output(RecommendedProvider)
         result = await chain.ainvoke([{"role": "system", "content": prompt}, {"role": "user", "content": user_content}])
         return result
     except Exception:
-        return RecommendedProvider(specialty="Primary Care", description="general health concerns")
-
-
-def _zip_from_state(state: InterviewState) -> str:
-    loc = state.get("patient_context") or {}
-    loc = loc.get("location") or {}
-    zip_val = loc.get("zip") or ""
-    return (zip_val or DEFAULT_ZIP).strip() or DEFAULT_ZIP
+        return FALLBACK_PROVIDER
 
 
 def _build_combined_reply(
@@ -122,10 +129,64 @@ def _build_combined_reply(
     return "\n".join(blocks)
 
 
+async def _run_branch(coro: Awaitable[T], timeout: float, default: T) -> tuple[T, str, float]:
+    """Await one fan-out branch with its own deadline. Returns (result or default, status, elapsed ms)."""
+    started = time.perf_counter()
+    try:
+        result, status = await asyncio.wait_for(coro, timeout), "ok"
+    except asyncio.TimeoutError:
+        result, status = default, "timeout"
+    except Exception:
+        result, status = default, "error"
+    return result, status, round((time.perf_counter() - started) * 1000, 1)
+
+
+async def _kb_branch(
+    query: str,
+    kb: KBMedlinePlusService,
+) -> tuple[list[dict[str, Any]], dict[str, Any] | None, Any]:
+    """
+    Semantic cache lookup, else MedlinePlus search. Returns (evidence, cached recommendation or None,
+    KB version used for the cache).
+    """
+    cache = get_rag_result_cache() if settings.rag_cache_enabled else None
+    kb_version = None
+    if cache is not None:
+        try:
+            kb_version = await kb.current_version()
+            cached = await cache.lookup(query, kb_version)
+        except Exception:
+            cached = None
+        if cached is not None:
+            return cached["kb_evidence"], cached, kb_version
+    results = await kb.search(query, top_k=TOP_K)
+    # One result per topic; text is the topic's best-matching passage (capped for topics ingested before chunking).
+    evidence: list[dict[str, Any]] = [
+        {
+            "title": r.get("title"),
+            "url": r.get("url"),
+            "text": (r.get("text") or "")[: settings.kb_passage_chars],
+            "score": r.get("score"),
+        }
+        for r in results
+    ]
+    return evidence, None, kb_version
+
+
+async def _history_branch(state: InterviewState, query: str) -> list[dict[str, Any]]:
+    """Long-term memories relevant to the complaint, when the session is linked to a patient record."""
+    patient_id = (state.get("patient_context") or {}).get("patient_id")
+    if not patient_id:
+        return []
+    return await MemoryOrchestrator().search_patient_history(int(patient_id), query)
+
+
 async def rag_medlineplus_node(state: InterviewState, model: BaseChatModel | None = None) -> dict[str, Any]:
     """
-    Run after ready_for_handoff: MedlinePlus KB search, infer provider type, Zocdoc search,
-    set kb_evidence, provider_search (constraints + results), and assistant_reply.
+    Run after ready_for_handoff as a fan-out/fan-in: MedlinePlus KB search (or semantic cache hit), patient
+    history and a default-specialty provider_locations prefetch start together, each with its own timeout.
+    The LLM then infers the provider type from evidence + history. Sets kb_evidence, provider_search
+    (constraints + prefetched clinics, reused by provider_locations_node), handoff_timings and assistant_reply.
     """
     query = _build_query(state)
     kb = KBMedlinePlusService()
@@ -136,39 +197,53 @@ async def rag_medlineplus_node(state: InterviewState, model: BaseChatModel | Non
             "assistant_reply": state.get("assistant_reply")
             or "Intake complete. I couldn't search health topics right now; please talk to a provider.",
         }
-    try:
-        results = await kb.search(query, top_k=TOP_K)
-    except Exception:
-        results = []
-    evidence: list[dict[str, Any]] = [
-        {"title": r.get("title"), "url": r.get("url"), "text": (r.get("text") or "")[:500], "score": r.get("score")}
-        for r in results
-    ]
-
-    recommended = await _infer_recommended_provider(state, evidence, model)
-    specialty = recommended.specialty or "Primary Care"
-    description = recommended.description or "general health concerns"
 
-    zip_code = _zip_from_state(state)
-    zocdoc = ZocDocClient()
-    try:
-        provider_results = await zocdoc.search_doctors(
-            zip_code=zip_code,
-            specialty=specialty,
-            insurance_provider=INSURANCE_PLACEHOLDER,
+    prefetch_visit_reason_id = visit_reason_id_for_specialty(FALLBACK_PROVIDER.specialty)
+    (kb_result, kb_status, kb_ms), (history, history_status, history_ms), (clinics, clinics_status, clinics_ms) = (
+        await asyncio.gather(
+            _run_branch(_kb_branch(query, kb), settings.handoff_kb_timeout_seconds, ([], None, None)),
+            _run_branch(_history_branch(state, query), settings.handoff_history_timeout_seconds, []),
+            _run_branch(
+                fetch_provider_locations(prefetch_visit_reason_id),
+                settings.handoff_provider_timeout_seconds,
+                [],
+            ),
         )
-    except Exception:
-        provider_results = []
+    )
+    evidence, cached, kb_version = kb_result
+
+    if cached is not None and not history:
+        specialty, description = cached["specialty"], cached["description"]
+    else:
+        recommended = await _infer_recommended_provider(state, evidence, model, history)
+        specialty = recommended.specialty or FALLBACK_PROVIDER.specialty
+        description = recommended.description or FALLBACK_PROVIDER.description
+        # History makes the recommendation patient-specific; only cache what depends on the query alone.
+        if settings.rag_cache_enabled and recommended is not FALLBACK_PROVIDER and evidence and not history:
+            try:
+                await get_rag_result_cache().store(
+                    query,
+                    kb_version,
+                    {"kb_evidence": evidence, "specialty": specialty, "description": description},
+                )
+            except Exception:
+                pass
 
     constraints: dict[str, Any] = {
         "recommended_specialty": specialty,
         "description": description,
+        "visit_reason_id": prefetch_visit_reason_id,
     }
     # Reply: MedlinePlus + recommendation only; provider_locations_node appends clinic list (top 3).
     reply = _build_combined_reply(evidence, specialty, description, [])
 
     return {
         "kb_evidence": evidence,
-        "provider_search": {"constraints": constraints, "results": provider_results},
+        "provider_search": {"constraints": constraints, "results": clinics},
+        "handoff_timings": {
+            "kb": {"status": kb_status, "ms": kb_ms, "cache_hit": cached is not None},
+            "history": {"status": history_status, "ms": history_ms, "items": len(history)},
+            "provider_prefetch": {"status": clinics_status, "ms": clinics_ms},
+        },
         "assistant_reply": reply,
     }
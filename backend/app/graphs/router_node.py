@@ -3,8 +3,10 @@ from typing import Any, Literal
 from langchain_core.language_models.chat_models import BaseChatModel
 from pydantic import BaseModel
 
-from app.graphs.common import looks_like_health_concern
+from app.core.config import settings
+from app.graphs.common import keyword_intent
 from app.graphs.state import InterviewState
+from app.services.intent_classifier import get_intent_classifier, get_router_decision_log
 
 
 class RouterDecision(BaseModel):
@@ -13,29 +15,56 @@ class RouterDecision(BaseModel):
 
 
 async def router_node(state: InterviewState, model: BaseChatModel | None) -> dict[str, Any]:
+    """
+    Tiered routing: sticky triage mode, then the keyword tier, then the exemplar-embedding tier; the LLM is only
+    asked when neither local tier reaches its confidence threshold. Without a model the best local guess stands.
+    Each decision (tier, confidences) is recorded in the router decision log and returned as route_decision.
+    """
     latest_message = (state.get("latest_user_message") or "").strip()
     if state.get("conversation_mode") == "triage":
+        decision = {"route_intent": "triage", "tier": "sticky", "confidence": 1.0}
+        get_router_decision_log().record(decision)
         return {
             "route_intent": "triage",
             "conversation_mode": "triage",
+            "route_decision": decision,
         }
 
-    decision = RouterDecision(route_intent="triage" if looks_like_health_concern(latest_message) else "normal_chat")
-    if model and latest_message:
-        router = model.with_structured_output(RouterDecision)
-        decision = await router.ainvoke(
-            [
-                (
-                    "system",
-                    "Route user intent. If the message includes health complaints, symptoms, medical concern, or triage need, "
-                    "return triage. Otherwise return normal_chat.",
-                ),
-                ("user", latest_message),
-            ]
-        )
-
-    resolved_intent = decision.route_intent
+    resolved_intent, confidence = keyword_intent(latest_message)
+    decision: dict[str, Any] = {"tier": "keyword", "keyword_confidence": confidence}
+    if confidence < settings.router_keyword_confidence:
+        classifier = get_intent_classifier()
+        if latest_message and classifier.is_available:
+            try:
+                exemplar_intent, exemplar_confidence = await classifier.classify(latest_message)
+                decision["exemplar_intent"] = exemplar_intent
+                decision["exemplar_confidence"] = round(exemplar_confidence, 4)
+                if exemplar_confidence >= settings.router_exemplar_confidence:
+                    resolved_intent, confidence = exemplar_intent, exemplar_confidence
+                    decision["tier"] = "exemplar"
+            except Exception:
+                pass
+        if decision["tier"] == "keyword" and model and latest_message:
+            router = model.with_structured_output(RouterDecision)
+            llm_decision = await router.ainvoke(
+                [
+                    (
+                        "system",
+                        "Route user intent. If the message includes health complaints, symptoms, medical concern, or triage need, "
+                        "return triage. Otherwise return normal_chat.",
+                    ),
+                    ("user", latest_message),
+                ]
+            )
+            resolved_intent, confidence = llm_decision.route_intent, None
+            decision["tier"] = "llm"
+        elif decision["tier"] == "keyword":
+            decision["tier"] = "keyword_fallback"
+
+    decision.update({"route_intent": resolved_intent, "confidence": confidence})
+    get_router_decision_log().record(decision)
     return {
         "route_intent": resolved_intent,
         "conversation_mode": "triage" if resolved_intent == "triage" else "normal_chat",
+        "route_decision": decision,
     }
@@ -27,9 +27,10 @@ class RedFlagsState(TypedDict):
     unknown: list[str]
 
 
-class ProviderSearchState(TypedDict):
+class ProviderSearchState(TypedDict, total=False):
     constraints: dict[str, Any]
     results: list[dict[str, Any]]
+    availability: dict[str, Any]  # clinic_availability_node outcome: status, matched / unknown / pruned counts
 
 
 class BookingState(TypedDict):
@@ -37,11 +38,13 @@ class BookingState(TypedDict):
 
 
 class OutboundCallState(TypedDict, total=False):
-    """State for ElevenLabs outbound call flow (call clinics one by one until booked)."""
-    next_clinic_index: int  # 0-based index into provider_search.results
-    conversation_id: str  # ElevenLabs conversation_id from outbound-call response
+    """Snapshot of the session's outbound-call dispatch (the live plan is kept by the call dispatcher)."""
+    strategy: str  # sequential, staggered or parallel
+    calls: list[dict[str, Any]]  # {clinic_name, status} per shortlisted clinic, in call order
+    conversation_id: str  # ElevenLabs conversation_id of the first live call
     call_started: bool
     booking_result: str  # e.g. "booked", "not_available", "pending"
+    last_result: dict[str, Any]  # {success, message} of the dial attempt reported in the reply
 
 
 class InterviewState(TypedDict, total=False):
@@ -50,6 +53,8 @@ class InterviewState(TypedDict, total=False):
     assistant_reply: str
     conversation_mode: Literal["normal_chat", "triage"]
     route_intent: Literal["normal_chat", "triage"]
+    # Which router tier decided the last turn (sticky, keyword, exemplar, llm, keyword_fallback) and its confidence
+    route_decision: dict[str, Any]
     next_action: Literal["continue_questioning", "ready_for_handoff", "emergency_escalation"]
     needs_emergency: bool
     handoff_ready: bool
@@ -77,12 +82,15 @@ class InterviewState(TypedDict, total=False):
     problem_representation: str | None
     differential: list[dict[str, Any]]
     kb_evidence: list[dict[str, Any]]
+    # Per-branch status and latency of the handoff fan-out (kb, history, provider_prefetch)
+    handoff_timings: dict[str, Any]
     care_plan: dict[str, Any]
     provider_search: ProviderSearchState
     booking: BookingState
     booking_confirmed: bool
     outbound_call: OutboundCallState
     reply_from_call_summary: bool  # Transient: do not persist; used to route to END after Call_summarize
+    pending_call_summary: dict[str, Any] | None  # Transient: prefetched with the session state for Call_summarize
     awaiting_availability: bool
     patient_availability_slots: dict[str, list[str]] | None  # e.g. {"Monday": ["morning until 10am"], "Friday": ["3PM to 6 PM"]}
     patient_availability_time: str | None  # Formatted for ElevenLabs, e.g. "Monday morning until 10am, Friday evening from 3PM to 6 PM"
@@ -0,0 +1,100 @@
+"""Map LangGraph astream_events to chat stream events: node progress and assistant_reply tokens."""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+# Patient-facing progress line per node; nodes not listed run silently.
+NODE_PROGRESS: dict[str, str] = {
+    "call_summarize_node": "Checking for call updates",
+    "router_node": "Reading your message",
+    "nurse_intake_node": "Reviewing your symptoms",
+    "state_verifier_node": "Checking what we still need",
+    "chief_complaint_handoff_node": "Summarizing your concern",
+    "availability_node": "Noting your availability",
+    "rag_medlineplus_node": "Searching health topics",
+    "provider_locations_node": "Finding clinics",
+    "clinic_availability_node": "Checking clinic openings",
+    "outbound_call_node": "Calling the clinic",
+}
+
+# Nodes whose model output is the assistant reply. normal_chat_node streams plain text; nurse_intake_node streams
+# its structured extraction, of which only next_question is shown.
+TEXT_REPLY_NODES = frozenset({"normal_chat_node"})
+STRUCTURED_REPLY_NODES = {"nurse_intake_node": "next_question"}
+
+
+def partial_json_string(buffer: str, field: str) -> str | None:
+    """
+    Decoded prefix of a top-level string field in an incomplete JSON object, e.g. the next_question being
+    generated. None until the field's opening quote has arrived. Stops before an unfinished escape sequence.
+    """
+    marker = buffer.find(f'"{field}"')
+    if marker < 0:
+        return None
+    colon = buffer.find(":", marker + len(field) + 2)
+    start = buffer.find('"', colon + 1) if colon >= 0 else -1
+    if start < 0:
+        return None
+    index = start + 1
+    while index < len(buffer) and buffer[index] != '"':
+        if buffer[index] == "\\":
+            width = 6 if buffer[index + 1 : index + 2] == "u" else 2
+            if index + width > len(buffer):
+                break
+            index += width
+        else:
+            index += 1
+    try:
+        return json.loads(f'"{buffer[start + 1 : index]}"')
+    except ValueError:
+        return None
+
+
+def _chunk_text(chunk: Any) -> str:
+    """Text of an AIMessageChunk: string content, content blocks, or tool-call argument fragments."""
+    content = getattr(chunk, "content", "")
+    if isinstance(content, list):
+        content = "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+    if content:
+        return str(content)
+    return "".join(call.get("args") or "" for call in getattr(chunk, "tool_call_chunks", None) or [])
+
+
+class ReplyTokenStream:
+    """Turns raw model chunks from the reply nodes into incremental reply text, one buffer per model run."""
+
+    def __init__(self) -> None:
+        self._buffers: dict[str, str] = {}
+        self._emitted: dict[str, int] = {}
+
+    def feed(self, node: str, run_id: str, chunk: Any) -> str:
+        """New reply text contributed by this chunk ('' when there is none yet)."""
+        text = _chunk_text(chunk)
+        if node in TEXT_REPLY_NODES:
+            return text
+        field = STRUCTURED_REPLY_NODES.get(node)
+        if field is None or not text:
+            return ""
+        buffer = self._buffers.get(run_id, "") + text
+        self._buffers[run_id] = buffer
+        value = partial_json_string(buffer, field)
+        if value is None:
+            return ""
+        emitted = self._emitted.get(run_id, 0)
+        self._emitted[run_id] = len(value)
+        return value[emitted:]
+
+
+def to_chat_event(event: dict[str, Any], tokens: ReplyTokenStream) -> dict[str, Any] | None:
+    """Chat stream event for one astream_events (v2) event, or None when it is not shown to the patient."""
+    kind = event.get("event")
+    node = (event.get("metadata") or {}).get("langgraph_node")
+    if kind == "on_chain_start" and event.get("name") == node and node in NODE_PROGRESS:
+        return {"event": "progress", "node": node, "message": NODE_PROGRESS[node]}
+    if kind == "on_chat_model_stream" and node:
+        text = tokens.feed(node, event.get("run_id", ""), (event.get("data") or {}).get("chunk"))
+        if text:
+            return {"event": "token", "node": node, "text": text}
+    return None
@@ -1,4 +1,6 @@
 import warnings
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -12,17 +14,43 @@ from app.core.config import settings
 from app.db.base import Base
 from app.db.session import engine
 from app.models import Appointment, DoctorCandidate, InteractionLog, Patient
+from app.services.call_dispatcher import close_call_dispatcher
+from app.services.call_summary_events import close_event_bus
+from app.services.http_client import close_http_client
+from app.services.kb_medlineplus_service import KBMedlinePlusService, close_lexical_index_builds
+from app.services.memory.actian_pool import close_actian_pool, get_actian_pool
+from app.services.redis_pool import close_redis
 
 
 # Silence Pydantic serializer warnings from LangChain structured output (RouterDecision, NurseExtraction)
 warnings.filterwarnings("ignore", category=UserWarning, module="pydantic")
 
 
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    Base.metadata.create_all(bind=engine)
+    # One Actian connection pool for the whole app (memory + MedlinePlus KB).
+    await get_actian_pool().open()
+    if settings.kb_search_mode != "vector":
+        # Build the KB's BM25 index in the background now rather than inside the first patient's request.
+        await KBMedlinePlusService().warm_lexical_index()
+    try:
+        yield
+    finally:
+        await close_call_dispatcher()
+        await close_event_bus()
+        await close_lexical_index_builds()
+        await close_actian_pool()
+        await close_redis()
+        await close_http_client()
+
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title="Hacklytics GenAI Healthcare Agent",
         version="0.1.0",
         description="Proactive AI agent for symptom triage and appointment coordination.",
+        lifespan=lifespan,
     )
 
     app.add_middleware(
@@ -39,10 +67,6 @@ def create_app() -> FastAPI:
     app.include_router(chat_router, prefix="/chat", tags=["chat"])
     app.include_router(webhooks_router, prefix="/webhooks", tags=["webhooks"])
 
-    @app.on_event("startup")
-    def _startup() -> None:
-        Base.metadata.create_all(bind=engine)
-
     return app
 
 
@@ -0,0 +1,484 @@
+"""
+Outbound-call dispatcher: places the booking calls to a session's shortlisted clinics with a selectable strategy
+and tracks every call through its own state machine until one clinic confirms.
+
+- sequential: one call at a time; the next clinic is dialled when the current call ends without a booking.
+- staggered: the first clinic now, one more every OUTBOUND_STAGGER_SECONDS while nobody has confirmed.
+- parallel: every clinic at once (up to the per-session cap).
+
+The first clinic to confirm wins. Clinics not dialled yet are cancelled, live calls are hung up, and a clinic
+that confirmed after the winner gets a short follow-up call asking it to release the slot. The plan is one JSON
+value in Redis, updated under WATCH so post-call webhooks landing on different workers do not overwrite each
+other; live calls also hold a slot in a Redis hash that caps concurrent calls across all sessions and workers.
+Stagger and retry timers are asyncio tasks by default; the Celery worker passes a scheduler that enqueues them
+as delayed tasks instead, so they survive restarts.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+import orjson
+from redis.exceptions import WatchError
+
+from app.core.config import settings
+from app.services.elevenlabs_call_agent import ElevenLabsCallAgent
+from app.services.session_store import RedisSessionStore
+
+T = TypeVar("T")
+# scheduler(delay_seconds, action, session_id), action being "advance" or "widen" (see run_timer)
+Scheduler = Callable[[float, str, str], None]
+
+STRATEGIES = ("sequential", "staggered", "parallel")
+ACTIVE_CALLS_KEY = "triage:outbound_active_calls"
+# Boolean data-collection item the ElevenLabs agent fills in ("was an appointment booked?"); when it is missing
+# the analysis' call_successful verdict is used instead.
+BOOKED_DATA_ITEM = "appointment_booked"
+
+# Per-call state machine; any state without outgoing transitions is terminal.
+CALL_TRANSITIONS: dict[str, frozenset[str]] = {
+    "queued": frozenset({"dialing", "cancelled"}),
+    "dialing": frozenset({"in_progress", "failed"}),
+    "in_progress": frozenset({"confirmed", "declined", "failed", "cancelling", "release_needed"}),
+    # Hung up because another clinic won; it may still have booked before the hang-up took effect.
+    "cancelling": frozenset({"cancelled", "release_needed"}),
+    "release_needed": frozenset({"releasing", "failed"}),
+    "releasing": frozenset({"released", "failed"}),
+}
+# States that count against the per-session cap and hold a global call slot.
+LIVE_STATES = frozenset({"dialing", "in_progress", "cancelling"})
+
+
+class CallStateError(ValueError):
+    """A call was moved to a state its current state cannot reach."""
+
+
+def transition(call: dict[str, Any], status: str, **fields: Any) -> None:
+    """Move one call to status (recording when), or raise CallStateError for a transition the machine lacks."""
+    current = call["status"]
+    if status not in CALL_TRANSITIONS.get(current, frozenset()):
+        raise CallStateError(f"Call {call['index']} cannot go from {current} to {status}")
+    call.update(fields)
+    call["status"] = status
+    call["history"].append([status, round(time.time(), 3)])
+
+
+def call_outcome(body: dict[str, Any]) -> str:
+    """confirmed, declined or failed (no verdict, e.g. nobody answered) from an ElevenLabs post-call payload."""
+    analysis = body.get("analysis") or body.get("result", {}).get("analysis") or {}
+    if not isinstance(analysis, dict):
+        return "failed"
+    booked = (analysis.get("data_collection_results") or {}).get(BOOKED_DATA_ITEM)
+    if isinstance(booked, dict) and booked.get("value") is not None:
+        return "confirmed" if str(booked["value"]).strip().lower() in ("true", "yes", "1") else "declined"
+    verdict = str(analysis.get("call_successful") or "").lower()
+    if verdict == "success":
+        return "confirmed"
+    if verdict == "failure":
+        return "declined"
+    return "failed"
+
+
+def _text(value: bytes | str) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _find_call(plan: dict[str, Any], conversation_id: str) -> dict[str, Any] | None:
+    for call in plan["calls"]:
+        if conversation_id in (call.get("conversation_id"), call.get("release_conversation_id")):
+            return call
+    return None
+
+
+def patient_summary(plan: dict[str, Any] | None, conversation_id: str, summary: str) -> str | None:
+    """
+    What the chat should show after this call's post-call webhook (plan as call_ended returned it), or None to
+    leave the pending summary alone: the winning call's own summary, or once every clinic declined or failed, one
+    line per clinic. Calls that lost, were hung up or were release calls never replace it.
+    """
+    call = _find_call(plan, conversation_id) if plan else None
+    if call is None:
+        # Not a dispatched call (or its plan expired): nothing else can compete with it.
+        return summary
+    if plan["winner"] is not None:
+        return summary if plan["winner"] == call["index"] and conversation_id == call["conversation_id"] else None
+    if plan["status"] != "exhausted":
+        return None
+    lines = [
+        f"- {call['clinic_name']}: {call.get('summary') or call.get('error') or 'the call did not go through.'}"
+        for call in plan["calls"]
+    ]
+    return "None of the clinics could book the appointment.\n" + "\n".join(lines)
+
+
+class OutboundCallDispatcher:
+    """Start, advance and settle a session's clinic calls; one instance per process (get_call_dispatcher)."""
+
+    def __init__(
+        self,
+        store: RedisSessionStore | None = None,
+        call_agent: ElevenLabsCallAgent | None = None,
+        *,
+        max_calls_per_session: int | None = None,
+        max_concurrent_calls: int | None = None,
+        stagger_seconds: float | None = None,
+        scheduler: Scheduler | None = None,
+    ) -> None:
+        self.store = store or RedisSessionStore()
+        self.redis = self.store.redis
+        self.call_agent = call_agent or ElevenLabsCallAgent()
+        self.max_calls_per_session = max(
+            1, settings.outbound_max_calls_per_session if max_calls_per_session is None else max_calls_per_session
+        )
+        self.max_concurrent_calls = max(
+            1, settings.outbound_max_concurrent_calls if max_concurrent_calls is None else max_concurrent_calls
+        )
+        self.stagger_seconds = settings.outbound_stagger_seconds if stagger_seconds is None else stagger_seconds
+        self.scheduler = scheduler
+        self._timers: set[asyncio.Task] = set()
+        self.dialed = 0
+        self.confirmed = 0
+        self.declined = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.released = 0
+        self.cap_waits = 0
+
+    def _plan_key(self, session_id: str) -> str:
+        return f"triage:outbound_dispatch:{session_id}"
+
+    async def get_plan(self, session_id: str) -> dict[str, Any] | None:
+        raw = await self.redis.get(self._plan_key(session_id))
+        return orjson.loads(raw) if raw else None
+
+    async def start(
+        self,
+        session_id: str,
+        clinics: list[dict[str, Any]],
+        variables: dict[str, Any],
+        *,
+        strategy: str | None = None,
+    ) -> dict[str, Any]:
+        """
+        Queue one call per clinic (in shortlist order) and dial as many as the strategy and caps allow. A session
+        that is still dialling keeps its current plan, so a repeated turn never calls the clinics twice.
+        """
+        existing = await self.get_plan(session_id)
+        if existing and existing["status"] == "dialing":
+            return existing
+        strategy = strategy or settings.outbound_call_strategy
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown outbound call strategy {strategy!r}; expected one of {', '.join(STRATEGIES)}")
+        now = round(time.time(), 3)
+        plan = {
+            "strategy": strategy,
+            "status": "dialing",
+            "winner": None,
+            # Calls allowed to be live at once; staggered widens it on a timer.
+            "allowed": self.max_calls_per_session if strategy == "parallel" else 1,
+            "variables": variables,
+            "calls": [
+                {
+                    "index": index,
+                    "clinic_name": (clinic.get("doctor_name") or "the clinic").strip(),
+                    "clinic_address": clinic.get("address") or "",
+                    "phone": clinic.get("phone_number") or "",
+                    "status": "queued",
+                    "conversation_id": "",
+                    "call_sid": "",
+                    "history": [["queued", now]],
+                }
+                for index, clinic in enumerate(clinics)
+            ],
+        }
+        await self.redis.setex(self._plan_key(session_id), self.store.ttl_seconds, orjson.dumps(plan))
+        plan = await self._advance(session_id)
+        if strategy == "staggered" and plan and plan["status"] == "dialing":
+            self._schedule(self.stagger_seconds, "widen", session_id)
+        return plan or {}
+
+    async def call_ended(
+        self, session_id: str, conversation_id: str, outcome: str, summary: str = ""
+    ) -> dict[str, Any] | None:
+        """
+        Settle the call behind a post-call webhook (outcome from call_outcome) and act on it: the first
+        confirmation wins and cancels the rest, a late confirmation triggers a release call, and a declined or
+        failed call frees its slot for the next clinic. The booking call's summary is kept on the call for
+        patient_summary. Repeated webhooks for a settled call change nothing.
+        """
+
+        def settle(plan: dict[str, Any]) -> tuple[dict[str, Any] | None, list[str], int]:
+            call = _find_call(plan, conversation_id)
+            hang_up: list[str] = []
+            cancelled = 0
+            if call is None:
+                return None, hang_up, cancelled
+            if summary and conversation_id == call["conversation_id"]:
+                call["summary"] = summary
+            if call["status"] == "releasing" and conversation_id == call.get("release_conversation_id"):
+                transition(call, "failed" if outcome == "failed" else "released")
+            elif call["status"] == "cancelling":
+                transition(call, "release_needed" if outcome == "confirmed" else "cancelled")
+            elif call["status"] != "in_progress":
+                return None, hang_up, cancelled
+            elif outcome == "confirmed" and plan["winner"] is None:
+                transition(call, "confirmed")
+                plan["winner"] = call["index"]
+                plan["status"] = "booked"
+                for other in plan["calls"]:
+                    if other["status"] == "queued":
+                        transition(other, "cancelled")
+                        cancelled += 1
+                    elif other["status"] == "in_progress":
+                        transition(other, "cancelling")
+                        hang_up.append(other["call_sid"])
+            elif outcome == "confirmed":
+                transition(call, "release_needed")
+            else:
+                transition(call, outcome)
+            return dict(call), hang_up, cancelled
+
+        plan, settled = await self._update(session_id, settle)
+        call, hang_up, cancelled = settled or (None, [], 0)
+        if plan is None or call is None:
+            return plan
+        if call["status"] not in LIVE_STATES:
+            await self._free_slot(session_id, call["index"])
+        self._count(call["status"])
+        self.cancelled += cancelled
+        await asyncio.gather(*(self.call_agent.end_call(call_sid) for call_sid in hang_up if call_sid))
+        if call["status"] == "release_needed":
+            await self._place_release_call(session_id, call["index"])
+            plan = await self.get_plan(session_id) or plan
+        if plan["status"] == "dialing":
+            plan = await self._advance(session_id) or plan
+        return plan
+
+    async def _update(
+        self, session_id: str, mutate: Callable[[dict[str, Any]], T]
+    ) -> tuple[dict[str, Any] | None, T | None]:
+        """Apply mutate to the stored plan under WATCH; re-read and re-apply it when another worker wrote first."""
+        key = self._plan_key(session_id)
+        while True:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(key)
+                    raw = await pipe.get(key)
+                    if not raw:
+                        return None, None
+                    plan = orjson.loads(raw)
+                    result = mutate(plan)
+                    pipe.multi()
+                    pipe.setex(key, self.store.ttl_seconds, orjson.dumps(plan))
+                    await pipe.execute()
+                    return plan, result
+                except WatchError:
+                    continue
+
+    async def _advance(self, session_id: str) -> dict[str, Any] | None:
+        """Dial queued clinics while the strategy and both caps allow; mark the plan exhausted when none are left."""
+        plan = await self.get_plan(session_id)
+        if plan is None or plan["status"] != "dialing":
+            return plan
+        live = sum(1 for call in plan["calls"] if call["status"] in LIVE_STATES)
+        room = min(plan["allowed"], self.max_calls_per_session) - live
+        candidates = [call["index"] for call in plan["calls"] if call["status"] == "queued"][: max(room, 0)]
+        slotted = [index for index in candidates if await self._take_slot(session_id, index)]
+        if len(slotted) < len(candidates):
+            self.cap_waits += 1
+
+        def claim(plan: dict[str, Any]) -> list[int]:
+            if plan["status"] != "dialing":
+                return []
+            claimed = [index for index in slotted if plan["calls"][index]["status"] == "queued"]
+            for index in claimed:
+                transition(plan["calls"][index], "dialing")
+            calls = plan["calls"]
+            if not any(call["status"] in LIVE_STATES or call["status"] == "queued" for call in calls):
+                plan["status"] = "exhausted"
+            return claimed
+
+        plan, claimed = await self._update(session_id, claim)
+        claimed = claimed or []
+        for index in set(slotted) - set(claimed):
+            await self._free_slot(session_id, index)
+        if plan and plan["status"] == "dialing" and not claimed and live == 0 and candidates:
+            # Every global line is busy and nothing of ours is live to trigger the next attempt; retry later.
+            self._schedule(settings.outbound_queue_retry_seconds, "advance", session_id)
+        if claimed:
+            await asyncio.gather(*(self._dial(session_id, index) for index in claimed))
+            plan = await self.get_plan(session_id)
+        return plan
+
+    async def _widen(self, session_id: str) -> None:
+        """Staggered timer: allow one more live call and dial it, then re-arm while clinics are still queued."""
+
+        def widen(plan: dict[str, Any]) -> bool:
+            if plan["status"] != "dialing" or not any(call["status"] == "queued" for call in plan["calls"]):
+                return False
+            plan["allowed"] += 1
+            return True
+
+        _plan, widened = await self._update(session_id, widen)
+        if widened:
+            plan = await self._advance(session_id)
+            if plan and plan["status"] == "dialing" and any(call["status"] == "queued" for call in plan["calls"]):
+                self._schedule(self.stagger_seconds, "widen", session_id)
+
+    async def _dial(self, session_id: str, index: int) -> None:
+        plan = await self.get_plan(session_id)
+        if plan is None:
+            return
+        call = plan["calls"][index]
+        result = await self._start_call(plan, call, purpose="book")
+        conversation_id = result.get("conversation_id", "")
+        started = bool(result.get("success"))
+        self.dialed += started
+
+        def record(plan: dict[str, Any]) -> list[str]:
+            call = plan["calls"][index]
+            if not started:
+                transition(call, "failed", error=result.get("message", "unknown error"))
+                return []
+            transition(call, "in_progress", conversation_id=conversation_id, call_sid=result.get("callSid", ""))
+            if plan["status"] == "booked":
+                # Another clinic confirmed while this one was being dialled.
+                transition(call, "cancelling")
+                return [call["call_sid"]]
+            return []
+
+        if started and conversation_id:
+            await self.store.set_conversation_session(conversation_id, session_id)
+        _plan, hang_up = await self._update(session_id, record)
+        await asyncio.gather(*(self.call_agent.end_call(call_sid) for call_sid in hang_up or [] if call_sid))
+        if not started:
+            self.failed += 1
+            await self._free_slot(session_id, index)
+            await self._advance(session_id)
+
+    async def _place_release_call(self, session_id: str, index: int) -> None:
+        """Call back a clinic that booked after another clinic won and ask it to cancel that booking."""
+        plan = await self.get_plan(session_id)
+        if plan is None:
+            return
+        result = await self._start_call(plan, plan["calls"][index], purpose="release_slot")
+        conversation_id = result.get("conversation_id", "")
+        started = bool(result.get("success"))
+
+        def record(plan: dict[str, Any]) -> None:
+            call = plan["calls"][index]
+            if started:
+                transition(call, "releasing", release_conversation_id=conversation_id)
+            else:
+                transition(call, "failed", error=result.get("message", "unknown error"))
+
+        if started and conversation_id:
+            await self.store.set_conversation_session(conversation_id, session_id)
+        await self._update(session_id, record)
+
+    async def _start_call(self, plan: dict[str, Any], call: dict[str, Any], *, purpose: str) -> dict[str, Any]:
+        """One ElevenLabs + Twilio call; call_purpose tells the platform agent to book or to release the slot."""
+        dynamic_variables = {
+            **plan["variables"],
+            "clinic_name": call["clinic_name"],
+            "clinic_address": call["clinic_address"],
+            "call_purpose": purpose,
+        }
+        try:
+            return await self.call_agent.start_twilio_outbound_call(call["phone"], dynamic_variables=dynamic_variables)
+        except Exception as exc:
+            return {"success": False, "message": str(exc), "conversation_id": "", "callSid": ""}
+
+    async def _take_slot(self, session_id: str, index: int) -> bool:
+        """Claim one of OUTBOUND_MAX_CONCURRENT_CALLS global slots (leases expire if a webhook never arrives)."""
+        slot = f"{session_id}:{index}"
+        while True:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(ACTIVE_CALLS_KEY)
+                    now = time.time()
+                    stored = await pipe.hgetall(ACTIVE_CALLS_KEY)
+                    leases = {_text(name): float(until) for name, until in stored.items()}
+                    expired = [name for name, until in leases.items() if until <= now]
+                    if slot not in leases and len(leases) - len(expired) >= self.max_concurrent_calls:
+                        return False
+                    pipe.multi()
+                    if expired:
+                        pipe.hdel(ACTIVE_CALLS_KEY, *expired)
+                    pipe.hset(ACTIVE_CALLS_KEY, mapping={slot: now + settings.outbound_call_slot_ttl_seconds})
+                    await pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+
+    async def _free_slot(self, session_id: str, index: int) -> None:
+        await self.redis.hdel(ACTIVE_CALLS_KEY, f"{session_id}:{index}")
+
+    async def run_timer(self, session_id: str, action: str) -> None:
+        """Run a timer set by _schedule: "widen" (staggered) or "advance" (retry after the global cap was full)."""
+        if action == "widen":
+            await self._widen(session_id)
+        elif action == "advance":
+            await self._advance(session_id)
+        else:
+            raise ValueError(f"Unknown dispatcher timer {action!r}")
+
+    def _schedule(self, delay: float, action: str, session_id: str) -> None:
+        if self.scheduler is not None:
+            self.scheduler(delay, action, session_id)
+            return
+
+        async def later() -> None:
+            await asyncio.sleep(delay)
+            await self.run_timer(session_id, action)
+
+        task = asyncio.create_task(later())
+        self._timers.add(task)
+        task.add_done_callback(self._timers.discard)
+
+    def _count(self, status: str) -> None:
+        if status in ("confirmed", "declined", "failed", "cancelled", "released"):
+            setattr(self, status, getattr(self, status) + 1)
+
+    async def close(self) -> None:
+        """Cancel pending stagger / retry timers (FastAPI lifespan shutdown)."""
+        for task in list(self._timers):
+            task.cancel()
+        await asyncio.gather(*self._timers, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "dialed": self.dialed,
+            "confirmed": self.confirmed,
+            "declined": self.declined,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "released": self.released,
+            "cap_waits": self.cap_waits,
+            "pending_timers": len(self._timers),
+        }
+
+
+_dispatcher: OutboundCallDispatcher | None = None
+
+
+def get_call_dispatcher() -> OutboundCallDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = OutboundCallDispatcher()
+    return _dispatcher
+
+
+async def close_call_dispatcher() -> None:
+    global _dispatcher
+    if _dispatcher is not None:
+        dispatcher, _dispatcher = _dispatcher, None
+        await dispatcher.close()
+
+
+def reset_call_dispatcher() -> None:
+    global _dispatcher
+    _dispatcher = None
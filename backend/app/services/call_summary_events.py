@@ -1,40 +1,164 @@
-"""In-memory broadcast for 'call summary ready' so the frontend can subscribe via SSE."""
+"""
+Cross-process 'call summary ready' events for the /chat/events SSE stream, carried on one Redis stream so a webhook
+handled by any worker, pod or Celery task reaches the process holding the SSE connection.
+
+publish appends an entry (XADD, length-capped). Each process runs a single reader task that blocks on XREAD and
+fans new entries out to the local queues subscribed for that session; it stops once the last subscriber leaves.
+subscribe() also replays the session's entries after a stream ID (the SSE Last-Event-ID), or from the last
+EVENT_REPLAY_WINDOW_SECONDS without one, so an event published before the client connected is not lost.
+"""
+
+from __future__ import annotations
 
 import asyncio
+import time
 from typing import Any
 
-_listeners: dict[str, list[asyncio.Queue[Any]]] = {}
-_lock = asyncio.Lock()
+from redis import asyncio as redis_async
 
+from app.core.config import settings
+from app.services.redis_pool import get_redis
 
-async def subscribe(session_id: str) -> asyncio.Queue[Any]:
-    """Subscribe to call_summary_ready events for this session. Returns a queue that receives once."""
-    async with _lock:
-        if session_id not in _listeners:
-            _listeners[session_id] = []
-        q: asyncio.Queue[Any] = asyncio.Queue(maxsize=1)
-        _listeners[session_id].append(q)
-        return q
+STREAM_KEY = "triage:events:call_summary"
+QUEUE_SIZE = 8
 
 
-async def unsubscribe(session_id: str, queue: asyncio.Queue[Any]) -> None:
-    """Remove a subscriber."""
-    async with _lock:
-        if session_id in _listeners:
+def _text(value: bytes | str) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _message(entry_id: bytes | str, fields: dict) -> tuple[str, dict[str, Any]]:
+    decoded = {_text(name): _text(value) for name, value in fields.items()}
+    return decoded.get("session_id", ""), {"event": decoded.get("event", "message"), "id": _text(entry_id)}
+
+
+class CallSummaryEventBus:
+    """One per process (get_event_bus): local subscriber queues per session behind one Redis stream reader."""
+
+    def __init__(
+        self,
+        redis: redis_async.Redis | None = None,
+        *,
+        max_len: int | None = None,
+        block_ms: int | None = None,
+    ) -> None:
+        self.redis = redis or get_redis()
+        self.max_len = settings.event_stream_max_len if max_len is None else max_len
+        self.block_ms = settings.event_read_block_ms if block_ms is None else block_ms
+        self._queues: dict[str, list[asyncio.Queue[Any]]] = {}
+        self._reader: asyncio.Task | None = None
+        self._reader_started = asyncio.Event()
+
+    async def publish(self, session_id: str, event: str = "call_summary_ready") -> str:
+        """Append one event for the session; returns its stream ID."""
+        entry_id = await self.redis.xadd(
+            STREAM_KEY, {"session_id": session_id, "event": event}, maxlen=self.max_len, approximate=True
+        )
+        return _text(entry_id)
+
+    async def subscribe(self, session_id: str, last_event_id: str | None = None) -> asyncio.Queue[Any]:
+        """
+        Queue receiving {"event", "id"} for this session: entries after last_event_id (or from the replay window)
+        first, then live ones. Registered before the replay read, so nothing published in between is missed; an
+        entry can then arrive twice, and consumers compare ids.
+        """
+        queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._queues.setdefault(session_id, []).append(queue)
+        if self._reader is None or self._reader.done():
+            self._reader_started = asyncio.Event()
+            self._reader = asyncio.create_task(self._read(self._reader_started))
+        # The reader must have fixed its starting entry before the replay read, or entries could fall between.
+        await self._reader_started.wait()
+        start = last_event_id or f"{int((time.time() - settings.event_replay_window_seconds) * 1000)}-0"
+        for entry_id, fields in await self.redis.xrange(STREAM_KEY, min=f"({start}", max="+"):
+            entry_session, message = _message(entry_id, fields)
+            if entry_session == session_id:
+                self._offer(queue, message)
+        return queue
+
+    async def unsubscribe(self, session_id: str, queue: asyncio.Queue[Any]) -> None:
+        queues = self._queues.get(session_id, [])
+        if queue in queues:
+            queues.remove(queue)
+        if not queues:
+            self._queues.pop(session_id, None)
+        if not self._queues and self._reader is not None:
+            reader, self._reader = self._reader, None
+            reader.cancel()
+
+    async def _read(self, started: asyncio.Event) -> None:
+        # Start after the newest entry (not "$" on every call, which would skip entries added between reads).
+        try:
+            newest = await self.redis.xrevrange(STREAM_KEY, count=1)
+            last_id = _text(newest[0][0]) if newest else "0-0"
+        except Exception:
+            last_id = "$"
+        finally:
+            started.set()
+        while self._queues:
             try:
-                _listeners[session_id].remove(queue)
-            except ValueError:
-                pass
-            if not _listeners[session_id]:
-                del _listeners[session_id]
-
-
-def publish_call_summary_ready(session_id: str) -> None:
-    """Notify all subscribers for this session (call from webhook after storing summary)."""
-    if session_id not in _listeners:
-        return
-    for q in _listeners[session_id]:
+                response = await self.redis.xread({STREAM_KEY: last_id}, block=self.block_ms, count=100)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Redis unavailable: subscribers keep waiting (the frontend also polls), retry shortly.
+                await asyncio.sleep(1)
+                continue
+            for _stream, entries in response or []:
+                for entry_id, fields in entries:
+                    last_id = _text(entry_id)
+                    session_id, message = _message(entry_id, fields)
+                    for queue in self._queues.get(session_id, []):
+                        self._offer(queue, message)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue[Any], message: dict[str, Any]) -> None:
         try:
-            q.put_nowait({"event": "call_summary_ready"})
+            queue.put_nowait(message)
         except asyncio.QueueFull:
             pass
+
+    async def close(self) -> None:
+        """Stop the reader (FastAPI lifespan shutdown)."""
+        self._queues.clear()
+        if self._reader is not None:
+            reader, self._reader = self._reader, None
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+
+
+_bus: CallSummaryEventBus | None = None
+
+
+def get_event_bus() -> CallSummaryEventBus:
+    global _bus
+    if _bus is None:
+        _bus = CallSummaryEventBus()
+    return _bus
+
+
+async def close_event_bus() -> None:
+    global _bus
+    if _bus is not None:
+        bus, _bus = _bus, None
+        await bus.close()
+
+
+def reset_event_bus() -> None:
+    global _bus
+    _bus = None
+
+
+async def subscribe(session_id: str, last_event_id: str | None = None) -> asyncio.Queue[Any]:
+    """Subscribe to call_summary_ready events for this session (see CallSummaryEventBus.subscribe)."""
+    return await get_event_bus().subscribe(session_id, last_event_id)
+
+
+async def unsubscribe(session_id: str, queue: asyncio.Queue[Any]) -> None:
+    """Remove a subscriber."""
+    await get_event_bus().unsubscribe(session_id, queue)
+
+
+async def publish_call_summary_ready(session_id: str) -> str:
+    """Notify subscribers for this session in every process (call after storing the summary)."""
+    return await get_event_bus().publish(session_id)
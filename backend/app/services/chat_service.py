@@ -1,6 +1,10 @@
-import json
+import asyncio
+import weakref
+from collections.abc import AsyncIterator
+from typing import Any
 from uuid import uuid4
 
+import orjson
 from langchain_google_genai import ChatGoogleGenerativeAI
 
 from app.core.config import settings
@@ -8,6 +12,21 @@ from app.graphs.graph import TriageInterviewGraph
 from app.graphs.state import create_default_interview_state
 from app.services.session_store import RedisSessionStore
 
+# Turn-scoped keys that are never persisted or returned.
+TRANSIENT_STATE_KEYS = ("reply_from_call_summary", "pending_call_summary")
+# Streaming turns still running; held so the event loop does not drop them if the client goes away.
+_background_turns: set[asyncio.Task] = set()
+
+
+def _coalesce(messages: list[str]) -> str:
+    """One user message from several queued ones; repeated submits of the same text count once."""
+    merged: list[str] = []
+    for message in messages:
+        text = message.strip()
+        if text and (not merged or merged[-1] != text):
+            merged.append(text)
+    return "\n".join(merged)
+
 
 class ChatService:
     def __init__(self) -> None:
@@ -16,14 +35,128 @@ class ChatService:
             if settings.gemini_api_key
             else None
         )
-        self.graph = TriageInterviewGraph(self.model)
         self.session_store = RedisSessionStore()
+        self.graph = TriageInterviewGraph(self.model, session_store=self.session_store)
+        # Per-session turn serialization inside this process; the Redis lock covers other workers.
+        self._turn_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+        # session_id -> messages waiting for the next turn, each with the future its caller awaits
+        self._pending: dict[str, list[tuple[str, asyncio.Future]]] = {}
+        self._drainers: dict[str, asyncio.Task] = {}
 
     async def send_message(self, message: str, session_id: str | None = None) -> dict:
+        """
+        Run one turn for the message. Messages for a session that arrive while one of its turns is running are
+        queued; the next turn runs once with all of them joined, and every queued caller gets that turn's response.
+        """
         resolved_session_id = session_id or str(uuid4())
-        state = await self.session_store.get(resolved_session_id)
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(resolved_session_id, []).append((message, future))
+        if resolved_session_id not in self._drainers:
+            self._drainers[resolved_session_id] = asyncio.create_task(self._drain(resolved_session_id))
+        # Shielded: a caller that goes away must not cancel the result the other queued callers share.
+        return await asyncio.shield(future)
+
+    async def stream_message(self, message: str, session_id: str | None = None) -> AsyncIterator[dict[str, Any]]:
+        """
+        Streaming variant of send_message: yields "progress" and "token" events while the graph runs, then "done"
+        with the same payload send_message returns (or "error"). The graph runs in its own task, so a client that
+        disconnects mid-stream does not cancel it: the turn still completes and its state is persisted.
+        """
+        resolved_session_id = session_id or str(uuid4())
+        queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
+
+        async def _run() -> None:
+            try:
+                response = await self._run_turn(resolved_session_id, message, events=queue)
+                queue.put_nowait({"event": "done", **response})
+            except Exception as exc:
+                queue.put_nowait({"event": "error", "session_id": resolved_session_id, "message": str(exc)})
+            finally:
+                queue.put_nowait(None)
+
+        task = asyncio.create_task(_run())
+        _background_turns.add(task)
+        task.add_done_callback(_background_turns.discard)
+        while (event := await queue.get()) is not None:
+            yield event
+
+    async def _drain(self, session_id: str) -> None:
+        try:
+            while batch := self._pending.pop(session_id, None):
+                try:
+                    result = await self._run_turn(session_id, _coalesce([message for message, _ in batch]))
+                except Exception as exc:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(exc)
+                else:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_result(result)
+        finally:
+            self._drainers.pop(session_id, None)
+
+    async def _run_turn(
+        self,
+        session_id: str,
+        message: str,
+        events: asyncio.Queue | None = None,
+    ) -> dict:
+        """
+        Load, run and save one turn while holding the session lock: an in-process lock, then the Redis lock whose
+        fencing token the save is checked against (SessionBusyError if the lease was lost meanwhile). The lease is
+        renewed in the background for as long as the turn runs. With events,
+        the graph is streamed and its progress/token events are put on the queue.
+        """
+        lock = self._turn_locks.get(session_id)
+        if lock is None:
+            lock = self._turn_locks[session_id] = asyncio.Lock()
+        async with lock:
+            fence = await self.session_store.acquire_lock(
+                session_id,
+                ttl_seconds=settings.chat_session_lock_ttl_seconds,
+                wait_seconds=settings.chat_session_lock_wait_seconds,
+            )
+            state: dict = {}
+            renewer = asyncio.create_task(self._renew_lock(session_id, fence))
+            try:
+                state = await self._load_state(session_id, message)
+                if events is None:
+                    updated_state = await self.graph.run(state)
+                else:
+                    updated_state = None
+                    async for event in self.graph.stream(state):
+                        if event["event"] == "state":
+                            updated_state = event["state"]
+                        else:
+                            events.put_nowait(event)
+                    if updated_state is None:
+                        raise RuntimeError("Graph finished without a final state.")
+                return await self._save_and_respond(session_id, updated_state, fence)
+            except Exception:
+                # The prefetch already consumed the pending call summary; put it back for the next turn.
+                pending = state.get("pending_call_summary") or {}
+                if pending.get("summary"):
+                    await self.session_store.set_pending_call_summary(
+                        session_id, pending["summary"], pending.get("conversation_id", "")
+                    )
+                raise
+            finally:
+                renewer.cancel()
+                await self.session_store.release_lock(session_id, fence)
+
+    async def _renew_lock(self, session_id: str, fence: int) -> None:
+        """Keep extending the turn's lease while it runs (LLM calls plus an outbound call can outlast one lease)."""
+        ttl = settings.chat_session_lock_ttl_seconds
+        while True:
+            await asyncio.sleep(ttl / 3)
+            if not await self.session_store.renew_lock(session_id, fence, ttl_seconds=ttl):
+                return
+
+    async def _load_state(self, session_id: str, message: str) -> dict:
+        state, pending_call_summary = await self.session_store.load_turn(session_id)
         if not state:
-            state = create_default_interview_state(resolved_session_id)
+            state = create_default_interview_state(session_id)
         else:
             # Backward compatibility for sessions created before new fields existed.
             state.setdefault("conversation_mode", "normal_chat")
@@ -45,26 +178,27 @@ class ChatService:
             state.setdefault("patient_availability_slots", None)
             state.setdefault("patient_availability_time", None)
 
-        state["session_id"] = resolved_session_id
+        state["session_id"] = session_id
         state["latest_user_message"] = message
+        state["pending_call_summary"] = pending_call_summary
+        return state
 
-        updated_state = await self.graph.run(state)
-        # Do not persist transient routing flag (so next message does not immediately END)
-        if "reply_from_call_summary" in updated_state:
-            updated_state = dict(updated_state)
-            del updated_state["reply_from_call_summary"]
-        await self.session_store.set(resolved_session_id, updated_state)
+    async def _save_and_respond(self, session_id: str, updated_state: dict, fence: int | None = None) -> dict:
+        # Do not persist transient keys (e.g. the routing flag, so the next message does not immediately END)
+        if any(key in updated_state for key in TRANSIENT_STATE_KEYS):
+            updated_state = {key: value for key, value in updated_state.items() if key not in TRANSIENT_STATE_KEYS}
+        await self.session_store.set(session_id, updated_state, fence=fence)
 
         # Sanitize state for JSON response (avoid non-serializable values that could cause slow serialization or frontend freeze)
         try:
-            state_for_response = json.loads(json.dumps(updated_state, default=str))
+            state_for_response = orjson.loads(orjson.dumps(updated_state, default=str))
         except (TypeError, ValueError):
             state_for_response = dict(updated_state)
 
         outbound = updated_state.get("outbound_call") or {}
         return {
             "reply": updated_state.get("assistant_reply", ""),
-            "session_id": resolved_session_id,
+            "session_id": session_id,
             "state": state_for_response,
             "needs_emergency": bool(updated_state.get("needs_emergency")),
             "handoff_ready": bool(updated_state.get("handoff_ready")),
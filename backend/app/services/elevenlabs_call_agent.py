@@ -3,6 +3,7 @@ import re
 import httpx
 
 from app.core.config import settings
+from app.services.http_client import get_http_client
 
 
 def _normalize_phone_to_e164(phone: str) -> str:
@@ -82,20 +83,20 @@ class ElevenLabsCallAgent:
 
         headers = {"xi-api-key": self.api_key, "Content-Type": "application/json"}
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                response = await client.post(
-                    f"{self.base_url}/convai/twilio/outbound-call",
-                    json=payload,
-                    headers=headers,
-                )
-                out = response.json() if response.content else {}
-                if response.status_code >= 400:
-                    return {
-                        "success": False,
-                        "message": out.get("detail", out.get("message", f"HTTP {response.status_code}")),
-                        "conversation_id": "",
-                        "callSid": "",
-                    }
+            response = await get_http_client().post(
+                f"{self.base_url}/convai/twilio/outbound-call",
+                json=payload,
+                headers=headers,
+                timeout=30,
+            )
+            out = response.json() if response.content else {}
+            if response.status_code >= 400:
+                return {
+                    "success": False,
+                    "message": out.get("detail", out.get("message", f"HTTP {response.status_code}")),
+                    "conversation_id": "",
+                    "callSid": "",
+                }
         except httpx.HTTPError as e:
             return {
                 "success": False,
@@ -120,17 +121,35 @@ class ElevenLabsCallAgent:
             return {}
         headers = {"xi-api-key": self.api_key, "Content-Type": "application/json"}
         try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                response = await client.get(
-                    f"{self.base_url}/convai/conversations/{conversation_id}",
-                    headers=headers,
-                )
-                if response.status_code >= 400:
-                    return {}
-                return response.json() if response.content else {}
+            response = await get_http_client().get(
+                f"{self.base_url}/convai/conversations/{conversation_id}",
+                headers=headers,
+                timeout=15,
+            )
+            if response.status_code >= 400:
+                return {}
+            return response.json() if response.content else {}
         except httpx.HTTPError:
             return {}
 
+    async def end_call(self, call_sid: str) -> bool:
+        """
+        Hang up a live outbound call through Twilio (POST Calls/{sid} with Status=completed); ElevenLabs places the
+        call on the connected Twilio number, so its callSid is a Twilio call. False without credentials or on error.
+        """
+        if not call_sid or not settings.twilio_account_sid or not settings.twilio_auth_token:
+            return False
+        try:
+            response = await get_http_client().post(
+                f"https://api.twilio.com/2010-04-01/Accounts/{settings.twilio_account_sid}/Calls/{call_sid}.json",
+                data={"Status": "completed"},
+                auth=(settings.twilio_account_sid, settings.twilio_auth_token),
+                timeout=15,
+            )
+        except httpx.HTTPError:
+            return False
+        return response.status_code < 400
+
     async def verify_and_book(self, appointment_payload: dict) -> dict:
         if not self.api_key or not self.agent_id:
             return {
@@ -153,14 +172,14 @@ class ElevenLabsCallAgent:
             },
         }
 
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.post(
-                f"{self.base_url}/convai/batch-calls",
-                json=request_body,
-                headers=headers,
-            )
-            response.raise_for_status()
-            payload = response.json()
+        response = await get_http_client().post(
+            f"{self.base_url}/convai/batch-calls",
+            json=request_body,
+            headers=headers,
+            timeout=30,
+        )
+        response.raise_for_status()
+        payload = response.json()
 
         return {
             "call_status": payload.get("status", "submitted"),
@@ -1,6 +1,5 @@
-import httpx
-
 from app.core.config import settings
+from app.services.http_client import oauth_get_json
 
 
 class EpicFhirClient:
@@ -20,17 +19,7 @@ class EpicFhirClient:
                 "notes": "Sandbox history payload.",
             }
 
-        token = await self._get_access_token()
-        headers = {"Authorization": f"Bearer {token}"}
-
-        async with httpx.AsyncClient(timeout=20) as client:
-            conditions_response = await client.get(
-                f"{self.base_url}/Condition",
-                headers=headers,
-                params={"patient": epic_patient_id},
-            )
-            conditions_response.raise_for_status()
-            conditions_payload = conditions_response.json()
+        conditions_payload = await self._get("/Condition", {"patient": epic_patient_id})
 
         conditions = [
             entry.get("resource", {}).get("code", {}).get("text", "Unknown condition")
@@ -39,16 +28,11 @@ class EpicFhirClient:
 
         return {"allergies": [], "conditions": conditions, "notes": "Fetched from Epic FHIR."}
 
-    async def _get_access_token(self) -> str:
-        async with httpx.AsyncClient(timeout=20) as client:
-            response = await client.post(
-                f"{self.base_url}/oauth2/token",
-                data={
-                    "grant_type": "client_credentials",
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                },
-            )
-            response.raise_for_status()
-            return response.json()["access_token"]
-
+    async def _get(self, path: str, params: dict) -> dict:
+        return await oauth_get_json(
+            f"{self.base_url}{path}",
+            token_url=f"{self.base_url}/oauth2/token",
+            client_id=self.client_id,
+            client_secret=self.client_secret,
+            params=params,
+        )
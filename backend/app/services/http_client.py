@@ -0,0 +1,159 @@
+"""
+Process-wide httpx client for outbound integrations (Zocdoc, Epic FHIR, ElevenLabs) and a cache of OAuth
+client-credentials tokens, so provider calls reuse pooled keep-alive connections and one token per client.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+import httpx
+
+from app.core.config import settings
+from app.services.single_flight import SingleFlight
+
+try:
+    import h2  # noqa: F401  (httpx negotiates HTTP/2 only when the h2 package is installed)
+
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - fallback runtime
+    HTTP2_AVAILABLE = False
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared client; per-request timeouts are passed by callers, the pool limits come from settings."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=settings.http2_enabled and HTTP2_AVAILABLE,
+            timeout=settings.http_timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+                keepalive_expiry=settings.http_keepalive_expiry_seconds,
+            ),
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client (FastAPI lifespan shutdown)."""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+
+@dataclass
+class _CachedToken:
+    access_token: str
+    expires_at: float
+
+
+class OAuthTokenManager:
+    """
+    Client-credentials tokens cached per (token URL, client id) until refresh_margin seconds before they expire.
+    Refresh is single-flight: concurrent callers needing the same token wait on one request to the token
+    endpoint instead of each starting their own. invalidate() drops a token the API rejected (401).
+    """
+
+    def __init__(self, refresh_margin_seconds: float | None = None, default_ttl_seconds: float | None = None) -> None:
+        self.refresh_margin_seconds = (
+            settings.oauth_token_refresh_margin_seconds if refresh_margin_seconds is None else refresh_margin_seconds
+        )
+        self.default_ttl_seconds = (
+            settings.oauth_token_default_ttl_seconds if default_ttl_seconds is None else default_ttl_seconds
+        )
+        self._tokens: dict[tuple[str, str], _CachedToken] = {}
+        self._refreshing: SingleFlight[str] = SingleFlight()
+        self.hits = 0
+        self.fetches = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    async def get_token(self, token_url: str, client_id: str, client_secret: str) -> str:
+        key = (token_url, client_id)
+        cached = self._tokens.get(key)
+        if cached is not None and time.monotonic() < cached.expires_at - self.refresh_margin_seconds:
+            self.hits += 1
+            return cached.access_token
+
+        async def refresh() -> str:
+            try:
+                token = await self._fetch(token_url, client_id, client_secret)
+            except Exception:
+                self.failures += 1
+                raise
+            self._tokens[key] = token
+            return token.access_token
+
+        if key in self._refreshing:
+            self.coalesced += 1
+        return await self._refreshing.run(key, refresh)
+
+    def invalidate(self, token_url: str, client_id: str) -> None:
+        self._tokens.pop((token_url, client_id), None)
+
+    async def _fetch(self, token_url: str, client_id: str, client_secret: str) -> _CachedToken:
+        self.fetches += 1
+        response = await get_http_client().post(
+            token_url,
+            data={
+                "grant_type": "client_credentials",
+                "client_id": client_id,
+                "client_secret": client_secret,
+            },
+        )
+        response.raise_for_status()
+        payload = response.json()
+        expires_in = float(payload.get("expires_in") or self.default_ttl_seconds)
+        return _CachedToken(payload["access_token"], time.monotonic() + expires_in)
+
+    def stats(self) -> dict:
+        return {
+            "cached_tokens": len(self._tokens),
+            "hits": self.hits,
+            "fetches": self.fetches,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+        }
+
+
+_token_manager: OAuthTokenManager | None = None
+
+
+def get_token_manager() -> OAuthTokenManager:
+    global _token_manager
+    if _token_manager is None:
+        _token_manager = OAuthTokenManager()
+    return _token_manager
+
+
+async def oauth_get_json(
+    url: str,
+    *,
+    token_url: str,
+    client_id: str,
+    client_secret: str,
+    params: dict | None = None,
+) -> dict:
+    """GET with a cached client-credentials bearer token; a 401 drops the token and retries once with a new one."""
+    tokens = get_token_manager()
+    for attempt in range(2):
+        token = await tokens.get_token(token_url, client_id, client_secret)
+        response = await get_http_client().get(url, headers={"Authorization": f"Bearer {token}"}, params=params)
+        if response.status_code != httpx.codes.UNAUTHORIZED or attempt:
+            break
+        tokens.invalidate(token_url, client_id)
+    response.raise_for_status()
+    return response.json()
+
+
+def reset_http_clients() -> None:
+    """Forget the shared client and cached tokens (tests; each test runs on its own event loop)."""
+    global _client, _token_manager
+    _client = None
+    _token_manager = None
@@ -0,0 +1,157 @@
+"""Second routing tier: nearest labelled exemplars by embedding similarity, plus a log of routing decisions."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+from collections import Counter, deque
+
+import numpy as np
+
+from app.services.memory.embedding_service import EmbeddingService
+
+EXEMPLARS: dict[str, list[str]] = {
+    "triage": [
+        "I have had a bad headache since yesterday",
+        "my throat is sore and it hurts to swallow",
+        "I keep throwing up and can't keep food down",
+        "there is a rash on my arm that itches",
+        "my stomach hurts after I eat",
+        "I twisted my ankle and it is swollen",
+        "I have been coughing for a week",
+        "my child has a fever",
+        "I feel dizzy when I stand up",
+        "my back has been hurting for days",
+        "I think I have an ear infection",
+        "I need to see a doctor about my knee",
+    ],
+    "normal_chat": [
+        "hello, how are you today",
+        "thanks for your help",
+        "tell me a fun fact",
+        "what can you help me with",
+        "what's the weather like",
+        "can you recommend a good book",
+        "how do I stay productive at work",
+        "tell me a joke",
+        "what are some healthy breakfast ideas",
+        "how much water should I drink a day",
+        "who built this app",
+        "good night",
+    ],
+}
+# Mean of the k best exemplar similarities per label; the label margin is squashed with this scale.
+TOP_K = 3
+MARGIN_SCALE = 20.0
+RECENT_DECISIONS = 200
+
+
+class ExemplarIntentClassifier:
+    """
+    Classifies a message as triage / normal_chat by cosine similarity to EXEMPLARS. Exemplars are embedded once
+    per process. Needs a real embedding model: the deterministic offline embeddings carry no meaning, so without
+    an OpenAI key the classifier reports itself unavailable and the router skips this tier.
+    """
+
+    def __init__(
+        self,
+        embedding: EmbeddingService | None = None,
+        exemplars: dict[str, list[str]] | None = None,
+    ) -> None:
+        self._embedding = embedding
+        self.exemplars = exemplars or EXEMPLARS
+        self._labels: list[str] = []
+        self._matrix: np.ndarray | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def embedding(self) -> EmbeddingService:
+        if self._embedding is None:
+            self._embedding = EmbeddingService()
+        return self._embedding
+
+    @property
+    def is_available(self) -> bool:
+        return self.embedding.client is not None
+
+    async def classify(self, message: str) -> tuple[str, float]:
+        """(label, confidence in 0.5..1) for the label whose closest exemplars are most similar."""
+        matrix = await self._exemplar_matrix()
+        query = self._normalize(np.asarray(await self.embedding.embed_text(message), dtype=np.float32))
+        if query is None:
+            return "normal_chat", 0.5
+        similarities = matrix @ query
+        scores: dict[str, float] = {}
+        for label in self.exemplars:
+            label_scores = similarities[[i for i, item in enumerate(self._labels) if item == label]]
+            k = min(TOP_K, len(label_scores))
+            scores[label] = float(np.mean(np.partition(label_scores, -k)[-k:]))
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        margin = ranked[0][1] - ranked[1][1] if len(ranked) > 1 else ranked[0][1]
+        return ranked[0][0], 1.0 / (1.0 + math.exp(-MARGIN_SCALE * margin))
+
+    async def _exemplar_matrix(self) -> np.ndarray:
+        if self._matrix is not None:
+            return self._matrix
+        async with self._lock:
+            if self._matrix is None:
+                labels = [label for label, texts in self.exemplars.items() for _ in texts]
+                texts = [text for texts in self.exemplars.values() for text in texts]
+                vectors = await self.embedding.embed_many(texts)
+                rows = [self._normalize(np.asarray(vector, dtype=np.float32)) for vector in vectors]
+                self._labels = [label for label, row in zip(labels, rows) if row is not None]
+                self._matrix = np.stack([row for row in rows if row is not None])
+        return self._matrix
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray | None:
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+
+class RouterDecisionLog:
+    """Counts of which tier answered plus the most recent decisions with their confidences, for threshold tuning."""
+
+    def __init__(self, max_recent: int = RECENT_DECISIONS) -> None:
+        self.tiers: Counter[str] = Counter()
+        self.intents: Counter[str] = Counter()
+        self.recent: deque[dict] = deque(maxlen=max_recent)
+
+    def record(self, decision: dict) -> None:
+        self.tiers[decision["tier"]] += 1
+        self.intents[decision["route_intent"]] += 1
+        self.recent.append(decision)
+
+    def stats(self) -> dict:
+        total = sum(self.tiers.values())
+        return {
+            "decisions": total,
+            "tiers": dict(self.tiers),
+            "intents": dict(self.intents),
+            "llm_rate": round(self.tiers["llm"] / total, 4) if total else 0.0,
+            "recent": list(self.recent),
+        }
+
+
+_default_classifier: ExemplarIntentClassifier | None = None
+_decision_log: RouterDecisionLog | None = None
+
+
+def get_intent_classifier() -> ExemplarIntentClassifier:
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = ExemplarIntentClassifier()
+    return _default_classifier
+
+
+def get_router_decision_log() -> RouterDecisionLog:
+    global _decision_log
+    if _decision_log is None:
+        _decision_log = RouterDecisionLog()
+    return _decision_log
+
+
+def reset_intent_router() -> None:
+    global _default_classifier, _decision_log
+    _default_classifier = None
+    _decision_log = None
@@ -1,9 +1,19 @@
-"""MedlinePlus knowledge base: Actian Vector collection + semantic search."""
+"""MedlinePlus knowledge base: Actian Vector collection (or the local NumPy store without cortex) + hybrid search."""
 
 from __future__ import annotations
 
+import asyncio
+import time
+
+from redis.exceptions import RedisError
+
 from app.core.config import settings
+from app.services.lexical_index import BM25Index, get_lexical_index, reciprocal_rank_fusion
+from app.services.memory.actian_pool import ActianConnectionPool, get_actian_pool
+from app.services.memory.collection_registry import CollectionRegistry, get_collection_registry
 from app.services.memory.embedding_service import EmbeddingService
+from app.services.memory.local_vector_store import LocalVectorStore, get_local_vector_store
+from app.services.redis_pool import get_redis
 
 try:
     from cortex import AsyncCortexClient, DistanceMetric
@@ -11,50 +21,132 @@ except ImportError:
     AsyncCortexClient = None
     DistanceMetric = None
 
+SEARCH_MODES = ("hybrid", "vector", "lexical")
+
+# collection -> (checked_at, version); the KB version is bumped in Redis by each ingest run that changes topics.
+_versions: dict[str, tuple[float, str | None]] = {}
+# collection -> the running lexical index build (one per process, see warm_lexical_index)
+_index_builds: dict[str, asyncio.Task] = {}
+
+
+def topic_key(item: dict) -> str:
+    """Natural key for a topic (CSV row or stored payload): MedlinePlus id, else its URL, else its title."""
+    return str(item.get("topic_key") or item.get("id") or item.get("url") or item.get("title") or "").strip()
+
+
+def passage_key(key: str, passage_index: int) -> str:
+    return f"{key}#{passage_index}"
+
+
+def _passage_key_of(item: dict) -> str:
+    return passage_key(topic_key(item), item.get("passage_index", 0))
+
+
+def _collapse_to_topics(ranked: list[dict]) -> list[dict]:
+    """Keep the best-ranked passage of each topic, preserving rank order."""
+    topics: dict[str, dict] = {}
+    for item in ranked:
+        topics.setdefault(topic_key(item), item)
+    return list(topics.values())
+
 
 class KBMedlinePlusService:
-    """Ensure MedlinePlus collection exists and run semantic search by query text."""
+    """
+    Ensure MedlinePlus collection exists and run search by query text. The collection holds overlapping
+    passages per topic; search ranks passages and collapses them to topics, each with its best passage as
+    "text". Hybrid mode (default) fuses dense results with an in-process BM25 index over the same passages
+    using reciprocal-rank fusion, so short keyword queries still find exact-term topics. The index is built in
+    the background at startup and after each KB version change; until it is ready hybrid serves vector results.
+    """
 
-    def __init__(self) -> None:
+    def __init__(self, pool: ActianConnectionPool | None = None) -> None:
         self.host = settings.actian_host
         self.collection = settings.medlineplus_collection
         self.vector_dim = settings.memory_vector_dimension
+        self.pool = pool or get_actian_pool()
+        self.registry = CollectionRegistry(pool) if pool else get_collection_registry()
+        self.search_mode = settings.kb_search_mode
+        self.candidate_depth = settings.kb_hybrid_candidate_depth
+        self.rrf_k = settings.kb_rrf_k
         self._embedding = EmbeddingService()
 
     @property
-    def is_available(self) -> bool:
+    def uses_actian(self) -> bool:
         return AsyncCortexClient is not None
 
+    @property
+    def local_store(self) -> LocalVectorStore | None:
+        return None if self.uses_actian else get_local_vector_store(self.collection, self.vector_dim)
+
+    @property
+    def lexical_index(self) -> BM25Index:
+        return get_lexical_index(self.collection)
+
+    @property
+    def is_available(self) -> bool:
+        """True when searches can be served, from Actian or from the local store."""
+        return True
+
     async def ensure_collection(self) -> None:
-        """Create the MedlinePlus collection on Actian if it does not exist."""
-        if not self.is_available:
+        """Create the MedlinePlus collection on Actian if it does not exist (checked once per process)."""
+        if not self.uses_actian:
             return
-        async with AsyncCortexClient(self.host) as client:
-            exists = await client.has_collection(self.collection)
-            if not exists:
-                await client.create_collection(
-                    name=self.collection,
-                    dimension=self.vector_dim,
-                    distance_metric=DistanceMetric.COSINE,
-                )
-
-    async def search(self, query_text: str, top_k: int = 5) -> list[dict]:
+        await self.registry.ensure(self.collection, self.vector_dim, DistanceMetric.COSINE)
+
+    async def search(self, query_text: str, top_k: int = 5, *, mode: str | None = None) -> list[dict]:
         """
-        Embed query_text, search the MedlinePlus collection, return list of payloads with score.
-        Each item is a dict with at least title, url, text, score (and any stored payload fields).
+        Search the MedlinePlus collection, return one payload per topic with score, best first.
+        Each item is a dict with at least title, url, text (the best-matching passage), score (and any stored
+        payload fields such as passage_index).
+        mode: "hybrid" (RRF of dense + BM25, score is the fused score), "vector" or "lexical"; default KB_SEARCH_MODE.
         """
         if not query_text or not (query_text := query_text.strip()):
             return []
         if not self.is_available:
             return []
+        mode = mode or self.search_mode
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown KB search mode '{mode}', expected one of {SEARCH_MODES}.")
+        depth = max(top_k, self.candidate_depth)
+        if mode == "vector":
+            return _collapse_to_topics(await self._vector_search(query_text, depth))[:top_k]
+
+        index = await self.warm_lexical_index(wait=mode == "lexical")
+        if index is None:
+            return _collapse_to_topics(await self._vector_search(query_text, depth))[:top_k]
+        lexical_passages = [{**payload, "score": score} for score, _, payload in index.search(query_text, depth)]
+        if mode == "lexical":
+            return _collapse_to_topics(lexical_passages)[:top_k]
+
+        dense_passages = await self._vector_search(query_text, depth)
+        # Rank topics by RRF over the collapsed rankings; attach each topic's passage with the best passage-level RRF.
+        passages = {_passage_key_of(item): item for item in lexical_passages + dense_passages}
+        best_passage: dict[str, dict] = {}
+        for key, _ in reciprocal_rank_fusion(
+            [[_passage_key_of(item) for item in dense_passages], [_passage_key_of(item) for item in lexical_passages]],
+            k=self.rrf_k,
+        ):
+            best_passage.setdefault(topic_key(passages[key]), passages[key])
+        fused = reciprocal_rank_fusion(
+            [
+                [topic_key(item) for item in _collapse_to_topics(dense_passages)],
+                [topic_key(item) for item in _collapse_to_topics(lexical_passages)],
+            ],
+            k=self.rrf_k,
+        )
+        return [{**best_passage[key], "score": score} for key, score in fused[:top_k]]
+
+    async def _vector_search(self, query_text: str, top_k: int) -> list[dict]:
         query_vector = await self._embedding.embed_text(query_text)
-        async with AsyncCortexClient(self.host) as client:
-            results = await client.search(
-                self.collection,
-                query=query_vector,
-                top_k=top_k,
-                with_payload=True,
-            )
+        if not self.uses_actian:
+            return [{**payload, "score": score} for score, payload in self.local_store.search(query_vector, top_k)]
+        results = await self.pool.call(
+            "search",
+            self.collection,
+            query=query_vector,
+            top_k=top_k,
+            with_payload=True,
+        )
         out: list[dict] = []
         for item in results:
             payload = getattr(item, "payload", None) or {}
@@ -62,6 +154,73 @@ class KBMedlinePlusService:
             out.append({**payload, "score": score})
         return out
 
+    async def warm_lexical_index(self, *, wait: bool = False) -> BM25Index | None:
+        """
+        The BM25 index when it is built for the current KB version. Otherwise one build per process is started in
+        the background (payloads paged from the collection, tokenizing in a worker thread), and this returns None
+        right away, or the index once that build finished with wait. Called at startup to warm the index.
+        """
+        index = self.lexical_index
+        version = await self.current_version()
+        if index.built and index.version == version:
+            return index
+        build = _index_builds.get(self.collection)
+        if build is None or build.done() or build.get_loop() is not asyncio.get_running_loop():
+            build = asyncio.create_task(self._build_lexical_index(index, version))
+            # Retrieve a failure so it is not reported as unhandled; the next search starts another build.
+            build.add_done_callback(lambda task: task.cancelled() or task.exception())
+            _index_builds[self.collection] = build
+        if not wait:
+            return None
+        # A caller that gives up (e.g. the handoff timeout) must not cancel the build other searches wait for.
+        await asyncio.shield(build)
+        return index
+
+    async def _build_lexical_index(self, index: BM25Index, version: str | None) -> None:
+        generation = index.generation
+        payloads = await self._all_payloads()
+        fresh = BM25Index(index.k1, index.b)
+        await asyncio.to_thread(fresh.build, [(_passage_key_of(payload), payload) for payload in payloads], version)
+        # A write during the build invalidated the index; leave it unbuilt so the next search rebuilds it.
+        if index.generation == generation:
+            index.adopt(fresh)
+
+    async def _all_payloads(self) -> list[dict]:
+        if not self.uses_actian:
+            return self.local_store.all_payloads()
+        payloads: list[dict] = []
+        async for rows in self.pool.scroll_all(self.collection):
+            payloads.extend(getattr(row, "payload", None) or {} for row in rows)
+        return payloads
+
+    @property
+    def _version_key(self) -> str:
+        return f"kb:version:{self.collection}"
+
+    async def current_version(self) -> str | None:
+        """KB version from Redis, re-read at most every KB_VERSION_CHECK_INTERVAL_SECONDS (None if unknown)."""
+        now = time.monotonic()
+        cached = _versions.get(self.collection)
+        if cached is not None and now - cached[0] < settings.kb_version_check_interval_seconds:
+            return cached[1]
+        try:
+            version = await get_redis().get(self._version_key)
+            if isinstance(version, bytes):
+                version = version.decode("utf-8")
+        except RedisError:
+            version = cached[1] if cached else None
+        _versions[self.collection] = (now, version)
+        return version
+
+    async def bump_version(self) -> None:
+        """Mark the KB as changed so other processes rebuild derived state (lexical index) on their next check."""
+        _versions.pop(self.collection, None)
+        self.lexical_index.invalidate()
+        try:
+            await get_redis().incr(self._version_key)
+        except RedisError:
+            pass
+
     async def batch_upsert(
         self,
         ids: list[int],
@@ -71,5 +230,33 @@ class KBMedlinePlusService:
         """Insert or update vectors in the MedlinePlus collection. Used by ingest script."""
         if not self.is_available or not ids:
             return
-        async with AsyncCortexClient(self.host) as client:
-            await client.batch_upsert(self.collection, ids, vectors, payloads)
+        self.lexical_index.invalidate()
+        if not self.uses_actian:
+            self.local_store.upsert_many([str(item_id) for item_id in ids], vectors, payloads)
+            return
+        await self.registry.run(
+            self.collection,
+            self.vector_dim,
+            DistanceMetric.COSINE,
+            lambda: self.pool.call("batch_upsert", self.collection, ids, vectors, payloads),
+        )
+
+    async def delete(self, ids: list[int]) -> None:
+        """Remove topics from the MedlinePlus collection (ingest drops topics that left the CSV)."""
+        if not ids:
+            return
+        self.lexical_index.invalidate()
+        if not self.uses_actian:
+            self.local_store.delete([str(item_id) for item_id in ids])
+            return
+        await self.registry.ensure(self.collection, self.vector_dim, DistanceMetric.COSINE)
+        await asyncio.gather(*(self.pool.call("delete", self.collection, item_id) for item_id in ids))
+
+
+async def close_lexical_index_builds() -> None:
+    """Cancel lexical index builds still running (FastAPI lifespan shutdown, before the Actian pool closes)."""
+    builds = list(_index_builds.values())
+    _index_builds.clear()
+    for build in builds:
+        build.cancel()
+    await asyncio.gather(*builds, return_exceptions=True)
@@ -0,0 +1,121 @@
+"""In-process BM25 inverted index over MedlinePlus payloads, fused with dense search by reciprocal-rank fusion."""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+from collections import Counter
+
+TOKEN_RE = re.compile(r"[a-z][a-z0-9'-]+")
+STOPWORDS = frozenset(
+    "about after again also and any are been before being but can could did does doing down during each for from "
+    "had has have having her here him his how into its just more most not now off once only other our out over own "
+    "same she should some such than that the their them then there these they this those through too under until "
+    "very was were what when where which while who whom why will with would you your yesterday today week weeks "
+    "day days month months ago".split()
+)
+# Title terms count this many times in a document; a term in the title is a strong topic signal.
+TITLE_WEIGHT = 3
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_RE.findall((text or "").lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over title + text. Documents are keyed by passage key; postings map term -> {doc: term frequency}.
+    Rebuilt from the collection's payloads rather than updated in place (the KB changes only on ingest); a build
+    can run on a fresh index in a worker thread and be swapped in with adopt().
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.version: str | None = None
+        self.built = False
+        # Bumped by invalidate(), so a build that started before a write can tell its result is stale.
+        self.generation = 0
+        self._postings: dict[str, dict[int, int]] = {}
+        self._doc_lengths: list[int] = []
+        self._keys: list[str] = []
+        self._payloads: list[dict] = []
+        self._avg_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def build(self, documents: list[tuple[str, dict]], version: str | None = None) -> None:
+        """Replace the index with (key, payload) documents; later duplicates of a key win."""
+        by_key = dict(documents)
+        self._postings = {}
+        self._doc_lengths = []
+        self._keys = []
+        self._payloads = []
+        for doc, (key, payload) in enumerate(by_key.items()):
+            terms = tokenize(payload.get("title") or "") * TITLE_WEIGHT + tokenize(payload.get("text") or "")
+            for term, frequency in Counter(terms).items():
+                self._postings.setdefault(term, {})[doc] = frequency
+            self._doc_lengths.append(len(terms))
+            self._keys.append(key)
+            self._payloads.append(payload)
+        self._avg_length = sum(self._doc_lengths) / len(self._doc_lengths) if self._doc_lengths else 0.0
+        self.version = version
+        self.built = True
+
+    def adopt(self, other: BM25Index) -> None:
+        """Take over a built index's contents in one step (searches never see a half-built index)."""
+        self._postings = other._postings
+        self._doc_lengths = other._doc_lengths
+        self._keys = other._keys
+        self._payloads = other._payloads
+        self._avg_length = other._avg_length
+        self.version = other.version
+        self.built = other.built
+
+    def invalidate(self) -> None:
+        self.built = False
+        self.generation += 1
+
+    def search(self, query: str, top_k: int) -> list[tuple[float, str, dict]]:
+        """Top-k (score, key, payload) by BM25, best first."""
+        if top_k <= 0 or not self._keys:
+            return []
+        scores: dict[int, float] = {}
+        total = len(self._keys)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1.0 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, frequency in postings.items():
+                norm = self.k1 * (1.0 - self.b + self.b * self._doc_lengths[doc] / self._avg_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * frequency * (self.k1 + 1.0) / (frequency + norm)
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(score, self._keys[doc], self._payloads[doc]) for doc, score in best]
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[tuple[str, float]]:
+    """Fuse ranked key lists: score(key) = sum over lists of 1 / (k + rank). Best first."""
+    fused: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+_indexes: dict[str, BM25Index] = {}
+
+
+def get_lexical_index(name: str) -> BM25Index:
+    """Process-wide index per collection (built in the background by KBMedlinePlusService.warm_lexical_index)."""
+    index = _indexes.get(name)
+    if index is None:
+        index = BM25Index()
+        _indexes[name] = index
+    return index
+
+
+def reset_lexical_indexes() -> None:
+    _indexes.clear()
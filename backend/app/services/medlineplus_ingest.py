@@ -0,0 +1,301 @@
+"""
+Incremental MedlinePlus ingest: stream the topics CSV, embed only new or changed topics, delete removed ones.
+
+Each topic is split into overlapping passages (KB_PASSAGE_CHARS / KB_PASSAGE_OVERLAP_CHARS), one vector per
+passage; passage payloads carry the parent topic's id, title and url so search can collapse them back to topics.
+
+A JSON manifest (MEDLINEPLUS_INGEST_STATE_PATH) keeps a content hash and passage count per topic plus a
+checkpoint of the current run. The manifest is saved after every upserted batch, so a crashed run resumes where
+it stopped: rows already written before the checkpoint are only scanned for their keys, and anything written
+since hashes as unchanged. Topics that disappear from the CSV are deleted once a full pass completes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.kb_medlineplus_service import KBMedlinePlusService, passage_key, topic_key
+from app.services.memory.embedding_service import EmbeddingService
+from app.services.memory.vector_ids import assign_vector_ids, stable_vector_id
+
+BATCH_SIZE = 200
+# Bump when passage layout changes so every topic hashes as changed and is re-chunked.
+CHUNKING_VERSION = 1
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def strip_html(html: str) -> str:
+    if not html:
+        return ""
+    text = re.sub(r"<[^>]+>", " ", html)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
+def build_row_text(row: dict) -> str:
+    title = (row.get("title") or "").strip()
+    meta = (row.get("meta-desc") or "").strip()
+    summary = strip_html(row.get("full-summary") or "")
+    return f"{title} {meta} {summary}".strip()
+
+
+def build_payload(row: dict) -> dict:
+    return {
+        "id": row.get("id"),
+        "title": (row.get("title") or "").strip(),
+        "url": (row.get("url") or "").strip(),
+        "text": build_row_text(row),
+        "groups": (row.get("groups") or "").strip()[:500],
+    }
+
+
+def chunk_text(text: str, max_chars: int, overlap_chars: int) -> list[str]:
+    """
+    Split text into passages of at most max_chars on sentence boundaries. Each passage starts with the trailing
+    sentences (up to overlap_chars) of the previous one. Sentences longer than max_chars are split on words.
+    """
+    sentences: list[str] = []
+    for sentence in SENTENCE_END_RE.split(text.strip()):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            sentences.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            sentences.append(sentence)
+
+    passages: list[str] = []
+    current: list[str] = []
+    length = 0
+    for sentence in sentences:
+        if current and length + len(sentence) > max_chars:
+            passages.append(" ".join(current))
+            carry: list[str] = []
+            carry_length = 0
+            for previous in reversed(current):
+                grown = carry_length + len(previous) + 1
+                if grown > overlap_chars or grown + len(sentence) > max_chars:
+                    break
+                carry.insert(0, previous)
+                carry_length = grown
+            current, length = carry, carry_length
+        current.append(sentence)
+        length += len(sentence) + 1
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def build_passages(payload: dict, key: str) -> list[dict]:
+    """Passage payloads for one topic (at least one), each tagged with its parent topic."""
+    chunks = chunk_text(payload["text"], settings.kb_passage_chars, settings.kb_passage_overlap_chars)
+    chunks = chunks or [payload["title"] or key]
+    return [
+        {**payload, "topic_key": key, "passage_index": index, "passage_count": len(chunks), "text": chunk}
+        for index, chunk in enumerate(chunks)
+    ]
+
+
+def _embedding_text(passage: dict) -> str:
+    """Passage text prefixed with its topic title, so later passages still embed near their topic."""
+    title = passage.get("title") or ""
+    text = passage["text"]
+    return f"{title}: {text}" if title and not text.startswith(title) else text
+
+
+def content_hash(payload: dict) -> str:
+    material = {
+        "payload": payload,
+        "chunking": [CHUNKING_VERSION, settings.kb_passage_chars, settings.kb_passage_overlap_chars],
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def iter_batches(csv_path: Path, batch_size: int, limit: int = 0) -> Iterator[list[dict]]:
+    """Stream CSV rows in batches without loading the whole file."""
+    batch: list[dict] = []
+    count = 0
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            batch.append(row)
+            count += 1
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+            if limit and count >= limit:
+                break
+    if batch:
+        yield batch
+
+
+class IngestState:
+    """
+    Topic key -> {"hash", "passages"}, plus the checkpoint of an unfinished run. Saved atomically (tmp file +
+    rename). Manifests written before chunking stored a bare hash per topic; those load with passages=0, meaning
+    one topic-level vector.
+    """
+
+    def __init__(self, path: str | Path | None) -> None:
+        self.path = Path(path) if path else None
+        self.topics: dict[str, dict] = {}
+        self.checkpoint: dict | None = None
+        if self.path is not None and self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.topics = {
+                key: entry if isinstance(entry, dict) else {"hash": entry, "passages": 0}
+                for key, entry in (data.get("topics") or {}).items()
+            }
+            self.checkpoint = data.get("checkpoint")
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps({"topics": self.topics, "checkpoint": self.checkpoint}), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+def _vector_keys(key: str, entry: dict | None) -> list[str]:
+    """Natural keys of the vectors currently stored for a topic."""
+    if entry is None:
+        return []
+    passages = int(entry.get("passages") or 0)
+    return [key] if passages == 0 else [passage_key(key, index) for index in range(passages)]
+
+
+def _csv_fingerprint(csv_path: Path) -> dict:
+    stat = csv_path.stat()
+    return {"csv": str(csv_path.resolve()), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+async def ingest_medlineplus(
+    csv_path: Path,
+    *,
+    kb: KBMedlinePlusService | None = None,
+    embedding: EmbeddingService | None = None,
+    state_path: str | Path | None = None,
+    limit: int = 0,
+    full: bool = False,
+    batch_size: int = BATCH_SIZE,
+    progress: Callable[[str], None] | None = None,
+) -> dict:
+    """
+    Sync the MedlinePlus collection with csv_path. Returns counts of scanned, embedded, unchanged and deleted
+    topics and of passages written. full=True ignores the manifest and re-embeds every row. Deletions only run
+    after a complete pass (never with limit).
+    """
+    kb = kb or KBMedlinePlusService()
+    embedding = embedding or EmbeddingService()
+    state = IngestState(settings.medlineplus_ingest_state_path if state_path is None else state_path)
+    report = {"scanned": 0, "embedded": 0, "passages": 0, "unchanged": 0, "deleted": 0, "resumed_from": 0}
+
+    fingerprint = _csv_fingerprint(csv_path)
+    checkpoint = state.checkpoint or {}
+    resume_rows = 0
+    if not full and checkpoint.get("fingerprint") == fingerprint:
+        resume_rows = int(checkpoint.get("rows_done") or 0)
+        report["resumed_from"] = resume_rows
+    state.checkpoint = {"fingerprint": fingerprint, "rows_done": resume_rows}
+
+    await kb.ensure_collection()
+    # Every vector key already stored (from the manifest), so a new key colliding with one written by an earlier
+    # batch or run is caught before its upsert overwrites that row.
+    assigned = {
+        stable_vector_id(kb.collection, vector_key): vector_key
+        for key, entry in state.topics.items()
+        for vector_key in _vector_keys(key, entry)
+    }
+    seen: set[str] = set()
+    started = time.perf_counter()
+    rows_read = 0
+    pending: tuple[asyncio.Task, dict[str, dict], int] | None = None
+
+    async def _write(ids: list[int], vectors: list[list[float]], payloads: list[dict], stale_ids: list[int]) -> None:
+        await kb.batch_upsert(ids, vectors, payloads)
+        await kb.delete(stale_ids)
+
+    async def _commit(entry: tuple[asyncio.Task, dict[str, dict], int]) -> None:
+        task, entries, rows_done = entry
+        await task
+        state.topics.update(entries)
+        state.checkpoint["rows_done"] = max(state.checkpoint["rows_done"], rows_done)
+        state.save()
+
+    for batch in iter_batches(csv_path, batch_size, limit):
+        passages: list[dict] = []
+        entries: dict[str, dict] = {}
+        stale_keys: list[str] = []
+        for row in batch:
+            rows_read += 1
+            key = topic_key(row)
+            if not key:
+                continue
+            seen.add(key)
+            report["scanned"] += 1
+            if rows_read <= resume_rows:
+                report["unchanged"] += 1
+                continue
+            payload = build_payload(row)
+            digest = content_hash(payload)
+            previous = state.topics.get(key)
+            if not full and previous is not None and previous.get("hash") == digest:
+                report["unchanged"] += 1
+                continue
+            topic_passages = build_passages(payload, key)
+            current_keys = {passage_key(key, passage["passage_index"]) for passage in topic_passages}
+            stale_keys.extend(k for k in _vector_keys(key, previous) if k not in current_keys)
+            passages.extend(topic_passages)
+            entries[key] = {"hash": digest, "passages": len(topic_passages)}
+
+        if not passages:
+            continue
+        ids = assign_vector_ids(
+            kb.collection,
+            [passage_key(passage["topic_key"], passage["passage_index"]) for passage in passages],
+            assigned,
+        )
+        stale_ids = assign_vector_ids(kb.collection, stale_keys)
+        vectors = await embedding.embed_many([_embedding_text(passage) for passage in passages])
+        # Upsert this batch while the next one is being embedded; checkpoint only once it is written.
+        if pending is not None:
+            await _commit(pending)
+        task = asyncio.create_task(_write(ids, vectors, passages, stale_ids))
+        pending = (task, entries, rows_read)
+        report["embedded"] += len(entries)
+        report["passages"] += len(passages)
+        if progress:
+            elapsed = time.perf_counter() - started
+            progress(
+                f"  Embedded {report['embedded']} new/changed topics ({report['passages']} passages), "
+                f"scanned {rows_read} rows ({rows_read / elapsed:.1f} rows/sec)"
+            )
+
+    if pending is not None:
+        await _commit(pending)
+
+    if not limit:
+        removed = [key for key in state.topics if key not in seen]
+        if removed:
+            removed_keys = [vector_key for key in removed for vector_key in _vector_keys(key, state.topics[key])]
+            await kb.delete(assign_vector_ids(kb.collection, removed_keys))
+            for key in removed:
+                state.topics.pop(key, None)
+            report["deleted"] = len(removed)
+        state.checkpoint = None
+    else:
+        state.checkpoint["rows_done"] = max(state.checkpoint["rows_done"], rows_read)
+    state.save()
+    if report["embedded"] or report["deleted"]:
+        await kb.bump_version()
+    report["seconds"] = round(time.perf_counter() - started, 3)
+    return report
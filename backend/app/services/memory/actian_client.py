@@ -1,8 +1,11 @@
 from __future__ import annotations
 
-from math import sqrt
-
 from app.core.config import settings
+from app.services.memory.actian_pool import ActianConnectionPool, get_actian_pool
+from app.services.memory.collection_registry import CollectionRegistry, get_collection_registry
+from app.services.memory.local_vector_store import LocalVectorStore, get_local_vector_store
+from app.services.memory.patient_index import PatientMemoryIndex
+from app.services.memory.vector_ids import assign_vector_ids, stable_vector_id
 
 try:
     from cortex import AsyncCortexClient, DistanceMetric
@@ -10,47 +13,162 @@ except ImportError:  # pragma: no cover - fallback runtime
     AsyncCortexClient = None
     DistanceMetric = None
 
+try:
+    from cortex.filters import Field, Filter
+except ImportError:  # pragma: no cover - older cortex clients have no filter DSL
+    Field = None
+    Filter = None
+
+SCROLL_PAGE_SIZE = 200
+
 
 class ActianVectorClient:
-    def __init__(self) -> None:
+    def __init__(self, pool: ActianConnectionPool | None = None) -> None:
         self.host = settings.actian_host
         self.collection = settings.actian_collection_name
         self.vector_dim = settings.memory_vector_dimension
-        self._memory_store: dict[str, dict] = {}
+        self.pool = pool or get_actian_pool()
+        self.registry = CollectionRegistry(pool) if pool else get_collection_registry()
+        self.overfetch_factor = max(1, settings.memory_search_overfetch_factor)
+        self.max_fetch = max(1, settings.memory_search_max_fetch)
+        self._patient_index: PatientMemoryIndex | None = None
+        self._server_filter_supported = Filter is not None
+
+    @property
+    def local_store(self) -> LocalVectorStore | None:
+        """Without cortex, memories go to the shared local NumPy store (persisted under LOCAL_VECTOR_STORE_DIR)."""
+        return None if self.is_available else get_local_vector_store(self.collection, self.vector_dim)
+
+    @property
+    def patient_index(self) -> PatientMemoryIndex:
+        if self._patient_index is None:
+            self._patient_index = PatientMemoryIndex()
+        return self._patient_index
 
     @property
     def is_available(self) -> bool:
         return AsyncCortexClient is not None
 
     async def ensure_collection(self) -> None:
+        """Create or verify the collection once per process; later calls are answered from the registry."""
         if not self.is_available:
             return
-
-        async with AsyncCortexClient(self.host) as client:
-            exists = await client.collection_exists(self.collection)
-            if not exists:
-                await client.create_collection(
-                    name=self.collection,
-                    dimension=self.vector_dim,
-                    distance_metric=DistanceMetric.COSINE,
-                )
+        await self.registry.ensure(self.collection, self.vector_dim, DistanceMetric.COSINE)
 
     async def upsert(self, memory_id: str, vector: list[float], payload: dict) -> None:
         if not self.is_available:
-            self._memory_store[memory_id] = {"vector": vector, "payload": payload}
+            self.local_store.upsert_many([memory_id], [vector], [payload])
+            return
+
+        await self.registry.run(
+            self.collection,
+            self.vector_dim,
+            DistanceMetric.COSINE,
+            lambda: self.pool.call(
+                "upsert", self.collection, id=stable_vector_id(self.collection, memory_id), vector=vector, payload=payload
+            ),
+        )
+        await self.patient_index.add_many(self.collection, [payload])
+
+    async def batch_upsert(self, memory_ids: list[str], vectors: list[list[float]], payloads: list[dict]) -> None:
+        """Write many memories in one Actian batch_upsert (one round trip instead of one per memory)."""
+        if not memory_ids:
+            return
+        if not self.is_available:
+            self.local_store.upsert_many(memory_ids, vectors, payloads)
             return
 
-        async with AsyncCortexClient(self.host) as client:
-            await client.upsert(self.collection, id=self._to_int_id(memory_id), vector=vector, payload=payload)
+        ids = assign_vector_ids(self.collection, memory_ids)
+        await self.registry.run(
+            self.collection,
+            self.vector_dim,
+            DistanceMetric.COSINE,
+            lambda: self.pool.call("batch_upsert", self.collection, ids, vectors, payloads),
+        )
+        await self.patient_index.add_many(self.collection, payloads)
 
     async def search(self, query_vector: list[float], top_k: int, patient_id: int) -> list[dict]:
+        """
+        Top-k memories for one patient. Uses a server-side payload filter when the cortex client supports it;
+        otherwise over-fetches global neighbours and widens the window until top_k matches are found, the
+        patient's indexed memories are all found, the collection is exhausted or max_fetch is reached. A patient
+        the index knows has no memories is answered without a search (see _ensure_patient_indexed).
+        """
         if not self.is_available:
-            return self._search_memory_store(query_vector=query_vector, top_k=top_k, patient_id=patient_id)
+            return [payload for _, payload in self.local_store.search(query_vector, top_k, patient_id=patient_id)]
+        if top_k <= 0:
+            return []
+
+        if self._server_filter_supported:
+            try:
+                results = await self.pool.call(
+                    "search",
+                    self.collection,
+                    query=query_vector,
+                    top_k=top_k,
+                    filter=Filter().must(Field("patient_id").eq(patient_id)),
+                )
+                return self._patient_payloads(results, patient_id, top_k)
+            except (TypeError, AttributeError):
+                # Server or client does not accept filters; use over-fetch from now on.
+                self._server_filter_supported = False
+
+        patient_count = (
+            await self.patient_index.count(self.collection, patient_id)
+            if await self._ensure_patient_indexed(patient_id)
+            else None
+        )
+        if patient_count == 0:
+            return []
+        wanted = min(top_k, patient_count) if patient_count else top_k
+        fetch = min(top_k * self.overfetch_factor, self.max_fetch)
+        while True:
+            results = await self.pool.call("search", self.collection, query=query_vector, top_k=fetch)
+            filtered = self._patient_payloads(results, patient_id, top_k)
+            exhausted = len(results) < fetch
+            if len(filtered) >= wanted or exhausted or fetch >= self.max_fetch:
+                return filtered
+            fetch = min(fetch * 2, self.max_fetch)
 
-        # Actian Python client filter DSL can be introduced in the next iteration.
-        async with AsyncCortexClient(self.host) as client:
-            results = await client.search(self.collection, query=query_vector, top_k=max(top_k * 3, top_k))
+    async def list_patient_memories(self, patient_id: int, limit: int = 20) -> list[dict]:
+        if not self.is_available:
+            return self.local_store.list_by_patient(patient_id, limit)
+
+        if await self._ensure_patient_indexed(patient_id):
+            indexed = await self.patient_index.list(self.collection, patient_id, limit)
+            if indexed is not None:
+                return indexed
+
+        # Index unavailable: page through the collection.
+        return await self._scan_patient(patient_id, limit)
+
+    async def _ensure_patient_indexed(self, patient_id: int) -> bool:
+        """
+        Make the patient index complete for this patient. The first lookup of a patient copies their memories
+        written before the index existed in from one pass over the collection and marks the patient ready, so
+        from then on an empty index means no memories and no lookup scans again. False when Redis is unavailable.
+        """
+        ready = await self.patient_index.is_ready(self.collection, patient_id)
+        if ready is None:
+            return False
+        if ready:
+            return True
+        return await self.patient_index.mark_ready(self.collection, patient_id, await self._scan_patient(patient_id))
+
+    async def _scan_patient(self, patient_id: int, limit: int | None = None) -> list[dict]:
+        """The patient's memories (up to limit) by paging through the whole collection."""
+        memories: list[dict] = []
+        async for rows in self.pool.scroll_all(self.collection, SCROLL_PAGE_SIZE):
+            for row in rows:
+                payload = getattr(row, "payload", {}) or {}
+                if str(payload.get("patient_id")) == str(patient_id):
+                    memories.append(payload)
+                if limit is not None and len(memories) >= limit:
+                    return memories
+        return memories
 
+    @staticmethod
+    def _patient_payloads(results: list, patient_id: int, top_k: int) -> list[dict]:
         filtered: list[dict] = []
         for item in results:
             payload = getattr(item, "payload", {}) or {}
@@ -60,45 +178,3 @@ class ActianVectorClient:
                 break
         return filtered
 
-    async def list_patient_memories(self, patient_id: int, limit: int = 20) -> list[dict]:
-        if not self.is_available:
-            rows = []
-            for row in self._memory_store.values():
-                payload = row["payload"]
-                if str(payload.get("patient_id")) == str(patient_id):
-                    rows.append(payload)
-            return rows[:limit]
-
-        async with AsyncCortexClient(self.host) as client:
-            rows = await client.scroll(self.collection, limit=200, cursor=0)
-        memories: list[dict] = []
-        for row in rows:
-            payload = getattr(row, "payload", {}) or {}
-            if str(payload.get("patient_id")) == str(patient_id):
-                memories.append(payload)
-            if len(memories) >= limit:
-                break
-        return memories
-
-    def _search_memory_store(self, query_vector: list[float], top_k: int, patient_id: int) -> list[dict]:
-        scored: list[tuple[float, dict]] = []
-        for row in self._memory_store.values():
-            payload = row["payload"]
-            if str(payload.get("patient_id")) != str(patient_id):
-                continue
-            score = self._cosine_similarity(query_vector, row["vector"])
-            scored.append((score, payload))
-        scored.sort(key=lambda item: item[0], reverse=True)
-        return [payload for _, payload in scored[:top_k]]
-
-    @staticmethod
-    def _cosine_similarity(left: list[float], right: list[float]) -> float:
-        dot = sum(l * r for l, r in zip(left, right))
-        norm_left = sqrt(sum(l * l for l in left)) or 1.0
-        norm_right = sqrt(sum(r * r for r in right)) or 1.0
-        return dot / (norm_left * norm_right)
-
-    @staticmethod
-    def _to_int_id(value: str) -> int:
-        return abs(hash(value)) % (10**9)
-
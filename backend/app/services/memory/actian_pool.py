@@ -0,0 +1,213 @@
+"""Application-scoped pool of long-lived AsyncCortexClient connections shared by memory and MedlinePlus KB."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from app.core.config import settings
+
+try:
+    from cortex import AsyncCortexClient
+except ImportError:  # pragma: no cover - fallback runtime
+    AsyncCortexClient = None
+
+try:
+    import grpc
+except ImportError:  # pragma: no cover - installed with actiancortex
+    grpc = None
+
+
+def is_transport_error(exc: BaseException) -> bool:
+    """Errors that leave a connection unusable (timeouts, dropped sockets, unavailable channel), as opposed to
+    application errors such as a missing collection, after which the connection is still fine."""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError, OSError)):
+        return True
+    if grpc is not None and isinstance(exc, grpc.RpcError):
+        code = exc.code() if callable(getattr(exc, "code", None)) else None
+        return code in (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED)
+    return False
+
+
+class _PooledConnection:
+    def __init__(self) -> None:
+        self.client: Any = None
+        self.last_checked = 0.0
+        self.healthy = True
+        self.ever_connected = False
+
+
+class ActianConnectionPool:
+    """
+    Fixed-size pool of Actian gRPC connections. Connections are opened lazily, health-checked when idle
+    longer than health_check_interval, and dropped and reconnected after a failed call. Every call gets
+    a deadline (call_timeout). Tracks how long callers wait for a free connection.
+    """
+
+    def __init__(
+        self,
+        host: str | None = None,
+        *,
+        size: int | None = None,
+        call_timeout: float | None = None,
+        health_check_interval: float | None = None,
+        client_factory: Any = None,
+    ) -> None:
+        self.host = host or settings.actian_host
+        self.size = max(1, size or settings.actian_pool_size)
+        self.call_timeout = call_timeout or settings.actian_call_timeout_seconds
+        self.health_check_interval = (
+            settings.actian_health_check_interval_seconds if health_check_interval is None else health_check_interval
+        )
+        self._client_factory = client_factory or AsyncCortexClient
+        self._idle: asyncio.Queue[_PooledConnection] | None = None
+        self._slots: list[_PooledConnection] = []
+        self.acquisitions = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.call_timeouts = 0
+        self.call_errors = 0
+        self.reconnects = 0
+
+    @property
+    def is_available(self) -> bool:
+        return self._client_factory is not None
+
+    async def open(self) -> None:
+        """Create the pool slots and open one connection up front so startup surfaces a bad ACTIAN_HOST early."""
+        if self._idle is not None or not self.is_available:
+            return
+        self._idle = asyncio.Queue()
+        self._slots = [_PooledConnection() for _ in range(self.size)]
+        for slot in self._slots:
+            self._idle.put_nowait(slot)
+        try:
+            async with self.acquire():
+                pass
+        except Exception:
+            # Actian is optional for basic chat; calls will retry the connection later.
+            pass
+
+    async def close(self) -> None:
+        for slot in self._slots:
+            await self._disconnect(slot)
+        self._slots = []
+        self._idle = None
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Any]:
+        """
+        Yield a connected client. If the caller raises a transport error (see is_transport_error), the connection
+        is dropped and reopened on next use; other errors leave it in the pool.
+        """
+        if self._idle is None:
+            await self.open()
+        if self._idle is None:
+            raise RuntimeError("Actian Cortex client not available (install actiancortex).")
+
+        started = time.perf_counter()
+        slot = await self._idle.get()
+        waited = time.perf_counter() - started
+        self.acquisitions += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        try:
+            await self._ensure_connected(slot)
+            yield slot.client
+        except BaseException as exc:
+            if is_transport_error(exc):
+                slot.healthy = False
+            raise
+        finally:
+            if not slot.healthy:
+                await self._disconnect(slot)
+            self._idle.put_nowait(slot)
+
+    async def call(self, method: str, *args: Any, timeout: float | None = None, **kwargs: Any) -> Any:
+        """Run client.<method>(*args, **kwargs) on a pooled connection with a per-call deadline."""
+        async with self.acquire() as client:
+            try:
+                return await asyncio.wait_for(getattr(client, method)(*args, **kwargs), timeout or self.call_timeout)
+            except asyncio.TimeoutError:
+                self.call_timeouts += 1
+                raise
+            except Exception:
+                self.call_errors += 1
+                raise
+
+    async def scroll_all(self, collection: str, page_size: int = 200) -> AsyncIterator[list[Any]]:
+        """Yield every row of a collection, one scroll page at a time."""
+        cursor: Any = 0
+        while True:
+            page = await self.call("scroll", collection, limit=page_size, cursor=cursor)
+            rows, next_cursor = page if isinstance(page, tuple) else (page, cursor + len(page))
+            if not rows:
+                return
+            yield rows
+            if next_cursor is None or len(rows) < page_size:
+                return
+            cursor = next_cursor
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "connected": sum(1 for slot in self._slots if slot.client is not None),
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "acquisitions": self.acquisitions,
+            "wait_seconds_avg": round(self.wait_seconds_total / self.acquisitions, 6) if self.acquisitions else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+            "call_timeouts": self.call_timeouts,
+            "call_errors": self.call_errors,
+            "reconnects": self.reconnects,
+        }
+
+    async def _ensure_connected(self, slot: _PooledConnection) -> None:
+        now = time.monotonic()
+        if slot.client is not None and now - slot.last_checked >= self.health_check_interval:
+            try:
+                await asyncio.wait_for(slot.client.health_check(), self.call_timeout)
+            except Exception:
+                await self._disconnect(slot)
+            else:
+                slot.last_checked = now
+        if slot.client is None:
+            client = self._client_factory(self.host)
+            await asyncio.wait_for(client.__aenter__(), self.call_timeout)
+            if slot.ever_connected:
+                self.reconnects += 1
+            slot.client = client
+            slot.ever_connected = True
+            slot.last_checked = time.monotonic()
+        slot.healthy = True
+
+    @staticmethod
+    async def _disconnect(slot: _PooledConnection) -> None:
+        client, slot.client = slot.client, None
+        slot.healthy = True
+        if client is None:
+            return
+        try:
+            await client.__aexit__(None, None, None)
+        except Exception:
+            pass
+
+
+_default_pool: ActianConnectionPool | None = None
+
+
+def get_actian_pool() -> ActianConnectionPool:
+    """Process-wide pool shared by ActianVectorClient and KBMedlinePlusService."""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = ActianConnectionPool()
+    return _default_pool
+
+
+async def close_actian_pool() -> None:
+    global _default_pool
+    if _default_pool is not None:
+        await _default_pool.close()
+        _default_pool = None
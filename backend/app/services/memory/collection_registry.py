@@ -0,0 +1,120 @@
+"""Remember which Actian collections exist (with the expected schema) so hot paths skip the existence check."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+from app.services.memory.actian_pool import ActianConnectionPool, get_actian_pool
+
+T = TypeVar("T")
+
+MISSING_COLLECTION_MARKERS = ("not found", "not_found", "does not exist", "no such collection", "unknown collection")
+
+
+def is_missing_collection_error(exc: BaseException) -> bool:
+    """True when an Actian error says the collection is gone (e.g. dropped or the server was reset)."""
+    message = str(exc).lower()
+    return "collection" in message and any(marker in message for marker in MISSING_COLLECTION_MARKERS)
+
+
+class CollectionRegistry:
+    """
+    Checks each collection once per process: creates it if missing, otherwise verifies dimension and
+    distance metric. The result is remembered until invalidate() is called, which run() does when an
+    operation fails because the collection is missing.
+    """
+
+    def __init__(self, pool: ActianConnectionPool | None = None) -> None:
+        self._pool = pool
+        self._ready: set[str] = set()
+        self._locks: dict[str, asyncio.Lock] = {}
+        self.checks = 0
+
+    @property
+    def pool(self) -> ActianConnectionPool:
+        return self._pool or get_actian_pool()
+
+    def is_ready(self, name: str) -> bool:
+        return name in self._ready
+
+    def invalidate(self, name: str) -> None:
+        self._ready.discard(name)
+
+    async def ensure(self, name: str, dimension: int, distance_metric: Any) -> None:
+        if name in self._ready:
+            return
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            if name in self._ready:
+                return
+            self.checks += 1
+            exists = await self.pool.call("has_collection", name)
+            if not exists:
+                await self.pool.call(
+                    "create_collection",
+                    name=name,
+                    dimension=dimension,
+                    distance_metric=distance_metric,
+                )
+            else:
+                await self._verify_schema(name, dimension, distance_metric)
+            self._ready.add(name)
+
+    async def run(
+        self,
+        name: str,
+        dimension: int,
+        distance_metric: Any,
+        operation: Callable[[], Awaitable[T]],
+    ) -> T:
+        """Ensure the collection (cached), run operation, and recreate + retry once if the collection vanished."""
+        await self.ensure(name, dimension, distance_metric)
+        try:
+            return await operation()
+        except Exception as exc:
+            if not is_missing_collection_error(exc):
+                raise
+            self.invalidate(name)
+            await self.ensure(name, dimension, distance_metric)
+            return await operation()
+
+    async def _verify_schema(self, name: str, dimension: int, distance_metric: Any) -> None:
+        try:
+            info = await self.pool.call("get_collection_info", name)
+        except AttributeError:
+            # Older cortex clients cannot describe a collection; existence is all we can check.
+            return
+        actual_dim = _field(info, "dimension")
+        actual_metric = _field(info, "distance_metric")
+        if actual_dim is not None and int(actual_dim) != int(dimension):
+            raise ValueError(
+                f"Actian collection '{name}' has dimension {actual_dim}, expected {dimension} "
+                "(check MEMORY_VECTOR_DIMENSION)."
+            )
+        if actual_metric is not None and _metric_name(actual_metric) != _metric_name(distance_metric):
+            raise ValueError(
+                f"Actian collection '{name}' uses distance metric {_metric_name(actual_metric)}, "
+                f"expected {_metric_name(distance_metric)}."
+            )
+
+
+def _field(info: Any, key: str) -> Any:
+    if isinstance(info, dict):
+        return info.get(key)
+    return getattr(info, key, None)
+
+
+def _metric_name(metric: Any) -> str:
+    return str(getattr(metric, "name", metric)).rsplit(".", 1)[-1].upper()
+
+
+_default_registry: CollectionRegistry | None = None
+
+
+def get_collection_registry() -> CollectionRegistry:
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = CollectionRegistry()
+    return _default_registry
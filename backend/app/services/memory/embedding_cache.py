@@ -0,0 +1,167 @@
+"""Content-addressed embedding cache: in-process LRU tier in front of a shared Redis tier."""
+
+from __future__ import annotations
+
+import hashlib
+import time
+from array import array
+from collections import OrderedDict
+
+from redis import asyncio as redis_async
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.services.redis_pool import get_redis
+
+# After a Redis error, skip the remote tier for this long instead of failing every lookup.
+REMOTE_RETRY_AFTER_SEC = 30.0
+
+
+def pack_vector(vector: list[float]) -> bytes:
+    """Pack a vector as little-endian float32 bytes (4 bytes per dimension)."""
+    return array("f", vector).tobytes()
+
+
+def unpack_vector(payload: bytes) -> list[float]:
+    values = array("f")
+    values.frombytes(payload)
+    return values.tolist()
+
+
+def normalize_text(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+class EmbeddingCache:
+    """
+    Cache keyed by (model, dimension, sha256 of normalized text). Vectors are stored as packed float32.
+    Local tier is an LRU bounded by max_entries with a per-entry TTL; the Redis tier uses SETEX so
+    entries expire on their own and are shared across workers and the ingest script.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int | None = None,
+        ttl_seconds: int | None = None,
+        redis_url: str | None = None,
+        redis_client: redis_async.Redis | None = None,
+        use_redis: bool | None = None,
+    ) -> None:
+        self.max_entries = max(0, settings.embedding_cache_max_entries if max_entries is None else max_entries)
+        self.ttl_seconds = max(1, settings.embedding_cache_ttl_seconds if ttl_seconds is None else ttl_seconds)
+        enabled = (settings.embedding_cache_backend == "redis") if use_redis is None else use_redis
+        self.redis = None
+        if redis_client is not None:
+            self.redis = redis_client
+        elif enabled:
+            self.redis = redis_async.from_url(redis_url) if redis_url else get_redis()
+        self._local: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._remote_disabled_until = 0.0
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(model: str, dimension: int, text: str) -> str:
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"emb:{model}:{dimension}:{digest}"
+
+    async def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """Return cached vectors for the keys that are present (local tier first, then Redis)."""
+        found: dict[str, list[float]] = {}
+        remote_keys: list[str] = []
+        now = time.monotonic()
+        for key in keys:
+            packed = self._get_local(key, now)
+            if packed is not None:
+                found[key] = unpack_vector(packed)
+                self.local_hits += 1
+            else:
+                remote_keys.append(key)
+
+        if remote_keys and self._remote_enabled():
+            try:
+                values = await self.redis.mget(remote_keys)
+            except RedisError:
+                self._disable_remote()
+                values = [None] * len(remote_keys)
+            for key, packed in zip(remote_keys, values):
+                if packed:
+                    found[key] = unpack_vector(packed)
+                    self._put_local(key, packed, now)
+                    self.remote_hits += 1
+
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set_many(self, items: dict[str, list[float]]) -> None:
+        if not items:
+            return
+        now = time.monotonic()
+        packed_items = {key: pack_vector(vector) for key, vector in items.items()}
+        for key, packed in packed_items.items():
+            self._put_local(key, packed, now)
+        if not self._remote_enabled():
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, packed in packed_items.items():
+                    pipe.setex(key, self.ttl_seconds, packed)
+                await pipe.execute()
+        except RedisError:
+            self._disable_remote()
+
+    def clear(self) -> None:
+        self._local.clear()
+
+    def stats(self) -> dict:
+        lookups = self.local_hits + self.remote_hits + self.misses
+        hits = self.local_hits + self.remote_hits
+        return {
+            "local_entries": len(self._local),
+            "local_hits": self.local_hits,
+            "remote_hits": self.remote_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _get_local(self, key: str, now: float) -> bytes | None:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, packed = entry
+        if expires_at <= now:
+            del self._local[key]
+            self.evictions += 1
+            return None
+        self._local.move_to_end(key)
+        return packed
+
+    def _put_local(self, key: str, packed: bytes, now: float) -> None:
+        if not self.max_entries:
+            return
+        self._local[key] = (now + self.ttl_seconds, packed)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+            self.evictions += 1
+
+    def _remote_enabled(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._remote_disabled_until
+
+    def _disable_remote(self) -> None:
+        self._remote_disabled_until = time.monotonic() + REMOTE_RETRY_AFTER_SEC
+
+
+_default_cache: EmbeddingCache | None = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide cache shared by every EmbeddingService (KB search, memory, ingest)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = EmbeddingCache()
+    return _default_cache
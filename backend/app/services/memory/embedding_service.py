@@ -1,28 +1,124 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
+import random
 
-from openai import OpenAI
+from openai import APIConnectionError, APITimeoutError, AsyncOpenAI, InternalServerError, RateLimitError
 
 from app.core.config import settings
+from app.services.memory.embedding_cache import EmbeddingCache, get_embedding_cache
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError)
 
 
 class EmbeddingService:
-    def __init__(self) -> None:
-        self.client = OpenAI(api_key=settings.openai_api_key) if settings.openai_api_key else None
+    def __init__(self, cache: EmbeddingCache | None = None) -> None:
+        # Retries are handled here (with rate-limit backoff) so the SDK should not retry on its own.
+        self.client = (
+            AsyncOpenAI(api_key=settings.openai_api_key, max_retries=0) if settings.openai_api_key else None
+        )
         self.model = settings.embedding_model
         self.vector_dim = settings.memory_vector_dimension
+        self.batch_size = max(1, settings.embedding_batch_size)
+        self.max_concurrency = max(1, settings.embedding_max_concurrency)
+        self.max_retries = max(0, settings.embedding_max_retries)
+        self.cache = cache or get_embedding_cache()
 
     async def embed_text(self, text: str) -> list[float]:
-        normalized = (text or "").strip()
-        if not normalized:
-            return [0.0] * self.vector_dim
+        vectors = await self.embed_many([text])
+        return vectors[0]
+
+    async def embed_many(
+        self,
+        texts: list[str],
+        *,
+        batch_size: int | None = None,
+        max_concurrency: int | None = None,
+    ) -> list[list[float]]:
+        """
+        Embed many texts with multi-input requests. Batches run concurrently (bounded by
+        max_concurrency) and are retried with exponential backoff on rate limits and transient errors.
+        Returns one vector per input, in input order; blank texts get a zero vector.
+        Vectors already in the embedding cache are not requested again.
+        """
+        normalized = [(text or "").strip() for text in texts]
+        vectors: list[list[float] | None] = [None] * len(normalized)
+
+        pending: list[int] = []
+        for index, text in enumerate(normalized):
+            if not text:
+                vectors[index] = [0.0] * self.vector_dim
+            elif not self.client:
+                vectors[index] = self._deterministic_embedding(text)
+            else:
+                pending.append(index)
+
+        if pending:
+            await self._embed_pending(normalized, pending, vectors, batch_size, max_concurrency)
+
+        return [vector or [0.0] * self.vector_dim for vector in vectors]
+
+    async def _embed_pending(
+        self,
+        normalized: list[str],
+        pending: list[int],
+        vectors: list[list[float] | None],
+        batch_size: int | None,
+        max_concurrency: int | None,
+    ) -> None:
+        keys = {index: self.cache.key(self.model, self.vector_dim, normalized[index]) for index in pending}
+        cached = await self.cache.get_many(list(dict.fromkeys(keys.values())))
 
-        if not self.client:
-            return self._deterministic_embedding(normalized)
+        # One request per distinct uncached text; duplicates in the same call share the result.
+        to_embed: dict[str, str] = {}
+        for index in pending:
+            key = keys[index]
+            if key in cached:
+                vectors[index] = cached[key]
+            else:
+                to_embed.setdefault(key, normalized[index])
+        if not to_embed:
+            return
 
-        response = self.client.embeddings.create(model=self.model, input=normalized)
-        vector = list(response.data[0].embedding)
+        miss_keys = list(to_embed)
+        embedded: dict[str, list[float]] = {}
+        size = max(1, batch_size or self.batch_size)
+        semaphore = asyncio.Semaphore(max(1, max_concurrency or self.max_concurrency))
+
+        async def _run_batch(batch_keys: list[str]) -> None:
+            async with semaphore:
+                batch_vectors = await self._create_with_retry([to_embed[key] for key in batch_keys])
+            embedded.update(zip(batch_keys, batch_vectors))
+
+        await asyncio.gather(
+            *(_run_batch(miss_keys[start : start + size]) for start in range(0, len(miss_keys), size))
+        )
+        await self.cache.set_many(embedded)
+        for index in pending:
+            if vectors[index] is None:
+                vectors[index] = embedded.get(keys[index])
+
+    async def _create_with_retry(self, inputs: list[str]) -> list[list[float]]:
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.embeddings.create(model=self.model, input=inputs)
+            except RETRYABLE_ERRORS:
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff_seconds(attempt))
+                attempt += 1
+                continue
+            ordered = sorted(response.data, key=lambda item: item.index)
+            return [self._fit_dimension(list(item.embedding)) for item in ordered]
+
+    @staticmethod
+    def _backoff_seconds(attempt: int) -> float:
+        """Exponential backoff with full jitter, capped at 30 seconds."""
+        return random.uniform(0, min(30.0, 0.5 * (2**attempt)))
+
+    def _fit_dimension(self, vector: list[float]) -> list[float]:
         if len(vector) > self.vector_dim:
             return vector[: self.vector_dim]
         if len(vector) < self.vector_dim:
@@ -36,4 +132,3 @@ class EmbeddingService:
             byte = digest[index % len(digest)]
             vector[index] = (byte / 255.0) - 0.5
         return vector
-
@@ -0,0 +1,249 @@
+"""
+Local vector engine used when the Actian cortex client is not installed (dev and CI).
+
+Vectors live in a contiguous float32 matrix with L2-normalized rows, memory-mapped from disk so they
+survive restarts. Payloads are kept in an append-only JSONL log that is replayed (and compacted) on load.
+A per-patient row index lets patient-scoped search score only that patient's rows: one matmul plus
+argpartition.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import settings
+
+INITIAL_CAPACITY = 1024
+
+
+class LocalVectorStore:
+    def __init__(self, name: str, dimension: int, directory: str | Path | None = None) -> None:
+        self.name = name
+        self.dimension = dimension
+        self.directory = Path(directory) if directory else None
+        self._ids: dict[str, int] = {}
+        self._payloads: dict[int, dict] = {}
+        self._patient_rows: dict[str, set[int]] = {}
+        self._free_rows: list[int] = []
+        self._size = 0
+        if self.directory is None:
+            self._matrix = self._allocate(INITIAL_CAPACITY)
+        else:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def upsert_many(self, ids: list[str], vectors: list[list[float]], payloads: list[dict]) -> None:
+        if not ids:
+            return
+        matrix = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dimension))
+        log_lines: list[str] = []
+        for item_id, row_vector, payload in zip(ids, matrix, payloads):
+            item_id = str(item_id)
+            row = self._ids.get(item_id)
+            if row is None:
+                row = self._next_row()
+                self._ids[item_id] = row
+            else:
+                self._unindex_patient(row)
+            self._matrix[row] = row_vector
+            self._payloads[row] = payload
+            self._index_patient(row, payload)
+            log_lines.append(json.dumps({"op": "upsert", "id": item_id, "row": row, "payload": payload}, default=str))
+        self._persist(log_lines)
+
+    def delete(self, ids: list[str]) -> None:
+        log_lines: list[str] = []
+        for item_id in ids:
+            row = self._ids.pop(str(item_id), None)
+            if row is None:
+                continue
+            self._unindex_patient(row)
+            self._payloads.pop(row, None)
+            self._matrix[row] = 0.0
+            self._free_rows.append(row)
+            log_lines.append(json.dumps({"op": "delete", "id": str(item_id)}))
+        self._persist(log_lines)
+
+    def search(self, query: list[float], top_k: int, patient_id: int | str | None = None) -> list[tuple[float, dict]]:
+        """Cosine top-k as (score, payload), best first. Restricted to one patient's rows when patient_id is given."""
+        if top_k <= 0 or not self._ids:
+            return []
+        query_vector = np.asarray(query, dtype=np.float32)
+        norm = float(np.linalg.norm(query_vector))
+        if norm == 0.0:
+            return []
+        query_vector = query_vector / norm
+
+        if patient_id is not None:
+            rows = np.fromiter(self._patient_rows.get(str(patient_id), ()), dtype=np.int64)
+        elif self._free_rows:
+            rows = np.fromiter(self._ids.values(), dtype=np.int64)
+        else:
+            rows = None
+        if rows is not None and rows.size == 0:
+            return []
+
+        candidates = self._matrix[rows] if rows is not None else self._matrix[: self._size]
+        scores = candidates @ query_vector
+        k = min(top_k, scores.shape[0])
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        results: list[tuple[float, dict]] = []
+        for index in best:
+            row = int(rows[index]) if rows is not None else int(index)
+            results.append((float(scores[index]), self._payloads[row]))
+        return results
+
+    def all_payloads(self) -> list[dict]:
+        return [self._payloads[row] for row in self._ids.values()]
+
+    def list_by_patient(self, patient_id: int | str, limit: int) -> list[dict]:
+        """Newest-first payloads for one patient."""
+        payloads = [self._payloads[row] for row in self._patient_rows.get(str(patient_id), ())]
+        payloads.sort(key=lambda payload: payload.get("created_at") or "", reverse=True)
+        return payloads[:limit]
+
+    def _next_row(self) -> int:
+        if self._free_rows:
+            return self._free_rows.pop()
+        if self._size >= self._matrix.shape[0]:
+            self._grow(self._matrix.shape[0] * 2)
+        row = self._size
+        self._size += 1
+        return row
+
+    def _index_patient(self, row: int, payload: dict) -> None:
+        patient_id = payload.get("patient_id")
+        if patient_id is not None:
+            self._patient_rows.setdefault(str(patient_id), set()).add(row)
+
+    def _unindex_patient(self, row: int) -> None:
+        payload = self._payloads.get(row) or {}
+        rows = self._patient_rows.get(str(payload.get("patient_id")))
+        if rows is not None:
+            rows.discard(row)
+            if not rows:
+                del self._patient_rows[str(payload.get("patient_id"))]
+
+    def _normalize(self, matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0.0] = 1.0
+        return matrix / norms
+
+    # Storage
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.directory / f"{self.name}.f32"
+
+    @property
+    def _log_path(self) -> Path:
+        return self.directory / f"{self.name}.jsonl"
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.directory / f"{self.name}.meta.json"
+
+    def _allocate(self, capacity: int, path: Path | None = None) -> np.ndarray:
+        if path is None:
+            return np.zeros((capacity, self.dimension), dtype=np.float32)
+        return np.memmap(path, dtype=np.float32, mode="w+", shape=(capacity, self.dimension))
+
+    def _grow(self, capacity: int) -> None:
+        if self.directory is None:
+            grown = self._allocate(capacity)
+            grown[: self._size] = self._matrix[: self._size]
+            self._matrix = grown
+            return
+        tmp_path = self._vectors_path.with_suffix(".f32.tmp")
+        grown = self._allocate(capacity, tmp_path)
+        grown[: self._size] = self._matrix[: self._size]
+        grown.flush()
+        del grown
+        self._matrix = None
+        os.replace(tmp_path, self._vectors_path)
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+        self._write_meta(capacity)
+
+    def _write_meta(self, capacity: int) -> None:
+        self._meta_path.write_text(json.dumps({"dimension": self.dimension, "capacity": capacity}))
+
+    def _persist(self, log_lines: list[str]) -> None:
+        if self.directory is None or not log_lines:
+            return
+        if isinstance(self._matrix, np.memmap):
+            self._matrix.flush()
+        with open(self._log_path, "a", encoding="utf-8") as log:
+            log.write("\n".join(log_lines) + "\n")
+
+    def _load(self) -> None:
+        if not self._meta_path.exists() or not self._vectors_path.exists():
+            self._matrix = self._allocate(INITIAL_CAPACITY, self._vectors_path)
+            self._write_meta(INITIAL_CAPACITY)
+            self._log_path.unlink(missing_ok=True)
+            return
+
+        meta = json.loads(self._meta_path.read_text())
+        if int(meta["dimension"]) != self.dimension:
+            raise ValueError(
+                f"Local vector store '{self.name}' has dimension {meta['dimension']}, expected {self.dimension}. "
+                f"Delete {self.directory} to rebuild it."
+            )
+        capacity = int(meta["capacity"])
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+
+        entries = 0
+        rows_by_id: dict[str, tuple[int, dict]] = {}
+        if self._log_path.exists():
+            with open(self._log_path, encoding="utf-8") as log:
+                for line in log:
+                    if not line.strip():
+                        continue
+                    entries += 1
+                    entry = json.loads(line)
+                    if entry["op"] == "upsert":
+                        rows_by_id[entry["id"]] = (int(entry["row"]), entry["payload"])
+                    else:
+                        rows_by_id.pop(entry["id"], None)
+
+        used_rows = {row for row, _ in rows_by_id.values()}
+        self._size = max(used_rows) + 1 if used_rows else 0
+        self._free_rows = [row for row in range(self._size) if row not in used_rows]
+        for item_id, (row, payload) in rows_by_id.items():
+            self._ids[item_id] = row
+            self._payloads[row] = payload
+            self._index_patient(row, payload)
+
+        if entries > 2 * len(rows_by_id) + 100:
+            self._compact_log()
+
+    def _compact_log(self) -> None:
+        tmp_path = self._log_path.with_suffix(".jsonl.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as log:
+            for item_id, row in self._ids.items():
+                entry = {"op": "upsert", "id": item_id, "row": row, "payload": self._payloads[row]}
+                log.write(json.dumps(entry, default=str) + "\n")
+        os.replace(tmp_path, self._log_path)
+
+
+_stores: dict[str, LocalVectorStore] = {}
+
+
+def get_local_vector_store(name: str, dimension: int) -> LocalVectorStore:
+    """Process-wide store per collection, persisted under LOCAL_VECTOR_STORE_DIR (in-memory only if empty)."""
+    store = _stores.get(name)
+    if store is None:
+        store = LocalVectorStore(name, dimension, settings.local_vector_store_dir or None)
+        _stores[name] = store
+    return store
+
+
+def reset_local_vector_stores() -> None:
+    _stores.clear()
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from collections.abc import AsyncIterator, Iterator
+
 from sqlalchemy.orm import Session
 
 from app.models.appointment import Appointment
@@ -8,20 +10,20 @@ from app.models.patient import Patient
 from app.services.memory.memory_repository import MemoryRepository
 
 
+# Rows fetched per round trip while streaming history, and memories embedded + upserted per bulk write.
+REINDEX_FETCH_SIZE = 500
+REINDEX_BATCH_SIZE = 200
+
+
 class MemoryOrchestrator:
     def __init__(self) -> None:
         self.repository = MemoryRepository()
 
     async def persist_profile_fact(self, patient: Patient) -> dict:
-        text = (
-            f"Patient profile: {patient.first_name} {patient.last_name}. "
-            f"Insurance: {patient.insurance_provider}. "
-            f"Chronic conditions: {patient.chronic_conditions or 'none'}."
-        )
         return await self.repository.save_memory(
             memory_type="profile_fact",
             patient_id=patient.id,
-            text=text,
+            text=self._profile_fact_text(patient),
             metadata={"source": "patient_register", "insurance_provider": patient.insurance_provider},
         )
 
@@ -83,6 +85,10 @@ class MemoryOrchestrator:
             memory_lines.append(f"- {item.get('memory_type')}: {item.get('text')}")
         return "\n".join(memory_lines)
 
+    async def search_patient_history(self, patient_id: int, query_text: str) -> list[dict]:
+        """Memories for one patient most relevant to query_text (e.g. the handoff complaint)."""
+        return await self.repository.search_memories(patient_id=patient_id, query_text=query_text)
+
     async def list_patient_memories(self, patient_id: int, limit: int = 20) -> list[dict]:
         return await self.repository.list_patient_memories(patient_id=patient_id, limit=limit)
 
@@ -92,31 +98,75 @@ class MemoryOrchestrator:
             raise ValueError("Patient not found")
 
         saved = 0
-        await self.persist_profile_fact(patient)
-        saved += 1
+        batch: list[dict] = [
+            {
+                "memory_id": f"{patient.id}:profile_fact:reindex",
+                "memory_type": "profile_fact",
+                "patient_id": patient.id,
+                "text": self._profile_fact_text(patient),
+                "metadata": {"source": "patient_register", "insurance_provider": patient.insurance_provider},
+            }
+        ]
+        for item in self._iter_structured_memories(db, patient.id):
+            batch.append(item)
+            if len(batch) >= REINDEX_BATCH_SIZE:
+                saved += len(await self.repository.save_memories_bulk(batch))
+                batch = []
+        if batch:
+            saved += len(await self.repository.save_memories_bulk(batch))
+
+        return {"patient_id": patient_id, "indexed_memories": saved}
 
-        appointments = db.query(Appointment).filter(Appointment.patient_id == patient.id).all()
+    async def reindex_all_patients(self, db: Session) -> AsyncIterator[dict]:
+        """Reindex every patient, yielding a progress record after each one."""
+        patient_ids = [patient_id for (patient_id,) in db.query(Patient.id).order_by(Patient.id).all()]
+        total = len(patient_ids)
+        indexed_total = 0
+        for completed, patient_id in enumerate(patient_ids, start=1):
+            result = await self.reindex_patient_from_structured_data(db=db, patient_id=patient_id)
+            indexed_total += result["indexed_memories"]
+            yield {**result, "completed": completed, "total": total, "indexed_total": indexed_total}
+
+    @staticmethod
+    def _iter_structured_memories(db: Session, patient_id: int) -> Iterator[dict]:
+        """Stream appointment and interaction history as memory items, REINDEX_FETCH_SIZE rows at a time."""
+        appointments = (
+            db.query(Appointment)
+            .filter(Appointment.patient_id == patient_id)
+            .order_by(Appointment.id)
+            .yield_per(REINDEX_FETCH_SIZE)
+        )
         for appointment in appointments:
-            await self.repository.save_memory(
-                memory_type="appointment_outcome",
-                patient_id=patient.id,
-                text=(
+            yield {
+                "memory_id": f"{patient_id}:appointment_outcome:appointment:{appointment.id}",
+                "memory_type": "appointment_outcome",
+                "patient_id": patient_id,
+                "text": (
                     f"Historic appointment {appointment.id}: {appointment.status}, doctor {appointment.doctor_name}, "
                     f"specialty {appointment.specialty}, insurance verified {appointment.insurance_verified}."
                 ),
-                metadata={"source": "reindex_appointment", "status": appointment.status},
-            )
-            saved += 1
-
-        interactions = db.query(InteractionLog).filter(InteractionLog.patient_id == patient.id).all()
+                "metadata": {"source": "reindex_appointment", "status": appointment.status},
+            }
+
+        interactions = (
+            db.query(InteractionLog)
+            .filter(InteractionLog.patient_id == patient_id)
+            .order_by(InteractionLog.id)
+            .yield_per(REINDEX_FETCH_SIZE)
+        )
         for interaction in interactions:
-            await self.repository.save_memory(
-                memory_type="symptom_visit",
-                patient_id=patient.id,
-                text=f"Historic interaction ({interaction.interaction_type}): {interaction.content}",
-                metadata={"source": "reindex_interaction", "status": interaction.status},
-            )
-            saved += 1
-
-        return {"patient_id": patient_id, "indexed_memories": saved}
-
+            yield {
+                "memory_id": f"{patient_id}:symptom_visit:interaction:{interaction.id}",
+                "memory_type": "symptom_visit",
+                "patient_id": patient_id,
+                "text": f"Historic interaction ({interaction.interaction_type}): {interaction.content}",
+                "metadata": {"source": "reindex_interaction", "status": interaction.status},
+            }
+
+    @staticmethod
+    def _profile_fact_text(patient: Patient) -> str:
+        return (
+            f"Patient profile: {patient.first_name} {patient.last_name}. "
+            f"Insurance: {patient.insurance_provider}. "
+            f"Chronic conditions: {patient.chronic_conditions or 'none'}."
+        )
@@ -6,6 +6,8 @@ from app.core.config import settings
 from app.services.memory.actian_client import ActianVectorClient
 from app.services.memory.embedding_service import EmbeddingService
 
+UPSERT_BATCH_SIZE = 200
+
 
 class MemoryRepository:
     def __init__(self) -> None:
@@ -19,7 +21,6 @@ class MemoryRepository:
         text: str,
         metadata: dict | None = None,
     ) -> dict:
-        await self.vector_client.ensure_collection()
         memory_id = self._build_memory_id(patient_id=patient_id, memory_type=memory_type)
         payload = {
             "memory_id": memory_id,
@@ -33,6 +34,41 @@ class MemoryRepository:
         await self.vector_client.upsert(memory_id=memory_id, vector=vector, payload=payload)
         return payload
 
+    async def save_memories_bulk(self, items: list[dict]) -> list[dict]:
+        """
+        Save many memories at once. Each item has memory_type, patient_id, text, optional metadata and
+        optional memory_id (a natural key makes re-saving idempotent). Texts are embedded with batched
+        requests and written with Actian batch_upsert, UPSERT_BATCH_SIZE rows per call.
+        """
+        created_at = datetime.utcnow().isoformat()
+        payloads: list[dict] = []
+        for index, item in enumerate(items):
+            memory_id = item.get("memory_id") or (
+                f"{self._build_memory_id(patient_id=item['patient_id'], memory_type=item['memory_type'])}:{index}"
+            )
+            payloads.append(
+                {
+                    "memory_id": memory_id,
+                    "memory_type": item["memory_type"],
+                    "patient_id": item["patient_id"],
+                    "text": (item.get("text") or "").strip(),
+                    "metadata": item.get("metadata") or {},
+                    "created_at": created_at,
+                }
+            )
+        if not payloads:
+            return []
+
+        vectors = await self.embedding_service.embed_many([payload["text"] for payload in payloads])
+        for start in range(0, len(payloads), UPSERT_BATCH_SIZE):
+            chunk = payloads[start : start + UPSERT_BATCH_SIZE]
+            await self.vector_client.batch_upsert(
+                memory_ids=[payload["memory_id"] for payload in chunk],
+                vectors=vectors[start : start + UPSERT_BATCH_SIZE],
+                payloads=chunk,
+            )
+        return payloads
+
     async def search_memories(self, patient_id: int, query_text: str, top_k: int | None = None) -> list[dict]:
         query_vector = await self.embedding_service.embed_text(query_text)
         return await self.vector_client.search(
@@ -0,0 +1,89 @@
+"""Secondary patient -> memory index in Redis, used to list a patient's memories and bound patient-scoped search."""
+
+from __future__ import annotations
+
+import json
+
+from redis import asyncio as redis_async
+from redis.exceptions import RedisError
+
+from app.services.redis_pool import get_redis
+
+
+class PatientMemoryIndex:
+    """
+    One Redis hash per patient (memory_id -> payload JSON), plus a marker once the patient's memories written
+    before the index existed have been copied in (mark_ready); only then is an empty hash "no memories" rather
+    than "never indexed". Methods return None instead of raising when Redis is unreachable so callers can fall
+    back to scanning the vector collection.
+    """
+
+    def __init__(self, redis_url: str | None = None, redis_client: redis_async.Redis | None = None) -> None:
+        # Defaults to the process-wide pool (bytes); json.loads reads the payloads as they are.
+        self.redis = redis_client or (redis_async.from_url(redis_url) if redis_url else get_redis())
+
+    def _key(self, collection: str, patient_id: int | str) -> str:
+        return f"memory:patient_index:{collection}:{patient_id}"
+
+    def _ready_key(self, collection: str, patient_id: int | str) -> str:
+        return f"memory:patient_index_ready:{collection}:{patient_id}"
+
+    async def add_many(self, collection: str, payloads: list[dict]) -> bool:
+        by_patient: dict[str, dict[str, str]] = {}
+        for payload in payloads:
+            patient_id = payload.get("patient_id")
+            memory_id = payload.get("memory_id")
+            if patient_id is None or not memory_id:
+                continue
+            by_patient.setdefault(str(patient_id), {})[memory_id] = json.dumps(payload, default=str)
+        if not by_patient:
+            return True
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for patient_id, mapping in by_patient.items():
+                    pipe.hset(self._key(collection, patient_id), mapping=mapping)
+                await pipe.execute()
+        except RedisError:
+            return False
+        return True
+
+    async def is_ready(self, collection: str, patient_id: int | str) -> bool | None:
+        """Whether the index holds all of the patient's memories (see mark_ready), or None if unavailable."""
+        try:
+            return bool(await self.redis.exists(self._ready_key(collection, patient_id)))
+        except RedisError:
+            return None
+
+    async def mark_ready(self, collection: str, patient_id: int | str, payloads: list[dict]) -> bool:
+        """Add the patient's memories found in the collection and mark the index complete for them."""
+        if not await self.add_many(collection, payloads):
+            return False
+        try:
+            await self.redis.set(self._ready_key(collection, patient_id), "1")
+        except RedisError:
+            return False
+        return True
+
+    async def remove(self, collection: str, patient_id: int | str, memory_ids: list[str]) -> None:
+        if not memory_ids:
+            return
+        try:
+            await self.redis.hdel(self._key(collection, patient_id), *memory_ids)
+        except RedisError:
+            pass
+
+    async def count(self, collection: str, patient_id: int | str) -> int | None:
+        try:
+            return int(await self.redis.hlen(self._key(collection, patient_id)))
+        except RedisError:
+            return None
+
+    async def list(self, collection: str, patient_id: int | str, limit: int) -> list[dict] | None:
+        """Newest-first payloads for the patient, or None if the index is unavailable."""
+        try:
+            values = await self.redis.hvals(self._key(collection, patient_id))
+        except RedisError:
+            return None
+        payloads = [json.loads(value) for value in values]
+        payloads.sort(key=lambda payload: payload.get("created_at") or "", reverse=True)
+        return payloads[:limit]
@@ -0,0 +1,52 @@
+"""
+Deterministic 64-bit vector IDs derived from a namespace and a natural key (memory_id, MedlinePlus topic id).
+
+IDs are 63-bit hashes, so two keys can collide: with n keys in a collection the odds are about n^2 / 2^64 (around
+1 in 18 million for a million keys). A collision is only caught among the keys assign_vector_ids is shown: one
+batch, or every key of a collection when the caller passes its assigned map (MedlinePlus ingest does, from its
+manifest). Memory writes check their batch only; a key that collides with one written earlier overwrites that
+row on upsert, and scripts/dedupe_vector_collections.py reports collisions among the rows still stored.
+"""
+
+from __future__ import annotations
+
+import hashlib
+
+from app.core.config import settings
+
+# Actian IDs are signed 64-bit; keep them positive.
+ID_MASK = (1 << 63) - 1
+
+
+class VectorIdCollisionError(ValueError):
+    """Two different natural keys hashed to the same vector ID."""
+
+
+def stable_vector_id(namespace: str, natural_key: str | int) -> int:
+    """Same namespace + key gives the same ID in every process and on every machine (unlike hash())."""
+    digest = hashlib.blake2b(
+        f"{namespace}\x1f{natural_key}".encode("utf-8"),
+        digest_size=8,
+        key=settings.vector_id_hash_key.encode("utf-8"),
+    ).digest()
+    return int.from_bytes(digest, "big") & ID_MASK
+
+
+def assign_vector_ids(
+    namespace: str, natural_keys: list[str | int], assigned: dict[int, str] | None = None
+) -> list[int]:
+    """
+    IDs for a batch of keys. Raises VectorIdCollisionError if two distinct keys share an ID, within the batch or
+    with a key in assigned (ID -> key already stored), which is updated with the batch's keys.
+    """
+    seen: dict[int, str] = {} if assigned is None else assigned
+    ids: list[int] = []
+    for natural_key in natural_keys:
+        vector_id = stable_vector_id(namespace, natural_key)
+        previous = seen.setdefault(vector_id, str(natural_key))
+        if previous != str(natural_key):
+            raise VectorIdCollisionError(
+                f"Vector ID {vector_id} collides for keys {previous!r} and {natural_key!r} in '{namespace}'."
+            )
+        ids.append(vector_id)
+    return ids
@@ -0,0 +1,155 @@
+"""
+ElevenLabs post-call processing: store the call summary for the chat session, settle the call with the outbound
+dispatcher and text the patient when a clinic confirmed. Runs on the Celery worker (agent.process_post_call) or
+inline in the webhook when TASK_QUEUE_ENABLED is off. Both steps are idempotent, since ElevenLabs retries webhooks
+and Celery redelivers tasks whose worker died.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from redis import asyncio as redis_async
+
+from app.core.config import settings
+from app.services.call_dispatcher import OutboundCallDispatcher, call_outcome, get_call_dispatcher, patient_summary
+from app.services.call_summary_events import publish_call_summary_ready
+from app.services.redis_pool import get_redis
+from app.services.session_store import RedisSessionStore
+from app.services.sms_service import SmsService
+
+# A claim is held this long while its work runs; a worker that dies mid-way lets a redelivery retry afterwards.
+CLAIM_LEASE_SECONDS = 300
+
+
+def extract_summary(body: dict[str, Any]) -> str:
+    """Build chat summary from ElevenLabs post-call payload. Prefer analysis/summary, else transcript."""
+    summary = ""
+    analysis = body.get("analysis") or body.get("result", {}).get("analysis")
+    if isinstance(analysis, dict):
+        summary = (
+            analysis.get("summary")
+            or analysis.get("transcript_summary")
+            or analysis.get("call_summary")
+            or ""
+        )
+    if not summary and "summary" in body:
+        summary = body["summary"] or ""
+    transcript = body.get("transcript") or body.get("transcript_text") or ""
+    if isinstance(transcript, list):
+        transcript = " ".join(
+            str(t.get("text", t) if isinstance(t, dict) else t) for t in transcript
+        )
+    if not summary and transcript:
+        summary = transcript[:2000] + ("..." if len(transcript) > 2000 else "")
+    if not summary:
+        summary = "Call completed. No transcript or summary available."
+    return summary.strip()
+
+
+def extract_conversation_id(body: dict[str, Any]) -> str:
+    """Get conversation_id from webhook payload."""
+    return (
+        body.get("conversation_id")
+        or body.get("conversationId")
+        or body.get("id")
+        or ""
+    )
+
+
+def _once_key(idempotency_key: str) -> str:
+    return f"triage:once:{idempotency_key}"
+
+
+async def _claim(redis: redis_async.Redis, idempotency_key: str) -> bool:
+    """False when this key already completed or another worker is running it right now."""
+    return bool(await redis.set(_once_key(idempotency_key), "pending", nx=True, px=CLAIM_LEASE_SECONDS * 1000))
+
+
+async def _complete(redis: redis_async.Redis, idempotency_key: str) -> None:
+    await redis.setex(_once_key(idempotency_key), settings.task_idempotency_ttl_seconds, "done")
+
+
+async def _release(redis: redis_async.Redis, idempotency_key: str) -> None:
+    await redis.delete(_once_key(idempotency_key))
+
+
+def _confirmation_sms(plan: dict[str, Any] | None, session_id: str, conversation_id: str) -> dict[str, str] | None:
+    """SMS arguments when this call is the one that won the booking (and the patient has a phone number)."""
+    if not plan or plan.get("winner") is None:
+        return None
+    winner = plan["calls"][plan["winner"]]
+    to_phone = (plan.get("variables") or {}).get("patient_phone") or ""
+    if winner.get("conversation_id") != conversation_id or not to_phone:
+        return None
+    return {
+        "idempotency_key": f"sms:{session_id}:{conversation_id}",
+        "to_phone": to_phone,
+        "message": (
+            f"Your appointment request with {winner['clinic_name']}'s office is confirmed. "
+            "Open the chat for the call summary."
+        ),
+    }
+
+
+async def handle_post_call(
+    body: dict[str, Any],
+    *,
+    store: RedisSessionStore | None = None,
+    dispatcher: OutboundCallDispatcher | None = None,
+) -> dict[str, Any]:
+    """
+    Settle the call, then store and announce what the patient should see: the winning call's summary, or the
+    outcome once every clinic declined (see patient_summary); a losing or release call's summary is not shown.
+    The result carries "sms" (arguments for send_confirmation_sms) when this call won the booking; a repeated
+    delivery returns duplicate=True.
+    """
+    conversation_id = extract_conversation_id(body)
+    if not conversation_id:
+        return {"ok": True, "message": "No conversation_id"}
+    store = store or RedisSessionStore()
+    session_id = await store.get_session_for_conversation(conversation_id)
+    if not session_id:
+        return {"ok": True, "message": "Session not found"}
+    idempotency_key = f"post_call:{conversation_id}"
+    if not await _claim(store.redis, idempotency_key):
+        return {"ok": True, "session_id": session_id, "duplicate": True}
+    try:
+        summary = extract_summary(body)
+        plan = await (dispatcher or get_call_dispatcher()).call_ended(
+            session_id, conversation_id, call_outcome(body), summary
+        )
+        shown = patient_summary(plan, conversation_id, summary)
+        if shown is not None:
+            await store.set_pending_call_summary(session_id, shown, conversation_id)
+            await publish_call_summary_ready(session_id)
+    except BaseException:
+        await _release(store.redis, idempotency_key)
+        raise
+    await _complete(store.redis, idempotency_key)
+    result: dict[str, Any] = {"ok": True, "session_id": session_id}
+    sms = _confirmation_sms(plan, session_id, conversation_id)
+    if sms:
+        result["sms"] = sms
+    return result
+
+
+async def send_confirmation_sms(
+    idempotency_key: str,
+    to_phone: str,
+    message: str,
+    *,
+    redis: redis_async.Redis | None = None,
+) -> dict[str, Any]:
+    """Text the patient once per idempotency key; a failed send releases the key so a retry can send it."""
+    redis = redis or get_redis()
+    if not await _claim(redis, idempotency_key):
+        return {"status": "duplicate"}
+    try:
+        result = await asyncio.to_thread(SmsService().send_appointment_confirmation, to_phone, message)
+    except BaseException:
+        await _release(redis, idempotency_key)
+        raise
+    await _complete(redis, idempotency_key)
+    return result
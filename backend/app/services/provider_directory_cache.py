@@ -0,0 +1,128 @@
+"""Cache for Zocdoc provider-directory lookups, shared by all sessions of a worker."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.services.single_flight import SingleFlight
+
+
+@dataclass
+class _Entry:
+    results: list[dict]
+    fetched_at: float
+
+
+class ProviderDirectoryCache:
+    """
+    In-process, keyed on the full query (zip, specialty / visit reason, insurance, page, page size). An entry is
+    fresh for ttl_seconds; for stale_seconds after that it is still served while one background task refreshes
+    it (stale-while-revalidate). Concurrent misses for the same key share one upstream request (single-flight).
+    LRU-bounded by max_entries. Callers get copies, so annotating a result does not change the cached list.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int | None = None,
+        ttl_seconds: float | None = None,
+        stale_seconds: float | None = None,
+    ) -> None:
+        self.max_entries = max(1, settings.provider_cache_max_entries if max_entries is None else max_entries)
+        self.ttl_seconds = settings.provider_cache_ttl_seconds if ttl_seconds is None else ttl_seconds
+        self.stale_seconds = settings.provider_cache_stale_seconds if stale_seconds is None else stale_seconds
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._inflight: SingleFlight[list[dict]] = SingleFlight()
+        self._refreshes: set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.evictions = 0
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[list[dict]]]) -> list[dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if age < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _copy(entry.results)
+            if age < self.ttl_seconds + self.stale_seconds:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    task = asyncio.create_task(self._refresh(key, fetch))
+                    self._refreshes.add(task)
+                    task.add_done_callback(self._refreshes.discard)
+                return _copy(entry.results)
+
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        return _copy(await self._load(key, fetch))
+
+    async def _load(self, key: Hashable, fetch: Callable[[], Awaitable[list[dict]]]) -> list[dict]:
+        async def fetch_and_store() -> list[dict]:
+            results = await fetch()
+            self._store(key, results)
+            return results
+
+        return await self._inflight.run(key, fetch_and_store)
+
+    async def _refresh(self, key: Hashable, fetch: Callable[[], Awaitable[list[dict]]]) -> None:
+        self.refreshes += 1
+        try:
+            await self._load(key, fetch)
+        except Exception:
+            # Keep serving the stale entry until it ages out; the next stale hit tries again.
+            self.refresh_failures += 1
+
+    def _store(self, key: Hashable, results: list[dict]) -> None:
+        self._entries[key] = _Entry(_copy(results), time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        hits = self.hits + self.stale_hits + self.coalesced
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "evictions": self.evictions,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _copy(results: list[dict]) -> list[dict]:
+    return [dict(item) for item in results]
+
+
+_default_cache: ProviderDirectoryCache | None = None
+
+
+def get_provider_directory_cache() -> ProviderDirectoryCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ProviderDirectoryCache()
+    return _default_cache
+
+
+def reset_provider_directory_cache() -> None:
+    global _default_cache
+    _default_cache = None
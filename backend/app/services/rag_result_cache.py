@@ -0,0 +1,167 @@
+"""Semantic cache for the RAG handoff: similar intake queries reuse KB evidence and the recommended specialty."""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.memory.embedding_cache import normalize_text
+from app.services.memory.embedding_service import EmbeddingService
+
+
+@dataclass
+class _Entry:
+    vector: np.ndarray
+    result: dict
+    kb_version: str | None
+    expires_at: float
+
+
+class RagResultCache:
+    """
+    In-process, shared by all sessions of a worker. Keyed on the embedding of the handoff query: a lookup hits
+    when an unexpired entry's query vector has cosine similarity >= threshold. LRU-bounded by max_entries.
+    Entries remember the KB version they were computed against; a lookup under a different version (the KB
+    was re-ingested) drops the whole cache.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int | None = None,
+        ttl_seconds: int | None = None,
+        similarity_threshold: float | None = None,
+        embedding: EmbeddingService | None = None,
+    ) -> None:
+        self.max_entries = max(1, settings.rag_cache_max_entries if max_entries is None else max_entries)
+        self.ttl_seconds = max(1, settings.rag_cache_ttl_seconds if ttl_seconds is None else ttl_seconds)
+        self.similarity_threshold = (
+            settings.rag_cache_similarity_threshold if similarity_threshold is None else similarity_threshold
+        )
+        self._embedding = embedding
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._matrix: np.ndarray | None = None
+        self._matrix_keys: list[str] = []
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def embedding(self) -> EmbeddingService:
+        if self._embedding is None:
+            self._embedding = EmbeddingService()
+        return self._embedding
+
+    async def lookup(self, query: str, kb_version: str | None) -> dict | None:
+        """Cached result for query (or a near-identical one) under kb_version, else None."""
+        key = normalize_text(query).lower()
+        if not key:
+            return None
+        self._check_version(kb_version)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > now:
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry.result
+
+        self._expire(now)
+        if not self._entries:
+            self.misses += 1
+            return None
+        query_vector = await self._embed(query)
+        if query_vector is None:
+            self.misses += 1
+            return None
+        matrix = self._vectors()
+        scores = matrix @ query_vector
+        best = int(np.argmax(scores))
+        if float(scores[best]) < self.similarity_threshold:
+            self.misses += 1
+            return None
+        best_key = self._matrix_keys[best]
+        self._entries.move_to_end(best_key)
+        self.semantic_hits += 1
+        return self._entries[best_key].result
+
+    async def store(self, query: str, kb_version: str | None, result: dict) -> None:
+        key = normalize_text(query).lower()
+        if not key:
+            return
+        self._check_version(kb_version)
+        query_vector = await self._embed(query)
+        if query_vector is None:
+            return
+        self._entries[key] = _Entry(query_vector, result, kb_version, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        self._matrix = None
+
+    def invalidate(self) -> None:
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._matrix = None
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.semantic_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _check_version(self, kb_version: str | None) -> None:
+        if not self._entries:
+            return
+        newest = next(reversed(self._entries.values()))
+        if newest.kb_version != kb_version:
+            self.invalidate()
+
+    def _expire(self, now: float) -> None:
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+            self.evictions += 1
+        if expired:
+            self._matrix = None
+
+    def _vectors(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries)
+            self._matrix = np.stack([self._entries[key].vector for key in self._matrix_keys])
+        return self._matrix
+
+    async def _embed(self, query: str) -> np.ndarray | None:
+        # Same text the KB search embeds, so the embedding cache serves one of the two calls.
+        vector = np.asarray(await self.embedding.embed_text(normalize_text(query)), dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+
+_default_cache: RagResultCache | None = None
+
+
+def get_rag_result_cache() -> RagResultCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = RagResultCache()
+    return _default_cache
+
+
+def reset_rag_result_cache() -> None:
+    global _default_cache
+    _default_cache = None
@@ -0,0 +1,41 @@
+"""Process-wide Redis client on one connection pool, shared by the session store, graph nodes and routes."""
+
+from __future__ import annotations
+
+from redis import asyncio as redis_async
+
+from app.core.config import settings
+
+_client: redis_async.Redis | None = None
+
+
+def get_redis() -> redis_async.Redis:
+    """
+    Binary (bytes) client; connections are opened lazily and reused across turns, nodes and requests. When all
+    REDIS_MAX_CONNECTIONS are busy a caller waits up to REDIS_POOL_TIMEOUT_SECONDS for one to come back instead of
+    failing at once.
+    """
+    global _client
+    if _client is None:
+        pool = redis_async.BlockingConnectionPool.from_url(
+            settings.redis_url,
+            max_connections=settings.redis_max_connections,
+            timeout=settings.redis_pool_timeout_seconds,
+        )
+        # from_pool hands the pool to the client, so aclose() disconnects it as well.
+        _client = redis_async.Redis.from_pool(pool)
+    return _client
+
+
+def reset_redis() -> None:
+    """Forget the shared client without closing it (tests; each test runs on its own event loop)."""
+    global _client
+    _client = None
+
+
+async def close_redis() -> None:
+    """Close the shared client and disconnect its pool (FastAPI lifespan shutdown, end of each Celery task)."""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
@@ -1,12 +1,110 @@
+import asyncio
+import hashlib
 import json
+import random
+import time
+import zlib
+from collections import OrderedDict
 from typing import Any
 
+import orjson
 from redis import asyncio as redis_async
+from redis.exceptions import ResponseError, WatchError
 
 from app.core.config import settings
+from app.services.redis_pool import get_redis
+
+# Marks a zlib-compressed field value; orjson output never starts with a NUL byte.
+COMPRESSED_PREFIX = b"\x00"
+# Field digests remembered per session (LRU), so a save writes only the fields that changed since load.
+MAX_TRACKED_SESSIONS = 10000
+
+
+class SessionBusyError(RuntimeError):
+    """The session's turn lock could not be acquired in time, or was lost before the state was saved."""
+
+
+def encode_field(value: Any) -> bytes:
+    """orjson bytes for one state field, zlib-compressed when at least SESSION_COMPRESS_MIN_BYTES long."""
+    encoded = orjson.dumps(value, default=str)
+    if len(encoded) >= settings.session_compress_min_bytes:
+        compressed = COMPRESSED_PREFIX + zlib.compress(encoded, 1)
+        if len(compressed) < len(encoded):
+            return compressed
+    return encoded
+
+
+def decode_field(payload: bytes | str) -> Any:
+    if isinstance(payload, bytes) and payload.startswith(COMPRESSED_PREFIX):
+        payload = zlib.decompress(payload[len(COMPRESSED_PREFIX) :])
+    return orjson.loads(payload)
+
+
+def _digest(encoded: bytes) -> bytes:
+    return hashlib.blake2b(encoded, digest_size=8).digest()
+
+
+def _text(value: bytes | str | None) -> str | None:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class SessionStoreStats:
+    """Process-wide write/read counters for session persistence (bytes per session, field deltas, codec time)."""
+
+    def __init__(self) -> None:
+        self.saves = 0
+        self.full_writes = 0
+        self.fields_written = 0
+        self.fields_unchanged = 0
+        self.fields_deleted = 0
+        self.bytes_written = 0
+        self.session_bytes_total = 0
+        self.serialize_seconds = 0.0
+        self.loads = 0
+        self.legacy_loads = 0
+        self.deserialize_seconds = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "saves": self.saves,
+            "full_writes": self.full_writes,
+            "fields_written": self.fields_written,
+            "fields_unchanged": self.fields_unchanged,
+            "fields_deleted": self.fields_deleted,
+            "bytes_written": self.bytes_written,
+            "avg_bytes_per_save": round(self.bytes_written / self.saves, 1) if self.saves else 0.0,
+            "avg_bytes_per_session": round(self.session_bytes_total / self.saves, 1) if self.saves else 0.0,
+            "avg_serialize_ms": round(self.serialize_seconds * 1000 / self.saves, 3) if self.saves else 0.0,
+            "loads": self.loads,
+            "legacy_loads": self.legacy_loads,
+            "avg_deserialize_ms": round(self.deserialize_seconds * 1000 / self.loads, 3) if self.loads else 0.0,
+        }
+
+
+_stats = SessionStoreStats()
+# session_id -> {field: digest of the stored bytes}; shared by every store instance in the process.
+_field_digests: OrderedDict[str, dict[str, bytes]] = OrderedDict()
+
+
+def get_session_store_stats() -> SessionStoreStats:
+    return _stats
+
+
+def reset_session_store_state() -> None:
+    global _stats
+    _stats = SessionStoreStats()
+    _field_digests.clear()
 
 
 class RedisSessionStore:
+    """
+    Interview state lives in one Redis hash per session, one field per top-level state key (orjson, large
+    values zlib-compressed). set() compares each encoded field with what this process last loaded or saved and
+    writes only the fields that changed (plus HDEL for removed keys), so large, rarely-changing fields such as
+    kb_evidence and provider_search are not rewritten every turn. Sessions saved before this format (a JSON
+    string) are still readable and are converted on their next save.
+    """
+
     def __init__(
         self,
         redis_url: str | None = None,
@@ -14,7 +112,9 @@ class RedisSessionStore:
         redis_client: redis_async.Redis | None = None,
     ) -> None:
         self.ttl_seconds = ttl_seconds
-        self.redis = redis_client or redis_async.from_url(redis_url or settings.redis_url, decode_responses=True)
+        # Binary client: session fields may be compressed; string values are decoded where they are read.
+        # Defaults to the process-wide pool; a redis_url gets its own client.
+        self.redis = redis_client or (redis_async.from_url(redis_url) if redis_url else get_redis())
 
     def _key(self, session_id: str) -> str:
         return f"triage:session:{session_id}"
@@ -25,6 +125,61 @@ class RedisSessionStore:
     def _summary_key(self, session_id: str) -> str:
         return f"triage:call_summary:{session_id}"
 
+    def _lock_key(self, session_id: str) -> str:
+        return f"triage:session_lock:{session_id}"
+
+    def _fence_key(self, session_id: str) -> str:
+        return f"triage:session_fence:{session_id}"
+
+    async def acquire_lock(self, session_id: str, *, ttl_seconds: float, wait_seconds: float) -> int:
+        """
+        Take the session's turn lock (SET NX with a lease) and return its fencing token, a per-session counter
+        that increases with every acquisition. Polls until wait_seconds, then raises SessionBusyError. The fence
+        counter expires with the session (at least one lease later), so it does not outlive it in Redis.
+        """
+        fence_key = self._fence_key(session_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.incr(fence_key)
+            pipe.expire(fence_key, max(self.ttl_seconds, int(ttl_seconds) + 1))
+            fence = int((await pipe.execute())[0])
+        deadline = time.monotonic() + wait_seconds
+        delay = 0.02
+        while not await self.redis.set(self._lock_key(session_id), fence, nx=True, px=int(ttl_seconds * 1000)):
+            if time.monotonic() >= deadline:
+                raise SessionBusyError(f"Session {session_id} is busy with another turn.")
+            await asyncio.sleep(delay + random.uniform(0, delay))
+            delay = min(delay * 2, 0.5)
+        return fence
+
+    async def renew_lock(self, session_id: str, fence: int, *, ttl_seconds: float) -> bool:
+        """Extend the lease to ttl_seconds from now if this fence still holds the lock; False if it was lost."""
+        key = self._lock_key(session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                if _text(await pipe.get(key)) != str(fence):
+                    return False
+                pipe.multi()
+                pipe.pexpire(key, int(ttl_seconds * 1000))
+                await pipe.execute()
+            except WatchError:
+                return False
+        return True
+
+    async def release_lock(self, session_id: str, fence: int) -> None:
+        """Release the lock only if this fence still holds it (its lease may have expired and been re-taken)."""
+        key = self._lock_key(session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(key)
+                if _text(await pipe.get(key)) != str(fence):
+                    return
+                pipe.multi()
+                pipe.delete(key)
+                await pipe.execute()
+            except WatchError:
+                pass
+
     async def set_conversation_session(self, conversation_id: str, session_id: str) -> None:
         """Map ElevenLabs conversation_id to session_id for webhook lookup."""
         if not conversation_id or not session_id:
@@ -35,7 +190,7 @@ class RedisSessionStore:
         """Resolve session_id from ElevenLabs conversation_id."""
         if not conversation_id:
             return None
-        return await self.redis.get(self._conv_key(conversation_id))
+        return _text(await self.redis.get(self._conv_key(conversation_id)))
 
     async def set_pending_call_summary(
         self, session_id: str, summary: str, conversation_id: str = ""
@@ -63,22 +218,114 @@ class RedisSessionStore:
         await self.redis.delete(self._summary_key(session_id))
 
     async def get_pending_call_summary(self, session_id: str) -> dict[str, Any] | None:
-        """Get and clear the pending call summary for this session (consume once)."""
+        """Get and clear the pending call summary for this session (consume once, atomically with GETDEL)."""
         if not session_id:
             return None
-        key = self._summary_key(session_id)
-        payload = await self.redis.get(key)
+        payload = await self.redis.getdel(self._summary_key(session_id))
         if not payload:
             return None
-        await self.redis.delete(key)
         return json.loads(payload)
 
+    async def load_turn(self, session_id: str) -> tuple[dict[str, Any] | None, dict[str, Any] | None]:
+        """
+        Everything a chat turn reads up front, in one pipelined round trip: the session state and the pending call
+        summary, which is consumed (GETDEL) so two turns can never both show it.
+        """
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self._key(session_id))
+            pipe.getdel(self._summary_key(session_id))
+            fields, summary = await pipe.execute(raise_on_error=False)
+        if isinstance(summary, Exception):
+            raise summary
+        pending = json.loads(summary) if summary else None
+        if isinstance(fields, ResponseError):
+            return await self._get_legacy(session_id), pending
+        if isinstance(fields, Exception):
+            raise fields
+        return self._decode_state(session_id, fields), pending
+
     async def get(self, session_id: str) -> dict[str, Any] | None:
+        try:
+            fields = await self.redis.hgetall(self._key(session_id))
+        except ResponseError:
+            return await self._get_legacy(session_id)
+        return self._decode_state(session_id, fields)
+
+    async def _get_legacy(self, session_id: str) -> dict[str, Any] | None:
+        """WRONGTYPE on the hash read: a session saved as one JSON string before the hash format."""
         payload = await self.redis.get(self._key(session_id))
         if not payload:
             return None
+        _stats.legacy_loads += 1
+        _field_digests.pop(session_id, None)
         return json.loads(payload)
 
-    async def set(self, session_id: str, state: dict[str, Any]) -> None:
-        payload = json.dumps(state)
-        await self.redis.setex(self._key(session_id), self.ttl_seconds, payload)
+    def _decode_state(self, session_id: str, fields: dict) -> dict[str, Any] | None:
+        if not fields:
+            # Expired or never saved: the next save must write every field.
+            _field_digests.pop(session_id, None)
+            return None
+        started = time.perf_counter()
+        state: dict[str, Any] = {}
+        digests: dict[str, bytes] = {}
+        for name, payload in fields.items():
+            name = _text(name)
+            state[name] = decode_field(payload)
+            digests[name] = _digest(payload if isinstance(payload, bytes) else payload.encode("utf-8"))
+        _stats.deserialize_seconds += time.perf_counter() - started
+        _stats.loads += 1
+        self._remember(session_id, digests)
+        return state
+
+    async def set(self, session_id: str, state: dict[str, Any], *, fence: int | None = None) -> None:
+        """
+        Save state, writing only changed fields. With fence, the write commits only while that fencing token
+        still holds the session lock (WATCH on the lock key); otherwise SessionBusyError and nothing is written.
+        """
+        started = time.perf_counter()
+        encoded = {name: encode_field(value) for name, value in state.items()}
+        digests = {name: _digest(payload) for name, payload in encoded.items()}
+        _stats.serialize_seconds += time.perf_counter() - started
+
+        previous = _field_digests.get(session_id)
+        key = self._key(session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if fence is not None:
+                lock_key = self._lock_key(session_id)
+                await pipe.watch(lock_key)
+                if _text(await pipe.get(lock_key)) != str(fence):
+                    raise SessionBusyError(f"Lost the lock on session {session_id} before saving.")
+                pipe.multi()
+            if previous is None:
+                # Unknown to this process (or a legacy string session): replace the whole hash.
+                changed = encoded
+                removed: list[str] = []
+                pipe.delete(key)
+            else:
+                changed = {name: payload for name, payload in encoded.items() if previous.get(name) != digests[name]}
+                removed = [name for name in previous if name not in encoded]
+            if changed:
+                pipe.hset(key, mapping=changed)
+            if removed:
+                pipe.hdel(key, *removed)
+            pipe.expire(key, self.ttl_seconds)
+            try:
+                await pipe.execute()
+            except WatchError as exc:
+                raise SessionBusyError(f"Lost the lock on session {session_id} before saving.") from exc
+
+        self._remember(session_id, digests)
+        _stats.saves += 1
+        _stats.full_writes += int(previous is None)
+        _stats.fields_written += len(changed)
+        _stats.fields_unchanged += len(encoded) - len(changed)
+        _stats.fields_deleted += len(removed)
+        _stats.bytes_written += sum(len(payload) for payload in changed.values())
+        _stats.session_bytes_total += sum(len(payload) for payload in encoded.values())
+
+    @staticmethod
+    def _remember(session_id: str, digests: dict[str, bytes]) -> None:
+        _field_digests[session_id] = digests
+        _field_digests.move_to_end(session_id)
+        while len(_field_digests) > MAX_TRACKED_SESSIONS:
+            _field_digests.popitem(last=False)
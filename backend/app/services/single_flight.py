@@ -0,0 +1,52 @@
+"""Per-key single-flight for async work (OAuth token refresh, provider-directory lookups)."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    Concurrent run() calls for the same key share one execution: the first caller (the leader) runs the work and
+    later callers wait for its result, shielded so a waiter that gives up does not cancel it. A failure reaches
+    every waiter; when the leader itself is cancelled, the first waiter to wake runs the work instead.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def run(self, key: Hashable, work: Callable[[], Awaitable[T]]) -> T:
+        while (pending := self._inflight.get(key)) is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The leader was cancelled (e.g. its caller timed out); take over.
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await work()
+        except BaseException as exc:
+            # Resolve the future on every exit so waiters never hang: they re-raise an error, and retry themselves
+            # when the leader was cancelled.
+            if isinstance(exc, Exception):
+                future.set_exception(exc)
+                # Mark it retrieved so a failure nobody waited for is not reported by the loop.
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
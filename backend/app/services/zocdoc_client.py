@@ -1,6 +1,6 @@
-import httpx
-
 from app.core.config import settings
+from app.services.http_client import oauth_get_json
+from app.services.provider_directory_cache import get_provider_directory_cache
 
 # Default for provider_locations API when no credentials (sandbox). One of specialty_id or visit_reason_id required.
 DEFAULT_VISIT_REASON_ID = "pc_FRO-18leckytNKtruw5dLR"
@@ -27,7 +27,8 @@ class ZocDocClient:
     ) -> list[dict]:
         """
         GET /v1/provider_locations. Returns top 3 (or page_size) with doctor_name, phone_number, address, provider_location_id.
-        One of specialty_id or visit_reason_id is required.
+        One of specialty_id or visit_reason_id is required. Results are served from the provider-directory cache
+        (keyed on every query parameter) when PROVIDER_CACHE_ENABLED.
         """
         if not specialty_id and not visit_reason_id:
             visit_reason_id = visit_reason_id or DEFAULT_VISIT_REASON_ID
@@ -35,8 +36,6 @@ class ZocDocClient:
         if not self.client_id or not self.client_secret:
             return self._sandbox_provider_locations(zip_code, page_size)
 
-        token = await self._get_access_token()
-        headers = {"Authorization": f"Bearer {token}"}
         params: dict[str, str | int] = {
             "zip_code": zip_code,
             "page": page,
@@ -50,15 +49,15 @@ class ZocDocClient:
         if insurance_plan_id:
             params["insurance_plan_id"] = insurance_plan_id
 
-        async with httpx.AsyncClient(timeout=20) as client:
-            response = await client.get(
-                f"{self.base_url}/v1/provider_locations",
-                headers=headers,
-                params=params,
-            )
-            response.raise_for_status()
-            payload = response.json()
+        if not settings.provider_cache_enabled:
+            return await self._fetch_provider_locations(params, page_size)
+        key = tuple(sorted(params.items()))
+        return await get_provider_directory_cache().get_or_fetch(
+            key, lambda: self._fetch_provider_locations(params, page_size)
+        )
 
+    async def _fetch_provider_locations(self, params: dict[str, str | int], page_size: int) -> list[dict]:
+        payload = await self._get("/v1/provider_locations", params)
         data = payload.get("data") or payload
         locations = data.get("provider_locations", [])[:page_size]
         return [self._parse_provider_location(item) for item in locations]
@@ -137,8 +136,6 @@ class ZocDocClient:
         if not self.client_id or not self.client_secret:
             return self._sandbox_availability(provider_location_ids)
 
-        token = await self._get_access_token()
-        headers = {"Authorization": f"Bearer {token}"}
         params: dict[str, str] = {
             "provider_location_ids": ",".join(provider_location_ids),
             "visit_reason_id": visit_reason_id,
@@ -149,15 +146,7 @@ class ZocDocClient:
         if end_date_in_provider_local_time:
             params["end_date_in_provider_local_time"] = end_date_in_provider_local_time
 
-        async with httpx.AsyncClient(timeout=20) as client:
-            response = await client.get(
-                f"{self.base_url}/v1/provider_locations/availability",
-                headers=headers,
-                params=params,
-            )
-            response.raise_for_status()
-            payload = response.json()
-
+        payload = await self._get("/v1/provider_locations/availability", params)
         data = payload.get("data") or payload
         raw_slots = data.get("availability", data.get("availabilities", []))
         if isinstance(raw_slots, dict):
@@ -210,14 +199,8 @@ class ZocDocClient:
                 },
             ]
 
-        token = await self._get_access_token()
-        headers = {"Authorization": f"Bearer {token}"}
         params = {"specialty": specialty, "zip_code": zip_code, "insurance_provider": insurance_provider}
-
-        async with httpx.AsyncClient(timeout=20) as client:
-            response = await client.get(f"{self.base_url}/v1/provider_locations", headers=headers, params=params)
-            response.raise_for_status()
-            payload = response.json()
+        payload = await self._get("/v1/provider_locations", params)
 
         doctors: list[dict] = []
         for item in payload.get("provider_locations", []):
@@ -233,16 +216,11 @@ class ZocDocClient:
             )
         return doctors
 
-    async def _get_access_token(self) -> str:
-        async with httpx.AsyncClient(timeout=20) as client:
-            response = await client.post(
-                f"{self.base_url}/oauth/token",
-                data={
-                    "grant_type": "client_credentials",
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                },
-            )
-            response.raise_for_status()
-            return response.json()["access_token"]
-
+    async def _get(self, path: str, params: dict) -> dict:
+        return await oauth_get_json(
+            f"{self.base_url}{path}",
+            token_url=f"{self.base_url}/oauth/token",
+            client_id=self.client_id,
+            client_secret=self.client_secret,
+            params=params,
+        )
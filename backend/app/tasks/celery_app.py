@@ -1,7 +1,63 @@
-from celery import Celery
+import json
+import time
+
+import redis
+from celery import Celery, Task
 
 from app.core.config import settings
 
+# Redis list of tasks that failed after their last retry (newest first), for inspection and redrive from /admin.
+DEAD_LETTER_KEY = "triage:dead_letter"
+
+
+class DeadLetterTask(Task):
+    """
+    Retries with exponential backoff and jitter on any exception; once max_retries is spent the task (name,
+    arguments, error) is pushed onto DEAD_LETTER_KEY. The Redis broker has no dead-letter exchange, so this
+    stands in for one.
+    """
+
+    autoretry_for = (Exception,)
+    retry_backoff = settings.task_retry_backoff_seconds
+    retry_backoff_max = settings.task_retry_backoff_max_seconds
+    retry_jitter = True
+    max_retries = settings.task_max_retries
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo) -> None:
+        entry = {
+            "task": self.name,
+            "task_id": task_id,
+            "args": list(args or []),
+            "kwargs": dict(kwargs or {}),
+            "error": f"{type(exc).__name__}: {exc}",
+            "retries": self.request.retries,
+            "failed_at": round(time.time(), 3),
+        }
+        client = redis.Redis.from_url(settings.redis_url)
+        try:
+            with client.pipeline() as pipe:
+                pipe.lpush(DEAD_LETTER_KEY, json.dumps(entry, default=str))
+                pipe.ltrim(DEAD_LETTER_KEY, 0, settings.dead_letter_max_entries - 1)
+                pipe.execute()
+        finally:
+            client.close()
 
-celery_app = Celery("hacklytics_agent", broker=settings.redis_url, backend=settings.redis_url)
 
+celery_app = Celery(
+    "hacklytics_agent",
+    broker=settings.redis_url,
+    backend=settings.redis_url,
+    include=["app.tasks.workflows"],
+)
+celery_app.conf.update(
+    # Acknowledge only after a task finished, so work in flight when a worker dies is redelivered to another.
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    # Redelivery of unacknowledged tasks happens after this long (must exceed the longest task plus backoff).
+    broker_transport_options={"visibility_timeout": settings.task_visibility_timeout_seconds},
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    result_expires=settings.task_idempotency_ttl_seconds,
+)
@@ -1,8 +1,92 @@
-from app.tasks.celery_app import celery_app
+"""
+Celery tasks for the booking workflow: placing the clinic calls, the dispatcher's stagger / retry timers,
+post-call webhook processing and the SMS confirmation. Each task runs its coroutine on a fresh event loop and
+closes the loop-bound clients (Redis pool, HTTP client) afterwards; failures retry with backoff and end up in the
+dead-letter list (see DeadLetterTask).
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+from app.services.call_dispatcher import OutboundCallDispatcher, close_call_dispatcher
+from app.services.call_summary_events import close_event_bus, publish_call_summary_ready
+from app.services.http_client import close_http_client
+from app.services.post_call import handle_post_call, send_confirmation_sms
+from app.services.redis_pool import close_redis
+from app.services.session_store import RedisSessionStore
+from app.tasks.celery_app import DeadLetterTask, celery_app
+
+T = TypeVar("T")
+
+
+def _run(make_coro: Callable[[], Awaitable[T]]) -> T:
+    async def main() -> T:
+        try:
+            return await make_coro()
+        finally:
+            await close_call_dispatcher()
+            await close_event_bus()
+            await close_redis()
+            await close_http_client()
+
+    return asyncio.run(main())
+
+
+def _schedule_dispatch_timer(delay: float, action: str, session_id: str) -> None:
+    dispatch_timer_task.apply_async((session_id, action), countdown=delay)
+
+
+def _dispatcher() -> OutboundCallDispatcher:
+    return OutboundCallDispatcher(scheduler=_schedule_dispatch_timer)
+
+
+async def _start_outbound_calls(
+    session_id: str, clinics: list[dict[str, Any]], variables: dict[str, Any], strategy: str | None
+) -> dict[str, Any]:
+    plan = await _dispatcher().start(session_id, clinics, variables, strategy=strategy)
+    if plan.get("status") == "exhausted" and plan.get("winner") is None:
+        # No call could be started; the chat already answered, so tell the patient through the summary channel.
+        errors = sorted({call.get("error") or "unknown error" for call in plan.get("calls") or []})
+        await RedisSessionStore().set_pending_call_summary(
+            session_id,
+            f"We couldn't start the calls to the clinics ({'; '.join(errors)}). "
+            "You can call them directly at the numbers above.",
+        )
+        await publish_call_summary_ready(session_id)
+    return {"session_id": session_id, "status": plan.get("status", ""), "strategy": plan.get("strategy", "")}
+
+
+@celery_app.task(name="agent.start_outbound_calls", base=DeadLetterTask)
+def start_outbound_calls_task(
+    session_id: str, clinics: list[dict[str, Any]], variables: dict[str, Any], strategy: str | None = None
+) -> dict:
+    # Idempotent: a session whose plan is still dialling keeps it (see OutboundCallDispatcher.start).
+    return _run(lambda: _start_outbound_calls(session_id, clinics, variables, strategy))
+
+
+@celery_app.task(name="agent.dispatch_timer", base=DeadLetterTask)
+def dispatch_timer_task(session_id: str, action: str) -> None:
+    _run(lambda: _dispatcher().run_timer(session_id, action))
+
+
+@celery_app.task(name="agent.process_post_call", base=DeadLetterTask)
+def process_post_call_task(body: dict[str, Any]) -> dict:
+    result = _run(lambda: handle_post_call(body, dispatcher=_dispatcher()))
+    sms = result.pop("sms", None)
+    if sms:
+        send_sms_confirmation_task.delay(**sms)
+    return result
+
+
+@celery_app.task(name="agent.send_sms_confirmation", base=DeadLetterTask)
+def send_sms_confirmation_task(idempotency_key: str, to_phone: str, message: str) -> dict:
+    return _run(lambda: send_confirmation_sms(idempotency_key, to_phone, message))
 
 
 @celery_app.task(name="agent.proactive_outreach")
 def proactive_outreach_task(patient_id: int, message: str) -> dict:
     # Placeholder task for proactive outreach scheduling.
     return {"patient_id": patient_id, "message": message, "status": "queued"}
-
@@ -0,0 +1,78 @@
+"""
+Benchmark MedlinePlus retrieval modes (vector, lexical, hybrid) over a labelled query set.
+
+Each line of the query file is {"query": ..., "relevant": [topic titles]}. Reports mean recall@K (share of the
+relevant titles found in the top K) and p50/p95 search latency per mode. Queries are embedded once in a warm-up
+pass, so latency measures retrieval and fusion rather than OpenAI round trips.
+
+Usage (from backend directory, after ingest):
+    set PYTHONPATH=.
+    python -m scripts.benchmark_kb_retrieval [--queries scripts/medlineplus_eval_queries.jsonl] [--k 5] [--depth 50]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.kb_medlineplus_service import SEARCH_MODES, KBMedlinePlusService
+from app.services.memory.actian_pool import close_actian_pool
+
+DEFAULT_QUERIES = Path(__file__).resolve().parent / "medlineplus_eval_queries.jsonl"
+
+
+def _load_queries(path: Path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Recall@K and latency of MedlinePlus retrieval modes")
+    parser.add_argument("--queries", type=Path, default=DEFAULT_QUERIES)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--depth", type=int, default=None, help="Candidate depth per ranking (default: settings).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per mode.")
+    args = parser.parse_args()
+
+    queries = _load_queries(args.queries)
+    kb = KBMedlinePlusService()
+    if args.depth:
+        kb.candidate_depth = args.depth
+    await kb.warm_lexical_index(wait=True)
+    for item in queries:
+        await kb.search(item["query"], top_k=args.k)
+
+    print(f"{len(queries)} queries, k={args.k}, candidate depth={kb.candidate_depth}")
+    for mode in SEARCH_MODES:
+        recalls: list[float] = []
+        latencies_ms: list[float] = []
+        for _ in range(args.repeat):
+            recalls.clear()
+            for item in queries:
+                started = time.perf_counter()
+                results = await kb.search(item["query"], top_k=args.k, mode=mode)
+                latencies_ms.append((time.perf_counter() - started) * 1000)
+                relevant = {title.lower() for title in item["relevant"]}
+                found = {(result.get("title") or "").lower() for result in results} & relevant
+                recalls.append(len(found) / len(relevant))
+        print(
+            f"  {mode:<8} recall@{args.k}={statistics.mean(recalls):.3f}  "
+            f"p50={_percentile(latencies_ms, 50):.1f}ms  p95={_percentile(latencies_ms, 95):.1f}ms"
+        )
+
+    await close_actian_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
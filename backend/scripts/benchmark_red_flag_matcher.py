@@ -0,0 +1,75 @@
+"""
+Micro-benchmark of the compiled clinical phrase matcher against the previous linear substring scan.
+
+Builds matchers with increasing numbers of synthetic phrases (plus the real lexicon) and times both over a fixed
+set of chat messages. The trie matcher's time per message should stay flat as the phrase count grows; the
+substring scan grows linearly with it.
+
+Usage (from backend directory):
+    set PYTHONPATH=.
+    python -m scripts.benchmark_red_flag_matcher [--sizes 25 250 2500 25000] [--repeat 200]
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.graphs.common import PhraseMatcher, load_lexicon
+
+LEXICON = load_lexicon()
+
+MESSAGES = [
+    "Hi there, can you recommend a good book?",
+    "I have had a headache since yesterday and I feel dizzy when I stand up.",
+    "No chest pain, but I get short of breath walking up the stairs.",
+    "My daughter has a fever and a cough, and she threw up this morning.",
+    "I will be travelling to Spain next week, what vaccines do I need?",
+    "Denies fainting, numbness or slurred speech. Pain in my chest started an hour ago.",
+]
+
+
+def _synthetic_lexicon(size: int, seed: int = 7) -> dict[str, list[str]]:
+    rng = random.Random(seed)
+    synonyms = {flag: list(phrases) for flag, phrases in LEXICON["red_flags"].items()}
+    while sum(len(phrases) + 1 for phrases in synonyms.values()) < size:
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(rng.randint(1, 3))]
+        synonyms[" ".join(words)] = []
+    return synonyms
+
+
+def _time_per_message_us(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for message in MESSAGES:
+            fn(message)
+    return (time.perf_counter() - started) / (repeat * len(MESSAGES)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Trie phrase matcher vs substring scan, by number of phrases")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[25, 250, 2500, 25000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{len(MESSAGES)} messages x {args.repeat} passes")
+    print(f"{'phrases':>8}  {'trie us/msg':>12}  {'scan us/msg':>12}")
+    for size in args.sizes:
+        synonyms = _synthetic_lexicon(size)
+        phrases = [phrase for flag, items in synonyms.items() for phrase in [flag, *items]]
+        matcher = PhraseMatcher(
+            {"red_flags": synonyms},
+            negation_cues=LEXICON["negation_cues"],
+            negation_terminators=LEXICON["negation_terminators"],
+        )
+        trie_us = _time_per_message_us(matcher.find, args.repeat)
+        scan_us = _time_per_message_us(lambda m: [p for p in phrases if p in m.lower()], args.repeat)
+        print(f"{len(phrases):>8}  {trie_us:>12.1f}  {scan_us:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Remove duplicate vectors left by the old ID schemes and move rows onto stable IDs.
+
+Older builds derived Actian IDs from Python's per-process salted hash() (memories) or from the CSV row index
+(MedlinePlus), so the same memory or topic was stored under several IDs. This script scrolls a collection,
+groups rows by natural key (payload memory_id for memories, topic + passage index for MedlinePlus), keeps one
+row per key under its stable_vector_id (re-embedding the payload text if needed) and deletes the rest.
+
+It also reports vector ID collisions: distinct keys, possibly written by different batches or runs, whose stable
+IDs are equal. Those keys are listed and left untouched (writing either would overwrite the other). A collision
+whose earlier row was already overwritten on upsert cannot be seen here; see app/services/memory/vector_ids.py.
+
+Dry run by default; pass --apply to write changes.
+
+Usage (from backend directory):
+    set PYTHONPATH=.
+    python -m scripts.dedupe_vector_collections [--collection memory|medlineplus|all] [--apply]
+
+Environment: ACTIAN_HOST. The local vector store (no actiancortex) is keyed by natural key already and needs no
+migration.
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings
+from app.services.kb_medlineplus_service import passage_key, topic_key
+from app.services.memory.actian_pool import AsyncCortexClient, close_actian_pool, get_actian_pool
+from app.services.memory.embedding_service import EmbeddingService
+from app.services.memory.vector_ids import stable_vector_id
+
+
+def _memory_key(payload: dict) -> str:
+    return str(payload.get("memory_id") or "").strip()
+
+
+def _medlineplus_key(payload: dict) -> str:
+    """Passage rows are keyed per passage; rows ingested before chunking are keyed by topic."""
+    key = topic_key(payload)
+    if key and "passage_index" in payload:
+        return passage_key(key, payload["passage_index"])
+    return key
+
+
+def _row_sort_key(row) -> str:
+    payload = getattr(row, "payload", {}) or {}
+    return str(payload.get("created_at") or "")
+
+
+async def dedupe_collection(collection: str, key_fn, apply: bool) -> dict:
+    pool = get_actian_pool()
+    groups: dict[str, list] = {}
+    owners: dict[int, list[str]] = {}
+    scanned = 0
+    async for rows in pool.scroll_all(collection):
+        for row in rows:
+            scanned += 1
+            payload = getattr(row, "payload", {}) or {}
+            key = key_fn(payload)
+            if key:
+                groups.setdefault(key, []).append(row)
+
+    for key in groups:
+        owners.setdefault(stable_vector_id(collection, key), []).append(key)
+    collisions = {vector_id: keys for vector_id, keys in owners.items() if len(keys) > 1}
+    colliding_keys = {key for keys in collisions.values() for key in keys}
+
+    to_delete: list[int] = []
+    to_write: list[tuple[int, dict]] = []
+    for key, rows in groups.items():
+        if key in colliding_keys:
+            continue
+        canonical_id = stable_vector_id(collection, key)
+        rows.sort(key=_row_sort_key, reverse=True)
+        row_ids = [int(getattr(row, "id")) for row in rows]
+        if canonical_id not in row_ids:
+            to_write.append((canonical_id, getattr(rows[0], "payload", {}) or {}))
+        to_delete.extend(row_id for row_id in row_ids if row_id != canonical_id)
+
+    report = {
+        "collection": collection,
+        "rows_scanned": scanned,
+        "natural_keys": len(groups),
+        "rows_to_rewrite": len(to_write),
+        "rows_to_delete": len(to_delete),
+        "collisions": {vector_id: sorted(keys) for vector_id, keys in collisions.items()},
+    }
+    if not apply:
+        return report
+
+    if to_write:
+        embedding = EmbeddingService()
+        vectors = await embedding.embed_many([payload.get("text") or "" for _, payload in to_write])
+        for start in range(0, len(to_write), 200):
+            chunk = to_write[start : start + 200]
+            await pool.call(
+                "batch_upsert",
+                collection,
+                [vector_id for vector_id, _ in chunk],
+                vectors[start : start + 200],
+                [payload for _, payload in chunk],
+            )
+    for row_id in to_delete:
+        await pool.call("delete", collection, row_id)
+    return report
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Dedupe Actian collections onto stable vector IDs")
+    parser.add_argument("--collection", choices=["memory", "medlineplus", "all"], default="all")
+    parser.add_argument("--apply", action="store_true", help="Write changes (default: dry run, report only).")
+    args = parser.parse_args()
+
+    if AsyncCortexClient is None:
+        print("Actian Cortex client not installed; the local vector store needs no migration.")
+        return
+
+    targets = []
+    if args.collection in ("memory", "all"):
+        targets.append((settings.actian_collection_name, _memory_key))
+    if args.collection in ("medlineplus", "all"):
+        targets.append((settings.medlineplus_collection, _medlineplus_key))
+
+    for collection, key_fn in targets:
+        report = await dedupe_collection(collection, key_fn, args.apply)
+        mode = "Applied" if args.apply else "Dry run"
+        print(
+            f"{mode} '{collection}': scanned {report['rows_scanned']} rows, {report['natural_keys']} unique keys, "
+            f"{report['rows_to_rewrite']} to rewrite, {report['rows_to_delete']} to delete."
+        )
+        for vector_id, keys in report["collisions"].items():
+            print(f"  Vector ID {vector_id} collides for keys {', '.join(map(repr, keys))}; left unchanged.")
+
+    await close_actian_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
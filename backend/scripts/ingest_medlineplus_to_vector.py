@@ -1,21 +1,23 @@
 """
-Ingest MedlinePlus topics CSV into Actian Vector DB.
+Ingest MedlinePlus topics CSV into Actian Vector DB (incremental and resumable).
 
-Reads the CSV, strips HTML from full-summary, builds one vector per row (title + meta-desc + plain summary),
-embeds with OpenAI, and batch_upserts into the medlineplus_topics collection.
+Streams the CSV, strips HTML from full-summary, builds each topic's text (title + meta-desc + plain summary) and
+splits it into overlapping passages, one vector per passage (KB_PASSAGE_CHARS, KB_PASSAGE_OVERLAP_CHARS).
+A manifest of per-topic content hashes (MEDLINEPLUS_INGEST_STATE_PATH) means only new or changed topics are
+embedded; topics removed from the CSV are deleted. Progress is checkpointed after every upserted batch, so
+rerunning after a crash resumes where it stopped. See app/services/medlineplus_ingest.py.
 
 Usage (from backend directory):
     set PYTHONPATH=.
-    python -m scripts.ingest_medlineplus_to_vector [path_to_csv]
+    python -m scripts.ingest_medlineplus_to_vector [path_to_csv] [--limit N] [--full]
 
-Environment: OPENAI_API_KEY, ACTIAN_HOST (default localhost:50051).
+Environment: OPENAI_API_KEY, ACTIAN_HOST (default localhost:50051). Without actiancortex installed, rows go to
+the local NumPy vector store under LOCAL_VECTOR_STORE_DIR instead.
 Default CSV path: repo_root/actian-vectorAI-db-beta/documents/medlineplus_topics_english_2025-11-19.csv
 """
 
 import argparse
 import asyncio
-import csv
-import re
 import sys
 from pathlib import Path
 
@@ -24,9 +26,9 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from app.core.config import settings
 from app.services.kb_medlineplus_service import KBMedlinePlusService
-from app.services.memory.embedding_service import EmbeddingService
+from app.services.medlineplus_ingest import ingest_medlineplus
+from app.services.memory.actian_pool import close_actian_pool
 
-BATCH_SIZE = 200
 DEFAULT_CSV_NAME = "medlineplus_topics_english_2025-11-19.csv"
 
 
@@ -35,26 +37,6 @@ def _default_csv_path() -> Path:
     return repo_root / "actian-vectorAI-db-beta" / "documents" / DEFAULT_CSV_NAME
 
 
-def _strip_html(html: str) -> str:
-    if not html:
-        return ""
-    text = re.sub(r"<[^>]+>", " ", html)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
-
-
-def _build_row_text(row: dict) -> str:
-    title = (row.get("title") or "").strip()
-    meta = (row.get("meta-desc") or "").strip()
-    summary = _strip_html(row.get("full-summary") or "")
-    return f"{title} {meta} {summary}".strip()
-
-
-def _to_int_id(index: int) -> int:
-    """Stable unique int for Actian (one vector per row)."""
-    return index % (10**9)
-
-
 async def main() -> None:
     parser = argparse.ArgumentParser(description="Ingest MedlinePlus CSV into Actian Vector DB")
     parser.add_argument(
@@ -70,6 +52,11 @@ async def main() -> None:
         default=0,
         help="If set, only ingest this many rows (for testing). 0 = all rows.",
     )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore stored content hashes and re-embed every topic.",
+    )
     args = parser.parse_args()
     csv_path: Path = args.csv_path
     if not csv_path.exists():
@@ -77,43 +64,19 @@ async def main() -> None:
         sys.exit(1)
 
     kb = KBMedlinePlusService()
-    embedding = EmbeddingService()
-    if not kb.is_available:
-        print("Actian Cortex client not available (install actiancortex).")
-        sys.exit(1)
-
-    print(f"Ensuring collection '{kb.collection}'...")
-    await kb.ensure_collection()
-
-    rows: list[dict] = []
-    with open(csv_path, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            rows.append(row)
-            if args.limit and len(rows) >= args.limit:
-                break
-
-    total = len(rows)
-    print(f"Loaded {total} rows. Embedding and upserting in batches of {BATCH_SIZE}...")
-
-    for start in range(0, total, BATCH_SIZE):
-        batch = rows[start : start + BATCH_SIZE]
-        texts = [_build_row_text(r) for r in batch]
-        ids = [_to_int_id(start + i) for i in range(len(batch))]
-        vectors = [await embedding.embed_text(t) for t in texts]
-        payloads = [
-            {
-                "id": r.get("id"),
-                "title": (r.get("title") or "").strip(),
-                "url": (r.get("url") or "").strip(),
-                "text": texts[i],
-                "groups": (r.get("groups") or "").strip()[:500],
-            }
-            for i, r in enumerate(batch)
-        ]
-        await kb.batch_upsert(ids, vectors, payloads)
-        print(f"  Upserted {start + len(batch)} / {total}")
-
+    if not kb.uses_actian:
+        print(f"Actian Cortex client not installed; ingesting into the local vector store ({settings.local_vector_store_dir}).")
+
+    print(f"Syncing '{kb.collection}' from {csv_path.name} (manifest: {settings.medlineplus_ingest_state_path})...")
+    report = await ingest_medlineplus(csv_path, kb=kb, limit=args.limit, full=args.full, progress=print)
+    if report["resumed_from"]:
+        print(f"Resumed after row {report['resumed_from']}.")
+    print(
+        f"Scanned {report['scanned']} topics in {report['seconds']:.1f}s: {report['embedded']} embedded "
+        f"({report['passages']} passages), "
+        f"{report['unchanged']} unchanged, {report['deleted']} deleted."
+    )
+    await close_actian_pool()
     print("Done.")
 
 
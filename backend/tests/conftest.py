@@ -2,8 +2,48 @@ import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
+from app.core.config import settings
 from app.db.base import Base
 from app.models import Appointment, DoctorCandidate, InteractionLog, Patient
+from app.services.call_dispatcher import reset_call_dispatcher
+from app.services.call_summary_events import reset_event_bus
+from app.services.http_client import reset_http_clients
+from app.services.intent_classifier import reset_intent_router
+from app.services.lexical_index import reset_lexical_indexes
+from app.services.memory.local_vector_store import reset_local_vector_stores
+from app.services.provider_directory_cache import reset_provider_directory_cache
+from app.services.rag_result_cache import reset_rag_result_cache
+from app.services.redis_pool import reset_redis
+from app.services.session_store import reset_session_store_state
+
+
+@pytest.fixture(autouse=True)
+def local_vector_store(tmp_path, monkeypatch):
+    """Give every test its own persisted local vector store (and its BM25 index) instead of backend/data."""
+    monkeypatch.setattr(settings, "local_vector_store_dir", str(tmp_path / "vector_store"))
+    reset_local_vector_stores()
+    reset_lexical_indexes()
+    yield tmp_path / "vector_store"
+    reset_local_vector_stores()
+    reset_lexical_indexes()
+
+
+@pytest.fixture(autouse=True)
+def reset_process_singletons():
+    """
+    Start every test with fresh process-wide caches, counters and clients (RAG and provider caches, router log,
+    session-store digests, call dispatcher, event bus, shared Redis and HTTP clients), so no state or event-loop-bound
+    connection leaks between tests.
+    """
+    reset_rag_result_cache()
+    reset_intent_router()
+    reset_session_store_state()
+    reset_http_clients()
+    reset_provider_directory_cache()
+    reset_call_dispatcher()
+    reset_event_bus()
+    reset_redis()
+    yield
 
 
 @pytest.fixture()
@@ -1,4 +1,6 @@
-from unittest.mock import AsyncMock, patch
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -12,12 +14,13 @@ def _log_chat(test_name: str, user: str | None, assistant: str | None) -> None:
         print(f"\n[{test_name}] user: {user}")
     if assistant is not None:
         print(f"[{test_name}] assistant: {assistant}")
+from app.graphs.call_summarize_node import call_summarize_node
 from app.graphs.graph import TriageInterviewGraph
 from app.graphs.normal_chat_node import normal_chat_node
 from app.graphs.nurse_intake_node import nurse_intake_node
-from app.graphs.provider_locations_node import provider_locations_node
+from app.graphs.provider_locations_node import format_clinic_section, provider_locations_node
 from app.graphs.rag_medlineplus_node import rag_medlineplus_node
-from app.graphs.router_node import router_node
+from app.graphs.router_node import RouterDecision, router_node
 from app.graphs.state import create_default_interview_state
 from app.graphs.state_verifier_node import state_verifier_node
 from app.services.session_store import RedisSessionStore
@@ -33,6 +36,58 @@ async def test_nurse_node_escalates_on_major_red_flag():
 
     assert updated["needs_emergency"] is True
     assert "emergency" in updated["assistant_reply"].lower()
+    assert updated["red_flags"]["present"] == ["chest pain", "fainting"]
+
+
+def test_clinical_matcher_word_boundaries_negation_and_spans():
+    from app.graphs.common import find_clinical_phrases, keyword_intent, looks_like_emergency, looks_like_health_concern
+
+    assert not looks_like_health_concern("I will fly to Spain tomorrow.")
+    assert not looks_like_emergency("No chest pain, and I do not have any shortness of breath.")
+    assert not looks_like_health_concern("Denies shortness of breath, fever, or cough.")
+    assert looks_like_emergency("No, I have chest pain.")
+    # Negation must not run past a conjunction or preposition, and a bare "no" only negates the next phrase.
+    assert looks_like_emergency("I have no energy and severe pain")
+    assert keyword_intent("I have no energy and severe pain") == ("triage", 1.0)
+    assert looks_like_emergency("still no relief from chest pain")
+    assert looks_like_emergency("no sleep last night chest pain")
+    assert not looks_like_emergency("I don't have any chest pain")
+    # "never" negates a health hint but not a red flag, even further along the same list.
+    assert [(m.flag, m.negated) for m in find_clinical_phrases("never had a fever or chest pain like this")] == [
+        ("fever", True),
+        ("chest pain", False),
+    ]
+
+    message = "No fever but there is pain in my chest and I feel dizzy"
+    matches = find_clinical_phrases(message)
+    assert [(m.category, m.flag, m.negated) for m in matches] == [
+        ("health_intent", "fever", True),
+        ("red_flags", "chest pain", False),
+        ("health_intent", "dizzy", False),
+    ]
+    assert message[matches[1].start : matches[1].end] == "pain in my chest"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "message",
+    [
+        "I've never had chest pain this bad",
+        "not sure if it's chest pain",
+        "never felt chest pain like this",
+        "I don't know if it's chest pain",
+    ],
+)
+async def test_red_flags_escalate_unless_explicitly_denied(message):
+    from app.graphs.common import find_red_flags, keyword_intent
+
+    # "never" describes the pain and "not sure" / "don't know" is doubt; neither denies the red flag.
+    assert [match.flag for match in find_red_flags(message)] == ["chest pain"]
+    assert keyword_intent(message) == ("triage", 1.0)
+    state = create_default_interview_state("session-red-flag")
+    state["latest_user_message"] = message
+    updated = await nurse_intake_node(state, model=None)
+    assert updated["needs_emergency"] is True
 
 
 @pytest.mark.asyncio
@@ -133,6 +188,73 @@ async def test_router_keeps_sticky_triage_mode():
     assert routed["conversation_mode"] == "triage"
 
 
+class _BagOfWordsEmbedding:
+    """Stands in for a real embedding model: texts sharing words get similar vectors."""
+
+    client = object()
+
+    async def embed_text(self, text: str) -> list[float]:
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: list[str]) -> list[list[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0] * 64
+            for word in text.lower().replace(",", " ").split():
+                vector[sum(map(ord, word)) % 64] += 1.0
+            vectors.append(vector)
+        return vectors
+
+
+@pytest.mark.asyncio
+async def test_router_tiers_only_call_llm_in_uncertain_band():
+    from app.core.config import settings
+    from app.graphs.common import keyword_intent
+    from app.services.intent_classifier import ExemplarIntentClassifier, get_router_decision_log
+
+    model = MagicMock()
+    llm_router = MagicMock()
+    llm_router.ainvoke = AsyncMock(return_value=RouterDecision(route_intent="triage"))
+    model.with_structured_output.return_value = llm_router
+    classifier = ExemplarIntentClassifier(
+        embedding=_BagOfWordsEmbedding(),
+        exemplars={"triage": ["my knee hurts when I walk"], "normal_chat": ["recommend a good book to read"]},
+    )
+
+    with patch("app.graphs.router_node.get_intent_classifier", return_value=classifier):
+        results = {}
+        for message in [
+            "I have a fever and a cough",
+            "hello, how are you?",
+            "can you recommend a good book to read",
+            "my knee hurts when I walk",
+            "what do you think about this?",
+        ]:
+            state = create_default_interview_state("session-router-tiers")
+            state["latest_user_message"] = message
+            results[message] = await router_node(state, model=model)
+
+    assert results["I have a fever and a cough"]["route_decision"]["tier"] == "keyword"
+    assert results["hello, how are you?"]["route_intent"] == "normal_chat"
+    assert results["can you recommend a good book to read"]["route_decision"]["tier"] == "exemplar"
+    assert results["my knee hurts when I walk"]["route_intent"] == "triage"
+    assert results["my knee hurts when I walk"]["route_decision"]["tier"] == "exemplar"
+    assert results["what do you think about this?"]["route_decision"]["tier"] == "llm"
+    llm_router.ainvoke.assert_awaited_once()
+    stats = get_router_decision_log().stats()
+    assert stats["tiers"] == {"keyword": 2, "exemplar": 2, "llm": 1}
+
+    # Only a message that is all small talk is a confident keyword decision; a greeting before a complaint is not.
+    assert keyword_intent("Hi there! Thank you so much.") == ("normal_chat", 0.95)
+    for message in [
+        "Hi, I think I broke my arm",
+        "hello, my son has a temperature of 39",
+        "hey there, I got stung by a bee and my lip is swelling",
+    ]:
+        assert keyword_intent(message)[1] < settings.router_keyword_confidence
+    assert stats["llm_rate"] == 0.2
+
+
 @pytest.mark.asyncio
 async def test_normal_chat_node_returns_response():
     state = create_default_interview_state("session-normal-node")
@@ -180,9 +302,59 @@ async def test_graph_sticky_triage_across_turns():
     assert second_turn["route_intent"] == "triage"
 
 
+@pytest.mark.asyncio
+async def test_chat_service_streams_progress_and_reply_tokens_then_persists():
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+
+    from app.services.chat_service import ChatService
+
+    model = GenericFakeChatModel(messages=iter([AIMessage(content="Try a short walk after lunch.")]))
+    service = ChatService()
+    service.graph = TriageInterviewGraph(model)
+    service.session_store = RedisSessionStore(redis_client=_FakeRedis(), ttl_seconds=60)
+
+    with patch("app.graphs.graph.call_summarize_node", new=AsyncMock(return_value={})), patch(
+        "app.graphs.graph.router_node",
+        new=AsyncMock(return_value={"route_intent": "normal_chat", "conversation_mode": "normal_chat"}),
+    ):
+        events = [event async for event in service.stream_message("Any productivity tip?", "session-stream")]
+
+    progress = [event["node"] for event in events if event["event"] == "progress"]
+    tokens = [event["text"] for event in events if event["event"] == "token"]
+    done = events[-1]
+    _log_chat("test_chat_service_streams_progress_and_reply_tokens", "Any productivity tip?", done.get("reply"))
+    assert progress[:2] == ["call_summarize_node", "router_node"]
+    assert len(tokens) > 1 and "".join(tokens) == "Try a short walk after lunch."
+    assert done["event"] == "done" and done["reply"] == "Try a short walk after lunch."
+    saved = await service.session_store.get("session-stream")
+    assert saved["assistant_reply"] == "Try a short walk after lunch."
+
+
+def test_partial_json_string_streams_next_question_prefix():
+    from langchain_core.messages import AIMessageChunk
+
+    from app.graphs.streaming import ReplyTokenStream, partial_json_string
+
+    assert partial_json_string('{"chief_complaint": "cough", "next_q', "next_question") is None
+    assert partial_json_string('{"next_question": "Oh no, I\\u2019m so', "next_question") == "Oh no, I\u2019m so"
+    assert partial_json_string('{"next_question": "Say \\"hi\\"", "x": 1}', "next_question") == 'Say "hi"'
+
+    stream = ReplyTokenStream()
+    chunks = ['{"timeline": null, "next_', 'question": "When did', ' it start?"}']
+    text = "".join(stream.feed("nurse_intake_node", "run-1", AIMessageChunk(content=chunk)) for chunk in chunks)
+    assert text == "When did it start?"
+
+
 class _FakeRedis:
+    """Strings, hashes and streams, plus a pipeline that applies its commands on execute()."""
+
     def __init__(self):
         self.data: dict[str, str] = {}
+        self.hashes: dict[str, dict[bytes, bytes]] = {}
+        self.streams: dict[str, list[tuple[bytes, dict[bytes, bytes]]]] = {}
+        self.commands: list[tuple] = []
+        self.ttls: dict[str, float] = {}
 
     async def get(self, key: str):
         return self.data.get(key)
@@ -190,6 +362,119 @@ class _FakeRedis:
     async def setex(self, key: str, _ttl: int, payload: str):
         self.data[key] = payload
 
+    async def getdel(self, key: str):
+        return self.data.pop(key, None)
+
+    async def delete(self, key: str):
+        self.data.pop(key, None)
+        self.hashes.pop(key, None)
+
+    async def hgetall(self, key: str):
+        from redis.exceptions import ResponseError
+
+        if key in self.data:
+            raise ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return dict(self.hashes.get(key, {}))
+
+    async def hset(self, key: str, mapping: dict):
+        self.hashes.setdefault(key, {}).update({name.encode(): value for name, value in mapping.items()})
+
+    async def hdel(self, key: str, *names: str):
+        for name in names:
+            self.hashes.get(key, {}).pop(name.encode(), None)
+
+    async def expire(self, key: str, ttl: int):
+        self.ttls[key] = ttl
+        return True
+
+    async def pexpire(self, key: str, ttl_ms: int):
+        self.ttls[key] = ttl_ms / 1000
+        return True
+
+    async def incr(self, key: str):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    async def set(self, key: str, value, nx: bool = False, px: int | None = None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        return True
+
+    def pipeline(self, transaction: bool = True):
+        return _FakePipeline(self)
+
+    @staticmethod
+    def _stream_id(entry_id: bytes | str) -> tuple[int, int]:
+        ms, _, seq = (entry_id.decode() if isinstance(entry_id, bytes) else entry_id).partition("-")
+        return int(ms), int(seq or 0)
+
+    async def xadd(self, key: str, fields: dict, maxlen: int | None = None, approximate: bool = True):
+        entries = self.streams.setdefault(key, [])
+        ms = int(time.time() * 1000)
+        last = self._stream_id(entries[-1][0]) if entries else (0, 0)
+        entry_id = f"{ms}-0" if ms > last[0] else f"{last[0]}-{last[1] + 1}"
+        entries.append((entry_id.encode(), {name.encode(): str(value).encode() for name, value in fields.items()}))
+        return entry_id.encode()
+
+    async def xrange(self, key: str, min: str = "-", max: str = "+"):
+        exclusive = min.startswith("(")
+        start = (0, 0) if min == "-" else self._stream_id(min.lstrip("("))
+        return [
+            (entry_id, fields)
+            for entry_id, fields in self.streams.get(key, [])
+            if self._stream_id(entry_id) > start or (not exclusive and self._stream_id(entry_id) == start)
+        ]
+
+    async def xrevrange(self, key: str, count: int | None = None):
+        return list(reversed(self.streams.get(key, [])))[:count]
+
+    async def xread(self, streams: dict, block: int | None = None, count: int | None = None):
+        (key, last_id), = streams.items()
+        entries = await self.xrange(key, min=f"({last_id}")
+        if not entries:
+            await asyncio.sleep(0.01)
+            return []
+        return [(key.encode(), entries[:count])]
+
+
+class _FakePipeline:
+    """After watch() commands run immediately (like redis-py) until multi(); then they queue for execute()."""
+
+    def __init__(self, redis: _FakeRedis):
+        self.redis = redis
+        self.queued: list[tuple] = []
+        self.immediate = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def watch(self, *_keys: str):
+        self.immediate = True
+
+    def multi(self):
+        self.immediate = False
+
+    def __getattr__(self, name: str):
+        if self.immediate:
+            return getattr(self.redis, name)
+        return lambda *args, **kwargs: self.queued.append((name, args, kwargs))
+
+    async def execute(self, raise_on_error: bool = True):
+        self.redis.commands.extend(self.queued)
+        results = []
+        for name, args, kwargs in self.queued:
+            try:
+                results.append(await getattr(self.redis, name)(*args, **kwargs))
+            except Exception as exc:
+                if raise_on_error:
+                    raise
+                results.append(exc)
+        return results
+
 
 @pytest.mark.asyncio
 async def test_rag_medlineplus_node_populates_kb_evidence_and_reply():
@@ -227,17 +512,23 @@ async def test_rag_medlineplus_node_provider_search_and_reply():
     mock_kb_results = [
         {"title": "Rash", "url": "https://medlineplus.gov/rash.html", "text": "Skin rash...", "score": 0.9},
     ]
-    mock_doctors = [
-        {"doctor_name": "Dr. Jane Smith", "specialty": "Dermatology", "location": "10001 - Skin Care", "next_available_slot": "2026-02-24T09:00:00"},
-        {"doctor_name": "Dr. John Doe", "specialty": "Dermatology", "location": "10002 - Downtown", "next_available_slot": ""},
+    mock_clinics = [
+        {"doctor_name": "Dr. Jane Smith", "address": "10001 - Skin Care", "phone_number": "+15550001"},
+        {"doctor_name": "Dr. John Doe", "address": "10002 - Downtown", "phone_number": "+15550002"},
     ]
     with patch("app.graphs.rag_medlineplus_node.KBMedlinePlusService") as MockKB, patch(
-        "app.graphs.rag_medlineplus_node.ZocDocClient"
+        "app.graphs.provider_locations_node.ZocDocClient"
     ) as MockZocdoc:
         MockKB.return_value.is_available = True
         MockKB.return_value.search = AsyncMock(return_value=mock_kb_results)
-        MockZocdoc.return_value.search_doctors = AsyncMock(return_value=mock_doctors)
+        MockZocdoc.return_value.get_provider_locations = AsyncMock(return_value=mock_clinics)
         updated = await rag_medlineplus_node(state, model=None)
+        located = await provider_locations_node({**state, **updated})
+
+    # Clinics are prefetched concurrently with the KB search; provider_locations_node reuses them.
+    assert MockZocdoc.return_value.get_provider_locations.await_count == 1
+    assert [clinic["doctor_name"] for clinic in located["provider_search"]["results"]] == ["Dr. Jane Smith", "Dr. John Doe"]
+    assert set(updated["handoff_timings"]) == {"kb", "history", "provider_prefetch"}
 
     assert "provider_search" in updated
     constraints = updated["provider_search"]["constraints"]
@@ -259,6 +550,31 @@ async def test_rag_medlineplus_node_provider_search_and_reply():
     assert "MedlinePlus" in reply or "Rash" in reply
 
 
+@pytest.mark.asyncio
+async def test_rag_medlineplus_node_branch_timeout_does_not_block_clinics(monkeypatch):
+    from app.core.config import settings
+
+    async def slow_search(*_args, **_kwargs):
+        await asyncio.sleep(5)
+        return []
+
+    monkeypatch.setattr(settings, "handoff_kb_timeout_seconds", 0.05)
+    state = create_default_interview_state("session-rag-timeout")
+    state["chief_complaint"] = "Cough"
+    clinics = [{"doctor_name": "Dr. Quick", "address": "30332 - Midtown", "phone_number": "+15550003"}]
+    with patch("app.graphs.rag_medlineplus_node.KBMedlinePlusService") as MockKB, patch(
+        "app.graphs.provider_locations_node.ZocDocClient"
+    ) as MockZocdoc:
+        MockKB.return_value.is_available = True
+        MockKB.return_value.search = slow_search
+        MockZocdoc.return_value.get_provider_locations = AsyncMock(return_value=clinics)
+        updated = await asyncio.wait_for(rag_medlineplus_node(state, model=None), timeout=2)
+
+    assert updated["handoff_timings"]["kb"]["status"] == "timeout"
+    assert updated["kb_evidence"] == []
+    assert updated["provider_search"]["results"] == clinics
+
+
 @pytest.mark.asyncio
 async def test_ask_booking_consent_node_returns_consent_message():
     state = create_default_interview_state("session-consent")
@@ -291,7 +607,56 @@ async def test_provider_locations_node_appends_clinic_details():
     assert updated["provider_search"]["results"][0]["doctor_name"] == "Dr. Alpha"
     assert "Dr. Alpha" in updated["assistant_reply"]
     assert "555-0001" in updated["assistant_reply"]
-    assert "3 clinics near you" in updated["assistant_reply"]
+    assert "2 clinics near you" in updated["assistant_reply"]
+
+
+@pytest.mark.asyncio
+async def test_clinic_availability_node_reorders_and_prunes_by_patient_windows():
+    from app.graphs.clinic_availability_node import clinic_availability_node, parse_time_range
+
+    assert parse_time_range("morning until 10am") == (6 * 60, 10 * 60)
+    assert parse_time_range("3PM to 6 PM") == (15 * 60, 18 * 60)
+    assert parse_time_range("11 to 2pm") == (11 * 60, 14 * 60)
+    assert parse_time_range("after 4:30pm") == (16 * 60 + 30, 24 * 60)
+    # Day parts are whole words: "afternoon" is not "noon", and a bound outside the part never inverts the range.
+    assert parse_time_range("afternoon") == (12 * 60, 17 * 60)
+    assert parse_time_range("Tuesday afternoon") == (12 * 60, 17 * 60)
+    assert parse_time_range("afternoons after 2") == (14 * 60, 17 * 60)
+    assert parse_time_range("evening") == (17 * 60, 21 * 60)
+    assert parse_time_range("noon") == (11 * 60, 13 * 60)
+    assert parse_time_range("morning after 1pm") == (13 * 60, 24 * 60)
+
+    clinics = [
+        {"provider_location_id": "pl_a", "doctor_name": "Dr. Alpha", "address": "1 Main St", "phone_number": "555-0001"},
+        {"provider_location_id": "pl_b", "doctor_name": "Dr. Beta", "address": "2 Oak Ave", "phone_number": "555-0002"},
+        {"provider_location_id": "pl_c", "doctor_name": "Dr. Gamma", "address": "3 Elm Rd", "phone_number": "555-0003"},
+        {"doctor_name": "Dr. Delta", "address": "4 Pine Ct", "phone_number": "555-0004"},
+    ]
+    state = create_default_interview_state("session-availability")
+    state["provider_search"] = {"constraints": {"visit_reason_id": "pc_1"}, "results": clinics}
+    state["patient_availability_slots"] = {"Monday": ["morning until 10am"], "Friday": ["3PM to 6 PM"]}
+    state["assistant_reply"] = "We recommend Primary Care." + format_clinic_section(clinics)
+    slots = [
+        {"provider_location_id": "pl_a", "start_time": "2026-02-24T09:00:00-05:00"},  # Tuesday: no fit
+        {"provider_location_id": "pl_b", "start_time": "2026-02-27T16:00:00-05:00"},  # Friday 4pm
+        {"provider_location_id": "pl_c", "start_time": "2026-02-23T09:30:00-05:00"},  # Monday 9:30am
+        {"provider_location_id": "pl_c", "start_time": "2026-02-23T11:00:00-05:00"},  # Monday, too late
+    ]
+    with patch("app.graphs.clinic_availability_node.ZocDocClient") as MockZoc:
+        MockZoc.return_value.get_provider_location_availability = AsyncMock(return_value=slots)
+        updated = await clinic_availability_node(state)
+
+    # One batched lookup for every shortlisted clinic with a location id.
+    MockZoc.return_value.get_provider_location_availability.assert_awaited_once()
+    assert MockZoc.return_value.get_provider_location_availability.await_args.args[0] == ["pl_a", "pl_b", "pl_c"]
+    results = updated["provider_search"]["results"]
+    assert [clinic["doctor_name"] for clinic in results] == ["Dr. Gamma", "Dr. Beta", "Dr. Delta"]
+    assert results[0]["matching_slots"] == ["2026-02-23T09:30:00-05:00"]
+    assert updated["provider_search"]["availability"] == {"status": "ok", "matched": 2, "unknown": 1, "pruned": 1}
+    _log_chat("test_clinic_availability_node", None, updated["assistant_reply"])
+    assert "Dr. Alpha" not in updated["assistant_reply"]
+    assert "Here are 3 clinics near you" in updated["assistant_reply"]
+    assert "Opening that fits you: Mon Feb 23, 9:30 AM" in updated["assistant_reply"]
 
 
 @pytest.mark.asyncio
@@ -306,3 +671,318 @@ async def test_redis_session_store_round_trip():
     loaded = await store.get("session-4")
     assert loaded is not None
     assert loaded["chief_complaint"] == "Headache"
+
+
+@pytest.mark.asyncio
+async def test_redis_session_store_writes_only_changed_fields_and_reads_legacy_sessions():
+    import json
+
+    from app.services.session_store import get_session_store_stats
+
+    fake_redis = _FakeRedis()
+    store = RedisSessionStore(redis_client=fake_redis, ttl_seconds=60)
+    key = "triage:session:session-delta"
+
+    # A session saved in the old single-JSON-string format is still readable and converted on save.
+    legacy = create_default_interview_state("session-delta")
+    fake_redis.data[key] = json.dumps(legacy)
+    state = await store.get("session-delta")
+    assert state["session_id"] == "session-delta"
+
+    state["kb_evidence"] = [{"title": "Headache", "text": "Headache passage. " * 200}]
+    await store.set("session-delta", state)
+    assert key not in fake_redis.data
+    stored_evidence = fake_redis.hashes[key][b"kb_evidence"]
+    assert stored_evidence.startswith(b"\x00") and len(stored_evidence) < 1000
+
+    loaded = await store.get("session-delta")
+    assert loaded["kb_evidence"] == state["kb_evidence"]
+    fake_redis.commands.clear()
+    loaded["assistant_reply"] = "How long has it hurt?"
+    loaded.pop("booking")
+    await store.set("session-delta", loaded)
+
+    assert [name for name, _, _ in fake_redis.commands] == ["hset", "hdel", "expire"]
+    assert list(fake_redis.commands[0][2]["mapping"]) == ["assistant_reply"]
+    assert (await store.get("session-delta"))["assistant_reply"] == "How long has it hurt?"
+    assert "booking" not in await store.get("session-delta")
+    stats = get_session_store_stats().stats()
+    assert stats["full_writes"] == 1 and stats["legacy_loads"] == 1 and stats["fields_deleted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_chat_service_serializes_turns_and_coalesces_queued_messages(monkeypatch):
+    from app.core.config import settings
+    from app.services.chat_service import ChatService
+
+    # Short lease, so the 50 ms turns below outlive it and must renew it.
+    monkeypatch.setattr(settings, "chat_session_lock_ttl_seconds", 0.03)
+
+    class _SlowGraph:
+        def __init__(self):
+            self.messages: list[str] = []
+
+        async def run(self, state):
+            self.messages.append(state["latest_user_message"])
+            await asyncio.sleep(0.05)
+            return {**state, "assistant_reply": f"reply to {state['latest_user_message']}"}
+
+    service = ChatService()
+    service.graph = _SlowGraph()
+    service.session_store = RedisSessionStore(redis_client=_FakeRedis(), ttl_seconds=60)
+
+    first = asyncio.create_task(service.send_message("I have a cough", "session-queue"))
+    await asyncio.sleep(0.01)
+    queued = [
+        asyncio.create_task(service.send_message(text, "session-queue"))
+        for text in ["since Monday", "since Monday", "and a fever"]
+    ]
+    results = await asyncio.gather(first, *queued)
+
+    assert service.graph.messages == ["I have a cough", "since Monday\nand a fever"]
+    assert results[1] == results[2] == results[3]
+    assert results[3]["reply"] == "reply to since Monday\nand a fever"
+    saved = await service.session_store.get("session-queue")
+    assert saved["latest_user_message"] == "since Monday\nand a fever"
+    assert any(name == "pexpire" for name, _, _ in service.session_store.redis.commands)
+
+
+@pytest.mark.asyncio
+async def test_session_store_rejects_save_after_lock_is_lost():
+    from app.services.session_store import SessionBusyError
+
+    fake_redis = _FakeRedis()
+    store = RedisSessionStore(redis_client=fake_redis, ttl_seconds=60)
+    fence = await store.acquire_lock("session-fence", ttl_seconds=5, wait_seconds=0)
+    with pytest.raises(SessionBusyError):
+        await store.acquire_lock("session-fence", ttl_seconds=5, wait_seconds=0)
+    assert fake_redis.ttls["triage:session_fence:session-fence"] == 60
+    assert await store.renew_lock("session-fence", fence, ttl_seconds=5)
+    assert fake_redis.ttls["triage:session_lock:session-fence"] == 5
+
+    # The lease expired and another worker took the lock with a newer fencing token.
+    fake_redis.data["triage:session_lock:session-fence"] = str(fence + 1)
+    assert not await store.renew_lock("session-fence", fence, ttl_seconds=5)
+    with pytest.raises(SessionBusyError):
+        await store.set("session-fence", create_default_interview_state("session-fence"), fence=fence)
+    assert "triage:session:session-fence" not in fake_redis.hashes
+
+    await store.release_lock("session-fence", fence)
+    assert fake_redis.data["triage:session_lock:session-fence"] == str(fence + 1)
+
+
+@pytest.mark.asyncio
+async def test_chat_turn_prefetches_state_and_consumes_pending_summary_once():
+    from app.services.chat_service import ChatService
+
+    class _FailingGraph:
+        async def run(self, state):
+            raise RuntimeError("model unavailable")
+
+    fake_redis = _FakeRedis()
+    store = RedisSessionStore(redis_client=fake_redis, ttl_seconds=60)
+    state = create_default_interview_state("session-prefetch")
+    state["chief_complaint"] = "Headache"
+    await store.set("session-prefetch", state)
+    await store.set_pending_call_summary("session-prefetch", "Booked for Tuesday 9am.", "conv-1")
+
+    fake_redis.commands.clear()
+    loaded, pending = await store.load_turn("session-prefetch")
+    assert [name for name, _, _ in fake_redis.commands] == ["hgetall", "getdel"]
+    assert loaded["chief_complaint"] == "Headache"
+    assert pending == {"summary": "Booked for Tuesday 9am.", "conversation_id": "conv-1"}
+    assert await store.get_pending_call_summary_peek("session-prefetch") is None
+
+    # The prefetched summary reaches the node through state; a failed turn puts it back for the next one.
+    loaded["pending_call_summary"] = pending
+    updated = await call_summarize_node(loaded, store=None)
+    assert updated["reply_from_call_summary"] and "Booked for Tuesday 9am." in updated["assistant_reply"]
+    await store.set_pending_call_summary("session-prefetch", "Booked for Tuesday 9am.", "conv-1")
+    service = ChatService()
+    service.graph = _FailingGraph()
+    service.session_store = store
+    with pytest.raises(RuntimeError):
+        await service.send_message("hello", "session-prefetch")
+    assert (await store.get_pending_call_summary_peek("session-prefetch"))["summary"] == "Booked for Tuesday 9am."
+
+
+class _FakeCallAgent:
+    """Records dials and hang-ups; each dial gets the next conversation id."""
+
+    def __init__(self):
+        self.dialed: list[tuple[str, dict]] = []
+        self.ended: list[str] = []
+
+    async def start_twilio_outbound_call(self, to_number: str, *, dynamic_variables: dict | None = None) -> dict:
+        self.dialed.append((to_number, dynamic_variables or {}))
+        n = len(self.dialed)
+        return {"success": True, "message": "", "conversation_id": f"conv-{n}", "callSid": f"CA{n}"}
+
+    async def end_call(self, call_sid: str) -> bool:
+        self.ended.append(call_sid)
+        return True
+
+
+@pytest.mark.asyncio
+async def test_call_dispatcher_strategies_first_confirmation_wins_and_caps_hold():
+    from app.graphs.outbound_call_node import outbound_call_node
+    from app.services.call_dispatcher import ACTIVE_CALLS_KEY, OutboundCallDispatcher, call_outcome
+
+    clinics = [
+        {"doctor_name": f"Dr. {name}", "phone_number": f"555000000{i}", "address": f"{i} Main St"}
+        for i, name in enumerate(["Ada", "Ben", "Cy"])
+    ]
+    confirmed = {"analysis": {"data_collection_results": {"appointment_booked": {"value": True}}}}
+    assert call_outcome(confirmed) == "confirmed"
+    assert call_outcome({"analysis": {"call_successful": "failure"}}) == "declined"
+    assert call_outcome({"summary": "No answer."}) == "failed"
+
+    # Sequential: one live call; a decline dials the next clinic.
+    fake_redis = _FakeRedis()
+    store = RedisSessionStore(redis_client=fake_redis, ttl_seconds=60)
+    agent = _FakeCallAgent()
+    dispatcher = OutboundCallDispatcher(store, agent, max_concurrent_calls=10)
+    state = create_default_interview_state("session-seq")
+    state["provider_search"] = {"results": clinics}
+    updated = await outbound_call_node(state, dispatcher)
+    assert "Dr. Ada's office" in updated["assistant_reply"]
+    assert updated["outbound_call"]["conversation_id"] == "conv-1" and updated["outbound_call"]["call_started"]
+    assert agent.dialed[0][1]["clinic_name"] == "Dr. Ada" and agent.dialed[0][1]["call_purpose"] == "book"
+    assert await store.get_session_for_conversation("conv-1") == "session-seq"
+    plan = await dispatcher.call_ended("session-seq", "conv-1", "declined")
+    assert [call["status"] for call in plan["calls"]] == ["declined", "in_progress", "queued"]
+    plan = await dispatcher.call_ended("session-seq", "conv-2", "confirmed")
+    assert plan["status"] == "booked" and plan["winner"] == 1
+    assert [call["status"] for call in plan["calls"]] == ["declined", "confirmed", "cancelled"]
+    assert len(agent.dialed) == 2 and not fake_redis.hashes.get(ACTIVE_CALLS_KEY)
+
+    # Parallel: all clinics at once; the first confirmation hangs up the others and a late one is released.
+    agent = _FakeCallAgent()
+    dispatcher = OutboundCallDispatcher(store, agent, max_concurrent_calls=10)
+    plan = await dispatcher.start("session-par", clinics, {"patient_full_name": "Pat"}, strategy="parallel")
+    assert [call["status"] for call in plan["calls"]] == ["in_progress"] * 3
+    plan = await dispatcher.call_ended("session-par", "conv-2", "confirmed")
+    assert plan["winner"] == 1 and sorted(agent.ended) == ["CA1", "CA3"]
+    plan = await dispatcher.call_ended("session-par", "conv-3", "declined")
+    assert plan["calls"][2]["status"] == "cancelled"
+    plan = await dispatcher.call_ended("session-par", "conv-1", "confirmed")
+    assert plan["calls"][0]["status"] == "releasing" and agent.dialed[-1][1]["call_purpose"] == "release_slot"
+    plan = await dispatcher.call_ended("session-par", plan["calls"][0]["release_conversation_id"], "confirmed")
+    assert plan["calls"][0]["status"] == "released"
+    assert [status for status, _ in plan["calls"][0]["history"]] == [
+        "queued", "dialing", "in_progress", "cancelling", "release_needed", "releasing", "released"
+    ]
+    # A repeated webhook for a settled call changes nothing.
+    assert (await dispatcher.call_ended("session-par", "conv-2", "declined"))["calls"][1]["status"] == "confirmed"
+
+    # Global cap: with one line busy elsewhere, a parallel session only gets the remaining line.
+    agent = _FakeCallAgent()
+    dispatcher = OutboundCallDispatcher(store, agent, max_concurrent_calls=2, stagger_seconds=3600)
+    await dispatcher.start("session-other", clinics[:1], {})
+    plan = await dispatcher.start("session-cap", clinics, {}, strategy="parallel")
+    assert [call["status"] for call in plan["calls"]] == ["in_progress", "queued", "queued"]
+    assert dispatcher.stats()["cap_waits"] == 1
+    plan = await dispatcher.call_ended("session-cap", "conv-2", "declined")
+    assert [call["status"] for call in plan["calls"]] == ["declined", "in_progress", "queued"]
+
+    # Staggered: one clinic now, the next when the timer widens the plan.
+    plan = await dispatcher.start("session-stagger", clinics[1:], {}, strategy="staggered")
+    assert [call["status"] for call in plan["calls"]] == ["queued", "queued"]
+    await dispatcher.call_ended("session-other", "conv-1", "declined")
+    await dispatcher._advance("session-stagger")
+    plan = await dispatcher.call_ended("session-cap", "conv-3", "confirmed")
+    assert [call["status"] for call in plan["calls"]] == ["declined", "confirmed", "cancelled"]
+    await dispatcher._widen("session-stagger")
+    plan = await dispatcher.get_plan("session-stagger")
+    assert [call["status"] for call in plan["calls"]] == ["in_progress", "in_progress"] and plan["allowed"] == 2
+    await dispatcher.close()
+
+
+@pytest.mark.asyncio
+async def test_post_call_processing_is_idempotent_and_texts_the_patient_once(monkeypatch):
+    from app.services import call_summary_events, post_call
+    from app.services.call_dispatcher import OutboundCallDispatcher
+
+    sent: list[tuple[str, str]] = []
+
+    class _FakeSms:
+        def send_appointment_confirmation(self, to_phone: str, message: str) -> dict:
+            sent.append((to_phone, message))
+            return {"status": "queued", "sid": "SM1"}
+
+    monkeypatch.setattr(post_call, "SmsService", _FakeSms)
+    fake_redis = _FakeRedis()
+    monkeypatch.setattr(call_summary_events, "_bus", call_summary_events.CallSummaryEventBus(fake_redis))
+    store = RedisSessionStore(redis_client=fake_redis, ttl_seconds=60)
+    dispatcher = OutboundCallDispatcher(store, _FakeCallAgent(), max_concurrent_calls=10)
+    clinics = [
+        {"doctor_name": "Dr. Ada", "phone_number": "5550000000"},
+        {"doctor_name": "Dr. Ben", "phone_number": "5550000001"},
+    ]
+    await dispatcher.start("session-post", clinics, {"patient_phone": "+15551234567"})
+
+    declined = {"conversation_id": "conv-1", "analysis": {"summary": "Fully booked.", "call_successful": "failure"}}
+    result = await post_call.handle_post_call(declined, store=store, dispatcher=dispatcher)
+    assert result == {"ok": True, "session_id": "session-post"}
+    # The next clinic is being dialled, so a decline is not what the patient sees.
+    assert await store.get_pending_call_summary_peek("session-post") is None
+    # ElevenLabs retries the webhook: the second delivery is acknowledged without settling the call again.
+    assert (await post_call.handle_post_call(declined, store=store, dispatcher=dispatcher))["duplicate"]
+
+    booked = {"conversation_id": "conv-2", "analysis": {"summary": "Tuesday 9am.", "call_successful": "success"}}
+    result = await post_call.handle_post_call(booked, store=store, dispatcher=dispatcher)
+    assert result["sms"]["to_phone"] == "+15551234567" and "Dr. Ben" in result["sms"]["message"]
+    assert (await post_call.send_confirmation_sms(**result["sms"], redis=fake_redis))["sid"] == "SM1"
+    assert (await post_call.send_confirmation_sms(**result["sms"], redis=fake_redis)) == {"status": "duplicate"}
+    assert len(sent) == 1
+    assert (await store.get_pending_call_summary_peek("session-post"))["summary"] == "Tuesday 9am."
+    assert await post_call.handle_post_call({"conversation_id": "conv-unknown"}, store=store) == {
+        "ok": True, "message": "Session not found"
+    }
+
+    # Parallel: a clinic hung up after the winner confirmed must not replace the booking summary.
+    await dispatcher.start("session-race", clinics, {}, strategy="parallel")
+    won = {"conversation_id": "conv-3", "analysis": {"summary": "Booked Friday.", "call_successful": "success"}}
+    lost = {"conversation_id": "conv-4", "analysis": {"summary": "Caller hung up.", "call_successful": "failure"}}
+    await post_call.handle_post_call(won, store=store, dispatcher=dispatcher)
+    await post_call.handle_post_call(lost, store=store, dispatcher=dispatcher)
+    assert (await store.get_pending_call_summary_peek("session-race"))["summary"] == "Booked Friday."
+
+    # Once every clinic declined, the patient gets one line per clinic.
+    await dispatcher.start("session-none", clinics, {}, strategy="parallel")
+    for conversation_id in ("conv-5", "conv-6"):
+        analysis = {"summary": "No openings.", "call_successful": "failure"}
+        body = {"conversation_id": conversation_id, "analysis": analysis}
+        await post_call.handle_post_call(body, store=store, dispatcher=dispatcher)
+    summary = (await store.get_pending_call_summary_peek("session-none"))["summary"]
+    assert summary.startswith("None of the clinics could book") and summary.count("No openings.") == 2
+
+
+@pytest.mark.asyncio
+async def test_call_summary_events_cross_processes_and_replay_missed_events():
+    from app.services.call_summary_events import STREAM_KEY, CallSummaryEventBus
+
+    fake_redis = _FakeRedis()
+    # Two buses on one Redis stand in for the SSE worker and the worker that handled the webhook.
+    sse_worker, webhook_worker = CallSummaryEventBus(fake_redis, block_ms=10), CallSummaryEventBus(fake_redis)
+
+    missed_id = await webhook_worker.publish("session-a")
+    await webhook_worker.publish("session-b")
+    queue = await sse_worker.subscribe("session-a")
+    assert queue.get_nowait() == {"event": "call_summary_ready", "id": missed_id}
+    assert queue.empty()
+
+    # Live delivery through the process's one reader, multiplexed by session.
+    other = await sse_worker.subscribe("session-b", last_event_id=missed_id)
+    other.get_nowait()
+    live_id = await webhook_worker.publish("session-a")
+    assert (await asyncio.wait_for(queue.get(), timeout=1)) == {"event": "call_summary_ready", "id": live_id}
+    assert other.empty()
+
+    # A reconnect with Last-Event-ID replays only what came after it.
+    resumed = await sse_worker.subscribe("session-a", last_event_id=missed_id)
+    assert resumed.get_nowait()["id"] == live_id and resumed.empty()
+    for session_id, subscribed in (("session-a", queue), ("session-b", other), ("session-a", resumed)):
+        await sse_worker.unsubscribe(session_id, subscribed)
+    assert sse_worker._reader is None and len(fake_redis.streams[STREAM_KEY]) == 3
+    await sse_worker.close()
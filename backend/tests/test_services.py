@@ -1,11 +1,37 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import httpx
 import pytest
+from openai import APIConnectionError
 
+from app.core.config import settings
+from app.models.appointment import Appointment
+from app.models.interaction_log import InteractionLog
 from app.models.patient import Patient
 from app.services.ai_agent import ProactiveAIAgentService
 from app.services.doctor_matching import DoctorMatchingService
+from app.services import http_client as http_client_module
+from app.services import kb_medlineplus_service as kb_module
 from app.services.epic_fhir_client import EpicFhirClient
 from app.services.elevenlabs_call_agent import ElevenLabsCallAgent
+from app.services.kb_medlineplus_service import KBMedlinePlusService
+from app.services.lexical_index import reciprocal_rank_fusion
+from app.services.medlineplus_ingest import IngestState, chunk_text, ingest_medlineplus
+from app.services.memory import actian_client as actian_client_module
+from app.services.memory.actian_client import ActianVectorClient
+from app.services.memory.actian_pool import ActianConnectionPool
+from app.services.memory.collection_registry import CollectionRegistry
+from app.services.memory.local_vector_store import LocalVectorStore
+from app.services.memory.embedding_cache import EmbeddingCache, pack_vector, unpack_vector
+from app.services.memory.embedding_service import EmbeddingService
 from app.services.memory.memory_orchestrator import MemoryOrchestrator
+from app.services.memory.patient_index import PatientMemoryIndex
+from app.services.memory.vector_ids import ID_MASK, VectorIdCollisionError, assign_vector_ids, stable_vector_id
+from app.services import redis_pool
+from app.services.provider_directory_cache import ProviderDirectoryCache
+from app.services.rag_result_cache import RagResultCache
 from app.services.sms_service import SmsService
 from app.services.triage import SymptomTriageService
 from app.services.zocdoc_client import ZocDocClient
@@ -26,6 +52,112 @@ async def test_zocdoc_fallback():
     assert "doctor_name" in results[0]
 
 
+@pytest.mark.asyncio
+async def test_zocdoc_shares_one_cached_token_across_concurrent_requests(monkeypatch):
+    calls: list[str] = []
+    revoked: set[str] = set()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/oauth/token":
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"access_token": f"token-{calls.count('/oauth/token')}", "expires_in": 3600})
+        if request.headers["Authorization"].removeprefix("Bearer ") in revoked:
+            return httpx.Response(401)
+        return httpx.Response(200, json={"data": {"provider_locations": [{"provider_location_id": "pl_1"}]}})
+
+    monkeypatch.setattr(settings, "zocdoc_client_id", "client")
+    monkeypatch.setattr(settings, "zocdoc_client_secret", "secret")
+    monkeypatch.setattr(http_client_module, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    client = ZocDocClient()
+
+    # Distinct zips, so the provider-directory cache does not collapse the requests.
+    results = await asyncio.gather(*(client.get_provider_locations(f"1000{i}") for i in range(5)))
+    assert all(result[0]["provider_location_id"] == "pl_1" for result in results)
+    assert calls.count("/oauth/token") == 1 and calls.count("/v1/provider_locations") == 5
+
+    # A token the API rejects is dropped and fetched again once.
+    revoked.add("token-1")
+    await client.get_provider_locations("10005")
+    assert calls.count("/oauth/token") == 2
+    stats = http_client_module.get_token_manager().stats()
+    assert stats["fetches"] == 2 and stats["coalesced"] == 4
+
+
+@pytest.mark.asyncio
+async def test_provider_directory_cache_coalesces_and_serves_stale_while_revalidating():
+    cache = ProviderDirectoryCache(max_entries=10, ttl_seconds=60, stale_seconds=600)
+    fetches: list[int] = []
+
+    async def fetch():
+        fetches.append(len(fetches))
+        await asyncio.sleep(0.01)
+        return [{"provider_location_id": f"pl_{len(fetches)}"}]
+
+    key = (("page", 0), ("visit_reason_id", "pc_1"), ("zip_code", "30332"))
+    first = await asyncio.gather(*(cache.get_or_fetch(key, fetch) for _ in range(4)))
+    assert len(fetches) == 1 and all(result == [{"provider_location_id": "pl_1"}] for result in first)
+    first[0][0]["doctor_name"] = "annotated by a caller"
+    assert await cache.get_or_fetch(key, fetch) == [{"provider_location_id": "pl_1"}]
+
+    # Past the TTL: the stale list is returned at once and refreshed in the background.
+    cache._entries[key].fetched_at -= 120
+    assert await cache.get_or_fetch(key, fetch) == [{"provider_location_id": "pl_1"}]
+    await asyncio.sleep(0.05)
+    assert len(fetches) == 2
+    assert await cache.get_or_fetch(key, fetch) == [{"provider_location_id": "pl_2"}]
+
+    async def failing_fetch():
+        raise httpx.ConnectError("zocdoc down")
+
+    cache._entries[key].fetched_at -= 120
+    assert await cache.get_or_fetch(key, failing_fetch) == [{"provider_location_id": "pl_2"}]
+    await asyncio.sleep(0.01)
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["coalesced"] == 3 and stats["stale_hits"] == 2
+    assert stats["refreshes"] == 2 and stats["refresh_failures"] == 1
+
+    cache._entries[key].fetched_at -= 1000
+    with pytest.raises(httpx.ConnectError):
+        await cache.get_or_fetch(key, failing_fetch)
+
+
+@pytest.mark.asyncio
+async def test_token_refresh_waiters_take_over_when_the_leader_is_cancelled(monkeypatch):
+    token_requests: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        token_requests.append(request.url.path)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"access_token": "token", "expires_in": 3600})
+
+    monkeypatch.setattr(http_client_module, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    tokens = http_client_module.OAuthTokenManager()
+    leader = asyncio.create_task(tokens.get_token("https://auth.test/token", "client", "secret"))
+    await asyncio.sleep(0.01)
+    follower = asyncio.create_task(tokens.get_token("https://auth.test/token", "client", "secret"))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    assert await asyncio.wait_for(follower, timeout=1) == "token"
+    assert len(token_requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_provider_cache_waiters_take_over_when_the_leader_is_cancelled():
+    cache = ProviderDirectoryCache(max_entries=10, ttl_seconds=60, stale_seconds=0)
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return [{"provider_location_id": "pl_1"}]
+
+    leader_results = asyncio.create_task(cache.get_or_fetch("key", fetch))
+    await asyncio.sleep(0.01)
+    follower_results = asyncio.create_task(cache.get_or_fetch("key", fetch))
+    await asyncio.sleep(0.01)
+    leader_results.cancel()
+    assert await asyncio.wait_for(follower_results, timeout=1) == [{"provider_location_id": "pl_1"}]
+
+
 @pytest.mark.asyncio
 async def test_epic_fallback():
     client = EpicFhirClient()
@@ -97,3 +229,510 @@ async def test_memory_orchestrator_in_memory_mode():
     memories = await orchestrator.list_patient_memories(patient_id=99, limit=10)
     assert len(memories) >= 2
 
+
+
+class _FakeEmbeddings:
+    def __init__(self, fail_first: int = 0):
+        self.calls: list[list[str]] = []
+        self.fail_first = fail_first
+
+    async def create(self, model: str, input: list[str]):
+        if self.fail_first:
+            self.fail_first -= 1
+            raise APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/embeddings"))
+        self.calls.append(list(input))
+        # Return data out of order to check that results are re-ordered by index.
+        data = [SimpleNamespace(index=i, embedding=[float(len(text)), 1.0]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+@pytest.mark.asyncio
+async def test_embedding_service_embed_many_batches_and_retries(monkeypatch):
+    service = EmbeddingService(cache=EmbeddingCache(use_redis=False))
+    fake = _FakeEmbeddings(fail_first=1)
+    service.client = SimpleNamespace(embeddings=fake)
+    service.vector_dim = 3
+    monkeypatch.setattr(EmbeddingService, "_backoff_seconds", staticmethod(lambda attempt: 0))
+
+    vectors = await service.embed_many(["a", "", "ccc", "dd", "eeeee"], batch_size=2)
+
+    assert vectors == [[1.0, 1.0, 0.0], [0.0, 0.0, 0.0], [3.0, 1.0, 0.0], [2.0, 1.0, 0.0], [5.0, 1.0, 0.0]]
+    assert sorted(len(call) for call in fake.calls) == [2, 2]
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache_serves_repeated_texts():
+    cache = EmbeddingCache(use_redis=False, max_entries=2)
+    service = EmbeddingService(cache=cache)
+    fake = _FakeEmbeddings()
+    service.client = SimpleNamespace(embeddings=fake)
+    service.vector_dim = 2
+
+    first = await service.embed_many(["sore throat", "sore  throat ", "fever"])
+    second = await service.embed_text("fever")
+
+    assert first[0] == first[1]
+    assert second == first[2]
+    assert fake.calls == [["sore throat", "fever"]]
+    assert cache.stats()["local_hits"] == 1
+    assert unpack_vector(pack_vector([0.5, -1.0])) == [0.5, -1.0]
+
+
+class _FakeCortexClient:
+    opened = 0
+
+    def __init__(self, host: str):
+        self.host = host
+        self.fail_next = False
+
+    async def __aenter__(self):
+        _FakeCortexClient.opened += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        return None
+
+    async def health_check(self):
+        return ("1.0", 1)
+
+    async def count(self, collection: str):
+        if self.fail_next:
+            raise ConnectionError("channel closed")
+        return 7
+
+
+@pytest.mark.asyncio
+async def test_actian_pool_reuses_connections_and_reconnects_after_failure():
+    _FakeCortexClient.opened = 0
+    pool = ActianConnectionPool("fake:1", size=1, call_timeout=1, client_factory=_FakeCortexClient)
+    await pool.open()
+
+    assert await pool.call("count", "topics") == 7
+    assert await pool.call("count", "topics") == 7
+    assert _FakeCortexClient.opened == 1
+
+    async with pool.acquire() as client:
+        client.fail_next = True
+    with pytest.raises(ConnectionError):
+        await pool.call("count", "topics")
+    assert await pool.call("count", "topics") == 7
+
+    # An application error (e.g. a missing collection) keeps the connection.
+    with pytest.raises(RuntimeError):
+        async with pool.acquire():
+            raise RuntimeError("Collection topics not found")
+    assert await pool.call("count", "topics") == 7
+
+    stats = pool.stats()
+    assert _FakeCortexClient.opened == 2
+    assert stats["reconnects"] == 1
+    assert stats["call_errors"] == 1
+    await pool.close()
+
+
+class _FakeRegistryPool:
+    def __init__(self):
+        self.calls: list[str] = []
+        self.collections: set[str] = set()
+
+    async def call(self, method: str, *args, **kwargs):
+        self.calls.append(method)
+        if method == "has_collection":
+            return args[0] in self.collections
+        if method == "create_collection":
+            self.collections.add(kwargs["name"])
+        if method == "upsert" and args[0] not in self.collections:
+            raise RuntimeError(f"Collection {args[0]} not found")
+
+
+@pytest.mark.asyncio
+async def test_collection_registry_checks_once_and_recovers_missing_collection():
+    pool = _FakeRegistryPool()
+    registry = CollectionRegistry(pool)
+
+    for _ in range(3):
+        await registry.run("memories", 8, "COSINE", lambda: pool.call("upsert", "memories"))
+    assert pool.calls == ["has_collection", "create_collection", "upsert", "upsert", "upsert"]
+
+    pool.collections.clear()
+    pool.calls.clear()
+    await registry.run("memories", 8, "COSINE", lambda: pool.call("upsert", "memories"))
+    assert pool.calls == ["upsert", "has_collection", "create_collection", "upsert"]
+
+
+@pytest.mark.asyncio
+async def test_memory_reindex_uses_bulk_writes_and_is_idempotent(db_session):
+    patient = Patient(
+        first_name="Bulk",
+        last_name="Reindex",
+        phone_number="+15550003333",
+        insurance_provider="Aetna",
+        insurance_member_id="MEM-333",
+    )
+    db_session.add(patient)
+    db_session.flush()
+    for index in range(3):
+        db_session.add(
+            InteractionLog(
+                patient_id=patient.id,
+                interaction_type="chat",
+                channel="web",
+                content=f"headache day {index}",
+            )
+        )
+    db_session.add(
+        Appointment(
+            patient_id=patient.id,
+            doctor_external_id="doc_1",
+            doctor_name="Dr. A",
+            specialty="Primary Care",
+            appointment_time="2026-02-24T09:00:00",
+            clinic_location="Downtown",
+            symptoms_summary="headache",
+        )
+    )
+    db_session.commit()
+
+    orchestrator = MemoryOrchestrator()
+    progress = [item async for item in orchestrator.reindex_all_patients(db_session)]
+    await orchestrator.reindex_patient_from_structured_data(db=db_session, patient_id=patient.id)
+
+    assert progress[-1]["completed"] == progress[-1]["total"] == 1
+    assert progress[-1]["indexed_memories"] == 5
+    memories = await orchestrator.list_patient_memories(patient_id=patient.id, limit=50)
+    assert len(memories) == 5
+
+
+class _FakeSearchPool:
+    """Global neighbours: 50 rows for other patients first, then patient 7's two memories."""
+
+    def __init__(self):
+        self.rows = [SimpleNamespace(payload={"patient_id": 1, "memory_id": f"o{i}"}) for i in range(50)]
+        self.rows += [SimpleNamespace(payload={"patient_id": 7, "memory_id": f"p{i}"}) for i in range(2)]
+        self.fetches: list[int] = []
+
+    async def call(self, method: str, *args, **kwargs):
+        assert method == "search"
+        self.fetches.append(kwargs["top_k"])
+        return self.rows[: kwargs["top_k"]]
+
+
+class _FakePatientIndex:
+    def __init__(self, count):
+        self._count = count
+
+    async def is_ready(self, collection, patient_id):
+        return None if self._count is None else True
+
+    async def count(self, collection, patient_id):
+        return self._count
+
+
+@pytest.mark.asyncio
+async def test_actian_search_widens_overfetch_until_patient_results_found(monkeypatch):
+    monkeypatch.setattr(actian_client_module, "AsyncCortexClient", object)
+    pool = _FakeSearchPool()
+    client = ActianVectorClient(pool=pool)
+    client._server_filter_supported = False
+    client._patient_index = _FakePatientIndex(count=2)
+
+    results = await client.search(query_vector=[0.1], top_k=3, patient_id=7)
+
+    assert [item["memory_id"] for item in results] == ["p0", "p1"]
+    assert pool.fetches == [12, 24, 48, 96]
+
+    # A patient with no indexed memories needs no search; with the index down the widening stops at max_fetch.
+    pool.fetches.clear()
+    client._patient_index = _FakePatientIndex(count=0)
+    assert await client.search(query_vector=[0.1], top_k=3, patient_id=8) == []
+    assert pool.fetches == []
+    pool.rows = pool.rows[:50] * 2000
+    client._patient_index = _FakePatientIndex(count=None)
+    client.max_fetch = 100
+    assert await client.search(query_vector=[0.1], top_k=3, patient_id=8) == []
+    assert pool.fetches == [12, 24, 48, 96, 100]
+
+
+class _FakeScrollPool:
+    """A collection written before the patient index existed: patient 7 has two memories, patient 9 none."""
+
+    def __init__(self):
+        self.rows = [SimpleNamespace(payload={"patient_id": 1, "memory_id": f"o{i}"}) for i in range(3)]
+        self.rows += [
+            SimpleNamespace(payload={"patient_id": 7, "memory_id": f"p{i}", "created_at": f"2026-01-0{i + 1}"})
+            for i in range(2)
+        ]
+        self.scrolls = 0
+
+    async def scroll_all(self, collection, page_size=200):
+        self.scrolls += 1
+        yield self.rows
+
+    async def call(self, method: str, *args, **kwargs):
+        assert method == "search"
+        return self.rows[: kwargs["top_k"]]
+
+
+class _FakeIndexRedis:
+    """The hash and string commands PatientMemoryIndex uses; pipelines apply their commands immediately."""
+
+    def __init__(self):
+        self.hashes: dict[str, dict[str, str]] = {}
+        self.strings: dict[str, str] = {}
+
+    def pipeline(self, transaction: bool = True):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def hset(self, key: str, mapping: dict):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    async def execute(self):
+        return []
+
+    async def hlen(self, key: str):
+        return len(self.hashes.get(key, {}))
+
+    async def hvals(self, key: str):
+        return list(self.hashes.get(key, {}).values())
+
+    async def exists(self, key: str):
+        return int(key in self.strings)
+
+    async def set(self, key: str, value: str):
+        self.strings[key] = value
+
+
+@pytest.mark.asyncio
+async def test_patient_index_backfills_each_patient_once_then_trusts_an_empty_index(monkeypatch):
+    monkeypatch.setattr(actian_client_module, "AsyncCortexClient", object)
+    pool = _FakeScrollPool()
+    client = ActianVectorClient(pool=pool)
+    client._server_filter_supported = False
+    client._patient_index = PatientMemoryIndex(redis_client=_FakeIndexRedis())
+
+    # Memories written before the index existed are found and copied into it on the first lookup only.
+    assert [m["memory_id"] for m in await client.list_patient_memories(7)] == ["p1", "p0"]
+    assert [m["memory_id"] for m in await client.search([0.1], top_k=3, patient_id=7)] == ["p0", "p1"]
+    assert pool.scrolls == 1
+
+    # A patient with no memories is scanned once; afterwards the empty index is the answer.
+    assert await client.list_patient_memories(9) == []
+    assert await client.search([0.1], top_k=3, patient_id=9) == []
+    assert await client.list_patient_memories(9) == []
+    assert pool.scrolls == 2
+
+
+def test_local_vector_store_patient_search_and_persistence(tmp_path):
+    store = LocalVectorStore("memories", dimension=3, directory=tmp_path)
+    store.upsert_many(
+        ["a", "b", "c"],
+        [[1.0, 0.0, 0.0], [0.0, 2.0, 0.0], [0.9, 0.1, 0.0]],
+        [{"patient_id": 1, "text": "a"}, {"patient_id": 1, "text": "b"}, {"patient_id": 2, "text": "c"}],
+    )
+    store.upsert_many(["b"], [[1.0, 0.1, 0.0]], [{"patient_id": 1, "text": "b2"}])
+    store.delete(["a"])
+
+    reloaded = LocalVectorStore("memories", dimension=3, directory=tmp_path)
+    patient_hits = reloaded.search([1.0, 0.0, 0.0], top_k=5, patient_id=1)
+    global_hits = reloaded.search([1.0, 0.0, 0.0], top_k=5)
+
+    assert len(reloaded) == 2
+    assert [payload["text"] for _, payload in patient_hits] == ["b2"]
+    assert [payload["text"] for _, payload in global_hits] == ["b2", "c"]
+    assert patient_hits[0][0] == pytest.approx(0.995, abs=1e-3)
+
+
+def test_stable_vector_ids_are_deterministic_and_detect_collisions(monkeypatch):
+    ids = assign_vector_ids("medlineplus_topics", ["topic-1", "topic-2", "topic-1"])
+
+    assert ids[0] == ids[2] == stable_vector_id("medlineplus_topics", "topic-1")
+    assert ids[0] != ids[1]
+    assert all(0 <= vector_id <= ID_MASK for vector_id in ids)
+    assert stable_vector_id("patient_long_term_memory", "topic-1") != ids[0]
+
+    # Keys assigned by an earlier batch or run are checked too when the caller passes them.
+    assigned: dict[int, str] = {}
+    assign_vector_ids("medlineplus_topics", ["topic-1"], assigned)
+    assign_vector_ids("medlineplus_topics", ["topic-1", "topic-2"], assigned)
+    assert sorted(assigned.values()) == ["topic-1", "topic-2"]
+
+    monkeypatch.setattr("app.services.memory.vector_ids.stable_vector_id", lambda namespace, key: 42)
+    with pytest.raises(VectorIdCollisionError):
+        assign_vector_ids("medlineplus_topics", ["topic-1", "topic-2"])
+    with pytest.raises(VectorIdCollisionError):
+        assign_vector_ids("medlineplus_topics", ["topic-3"], {42: "topic-1"})
+
+
+def _write_topics_csv(path, topics):
+    lines = ["id,title,url,meta-desc,full-summary,groups"]
+    lines += [f"{topic_id},{title},https://medlineplus.gov/{topic_id},,<p>{summary}</p>," for topic_id, title, summary in topics]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+class _FailingKB(KBMedlinePlusService):
+    def __init__(self, fail_on_call: int):
+        super().__init__()
+        self.calls = 0
+        self.fail_on_call = fail_on_call
+
+    async def batch_upsert(self, ids, vectors, payloads):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError("actian went away")
+        await super().batch_upsert(ids, vectors, payloads)
+
+
+@pytest.mark.asyncio
+async def test_medlineplus_ingest_is_incremental_and_resumable(tmp_path):
+    csv_path = tmp_path / "topics.csv"
+    state_path = tmp_path / "state.json"
+    _write_topics_csv(csv_path, [("1", "Asthma", "wheeze"), ("2", "Flu", "fever"), ("3", "Gout", "toe pain")])
+    embedding = EmbeddingService(cache=EmbeddingCache(use_redis=False))
+    fake = _FakeEmbeddings()
+    embedding.client = SimpleNamespace(embeddings=fake)
+    embedding.vector_dim = 2
+
+    crashing_kb = _FailingKB(fail_on_call=2)
+    crashing_kb.vector_dim = 2
+    with pytest.raises(RuntimeError):
+        await ingest_medlineplus(csv_path, kb=crashing_kb, embedding=embedding, state_path=state_path, batch_size=1)
+    assert IngestState(state_path).checkpoint["rows_done"] == 1
+
+    kb = KBMedlinePlusService()
+    kb.vector_dim = 2
+    resumed = await ingest_medlineplus(csv_path, kb=kb, embedding=embedding, state_path=state_path, batch_size=1)
+    assert resumed["resumed_from"] == 1
+    assert resumed["embedded"] == 2
+    assert len(kb.local_store) == 3
+
+    unchanged = await ingest_medlineplus(csv_path, kb=kb, embedding=embedding, state_path=state_path)
+    assert (unchanged["embedded"], unchanged["unchanged"], unchanged["resumed_from"]) == (0, 3, 0)
+
+    _write_topics_csv(csv_path, [("1", "Asthma", "wheeze"), ("2", "Flu", "fever and chills")])
+    changed = await ingest_medlineplus(csv_path, kb=kb, embedding=embedding, state_path=state_path)
+    assert (changed["embedded"], changed["unchanged"], changed["deleted"]) == (1, 1, 1)
+    assert len(kb.local_store) == 2
+    assert IngestState(state_path).checkpoint is None
+
+
+@pytest.mark.asyncio
+async def test_kb_hybrid_search_fuses_bm25_with_dense_results(monkeypatch):
+    kb = KBMedlinePlusService()
+    kb.vector_dim = 2
+    kb._embedding = EmbeddingService(cache=EmbeddingCache(use_redis=False))
+    kb._embedding.vector_dim = 2
+    payloads = [
+        {"id": "1", "title": "Headache", "url": "u1", "text": "Headache pain in the head"},
+        {"id": "2", "title": "Gout", "url": "u2", "text": "Gout is arthritis with a painful swollen big toe"},
+        {"id": "3", "title": "Asthma", "url": "u3", "text": "Asthma narrows airways and causes wheezing"},
+    ]
+    await kb.batch_upsert([1, 2, 3], [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]], payloads)
+
+    # The first hybrid search does not build the BM25 index inline: it serves dense results and starts the build.
+    built_in: list[bool] = []
+    build = kb_module.BM25Index.build
+
+    def record_build(index, documents, version=None):
+        built_in.append(threading.current_thread() is threading.main_thread())
+        build(index, documents, version)
+
+    monkeypatch.setattr(kb_module.BM25Index, "build", record_build)
+    assert len(await kb.search("swollen toe", top_k=3)) == 3
+    assert not kb.lexical_index.built
+    assert await kb.warm_lexical_index(wait=True) is kb.lexical_index
+    assert built_in == [False] and kb.lexical_index.built
+
+    lexical = await kb.search("swollen toe", top_k=2, mode="lexical")
+    hybrid = await kb.search("swollen toe yesterday", top_k=3)
+
+    assert [item["title"] for item in lexical] == ["Gout"]
+    assert hybrid[0]["title"] == "Gout"
+    assert len(hybrid) == 3
+    assert reciprocal_rank_fusion([["a", "b"], ["b", "c"]], k=1)[0][0] == "b"
+
+
+@pytest.mark.asyncio
+async def test_medlineplus_ingest_chunks_topics_and_search_returns_best_passage(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "kb_passage_chars", 60)
+    monkeypatch.setattr(settings, "kb_passage_overlap_chars", 30)
+    csv_path = tmp_path / "topics.csv"
+    summary = "Asthma inflames the airways. Triggers include pollen and smoke. An inhaler relieves wheezing fast."
+    _write_topics_csv(csv_path, [("1", "Asthma", summary), ("2", "Gout", "Gout causes a swollen big toe.")])
+    kb = KBMedlinePlusService()
+    kb.vector_dim = 2
+    kb._embedding = EmbeddingService(cache=EmbeddingCache(use_redis=False))
+    kb._embedding.vector_dim = 2
+
+    report = await ingest_medlineplus(csv_path, kb=kb, embedding=kb._embedding, state_path=tmp_path / "state.json")
+    results = await kb.search("inhaler wheezing", top_k=5)
+    lexical = await kb.search("inhaler wheezing", top_k=5, mode="lexical")
+
+    passages = chunk_text(summary, 60, 30)
+    assert all(len(passage) <= 60 for passage in passages)
+    assert passages[1].startswith("Triggers include pollen and smoke.")
+    assert report["passages"] == len(kb.local_store) > report["embedded"] == 2
+    assert [item["title"] for item in results] == ["Asthma", "Gout"]
+    assert [item["title"] for item in lexical] == ["Asthma"]
+    assert "inhaler" in lexical[0]["text"] and lexical[0]["passage_index"] > 0
+
+
+class _FixedEmbeddings:
+    def __init__(self, vectors: dict[str, list[float]]):
+        self.vectors = vectors
+        self.calls = 0
+
+    async def embed_text(self, text: str) -> list[float]:
+        self.calls += 1
+        return self.vectors[text]
+
+
+@pytest.mark.asyncio
+async def test_rag_result_cache_semantic_hits_eviction_and_kb_invalidation():
+    embedding = _FixedEmbeddings(
+        {
+            "sore throat 2 days": [1.0, 0.0, 0.0],
+            "sore throat two days": [0.99, 0.05, 0.0],
+            "rash on arm": [0.0, 1.0, 0.0],
+            "chest cough": [0.0, 0.0, 1.0],
+        }
+    )
+    cache = RagResultCache(max_entries=2, ttl_seconds=60, similarity_threshold=0.95, embedding=embedding)
+    result = {"kb_evidence": [{"title": "Sore Throat"}], "specialty": "Primary Care", "description": "throat"}
+
+    assert await cache.lookup("sore throat 2 days", "1") is None
+    await cache.store("sore throat 2 days", "1", result)
+    assert await cache.lookup("Sore  throat 2 days", "1") == result
+    assert await cache.lookup("sore throat two days", "1") == result
+    assert await cache.lookup("rash on arm", "1") is None
+
+    await cache.store("rash on arm", "1", {"specialty": "Dermatology"})
+    await cache.store("chest cough", "1", {"specialty": "Pulmonology"})
+    assert await cache.lookup("sore throat 2 days", "1") is None
+
+    assert await cache.lookup("chest cough", "2") is None
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["evictions"], stats["invalidations"]) == (1, 1, 1, 1)
+    assert stats["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_shared_redis_pool_waits_for_a_connection_and_close_disconnects_it(monkeypatch):
+    client = redis_pool.get_redis()
+    pool = client.connection_pool
+    assert isinstance(pool, redis_pool.redis_async.BlockingConnectionPool)
+    assert pool.timeout == settings.redis_pool_timeout_seconds
+    disconnected = []
+
+    async def disconnect(inuse_connections: bool = True) -> None:
+        disconnected.append(inuse_connections)
+
+    monkeypatch.setattr(pool, "disconnect", disconnect)
+    await redis_pool.close_redis()
+    assert disconnected and redis_pool.get_redis() is not client
+    redis_pool.reset_redis()